@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark da varredura de código gerado.
+
+Compara CodeScanner.first_match (src.application.code_scanner), que também
+devolve o offset da ocorrência, com o teste booleano anterior (`in` por
+padrão sobre o texto em minúsculas), sobre arquivos gerados sintéticos de
+tamanhos crescentes. Sem construções proibidas (o padrão) as duas
+abordagens varrem o texto inteiro.
+
+    python .scripts/benchmark-code-scanner.py --sizes 10 100 1000 --repeat 20
+"""
+
+import argparse
+import sys
+import timeit
+from functools import partial
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.application.code_scanner import (  # noqa: E402
+    DANGEROUS_PATTERNS,
+    default_scanner,
+)
+
+FUNCTION_TEMPLATE = '''def tool_{index}(values, factor={index}):
+    """Ferramenta gerada número {index}."""
+    total = 0
+    for value in values:
+        if value % 2 == 0:
+            total += value * factor
+        else:
+            total -= value
+    return {{"index": {index}, "total": total, "items": len(values)}}
+
+'''
+
+
+def make_code(functions: int, dangerous_every: int) -> str:
+    parts = []
+    for index in range(functions):
+        parts.append(FUNCTION_TEMPLATE.format(index=index))
+        if dangerous_every and index % dangerous_every == dangerous_every - 1:
+            parts.append("data = open('dados.txt').read()\n\n")
+    return "".join(parts)
+
+
+def legacy(code: str) -> None:
+    """Fluxo antigo: uma busca por padrão sobre o texto em minúsculas."""
+    lowered = code.lower()
+    for pattern in DANGEROUS_PATTERNS:
+        if pattern in lowered:
+            return
+
+
+def scanner(code: str) -> None:
+    default_scanner.first_match(code)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--dangerous-every", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print("⏱️  Benchmark do scanner de código")
+    print("=" * 60)
+    print(f"{'funções':>8} {'KiB':>8} {'legado (ms)':>12} {'scanner (ms)':>13}")
+    for size in args.sizes:
+        code = make_code(size, args.dangerous_every)
+        timings = []
+        for fn in (legacy, scanner):
+            best = min(timeit.repeat(partial(fn, code), number=1, repeat=args.repeat))
+            timings.append(best * 1000)
+        print(
+            f"{size:>8} {len(code) / 1024:>8.1f} {timings[0]:>12.3f} {timings[1]:>13.3f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark do custo de amostragem do monitor de recursos da sandbox.
+
+Mede o custo de uma amostra de /proc (stat, status e io) e o impacto do
+monitoramento na duração de uma tool com uso intenso de CPU, sem monitor e
+com intervalos de amostragem decrescentes.
+
+    python .scripts/benchmark-resource-monitor.py --runs 20 --intervals 0.05 0.01 0.001
+"""
+
+import argparse
+import asyncio
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.domain.auto_extension.resource_monitor import (  # noqa: E402
+    ResourceMonitor,
+    read_proc_sample,
+)
+from src.domain.auto_extension.security_sandbox import SecuritySandbox  # noqa: E402
+
+CPU_TOOL = """
+def work(n):
+    total = 0
+    for i in range(n):
+        total += i * i
+    return total
+
+result = work(params["n"])
+"""
+
+LIMITS = {"cpu_percent": 100.0, "memory_mb": 256, "io_operations": 10_000}
+
+
+def sample_cost(samples: int) -> float:
+    """Custo médio de uma amostra, em microssegundos."""
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    try:
+        time.sleep(0.2)
+        total = timeit.timeit(lambda: read_proc_sample(child.pid), number=samples)
+    finally:
+        child.kill()
+        child.wait()
+    return total / samples * 1e6
+
+
+async def tool_duration(monitor, runs: int, n: int) -> float:
+    """Duração mediana da tool na sandbox, em milissegundos."""
+    sandbox = SecuritySandbox(resource_monitor=monitor)
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        success, output = await sandbox.execute_safely(
+            CPU_TOOL, {"n": n}, timeout_ms=10_000, resource_limits=LIMITS
+        )
+        durations.append(time.perf_counter() - started)
+        assert success, output
+    await sandbox.close()
+    return statistics.median(durations) * 1000
+
+
+async def run_benchmark(args) -> None:
+    baseline = await tool_duration(None, args.runs, args.n)
+    print(f"{'intervalo (ms)':>15} {'mediana (ms)':>13} {'overhead':>9}")
+    print(f"{'sem monitor':>15} {baseline:>13.2f} {'-':>9}")
+    for interval in args.intervals:
+        monitor = ResourceMonitor(interval=interval, cpu_grace=60)
+        duration = await tool_duration(monitor, args.runs, args.n)
+        overhead = (duration / baseline - 1) * 100
+        print(f"{interval * 1000:>15.1f} {duration:>13.2f} {overhead:>8.1f}%")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--samples", type=int, default=20_000)
+    parser.add_argument(
+        "--n", type=int, default=2_000_000, help="iterações da tool de CPU"
+    )
+    parser.add_argument(
+        "--intervals", type=float, nargs="+", default=[0.05, 0.01, 0.001]
+    )
+    args = parser.parse_args()
+
+    print("⏱️  Benchmark do monitor de recursos")
+    print("=" * 60)
+    print(f"custo por amostra de /proc: {sample_cost(args.samples):.1f} µs")
+    asyncio.run(run_benchmark(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark da execução em lote de casos de teste na sandbox.
+
+Compara, para a mesma tool e a mesma matriz de parâmetros, uma chamada de
+`execute_safely` por caso (análise de segurança e processo por caso) com
+uma chamada de `execute_batch` (análise uma vez, um processo para o lote).
+
+    python .scripts/benchmark-sandbox-batch.py --cases 200 --modes fork forkserver
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.domain.auto_extension.code_analyzer import CodeAnalyzer  # noqa: E402
+from src.domain.auto_extension.execution_backend import (  # noqa: E402
+    create_execution_backend,
+)
+from src.domain.auto_extension.resource_monitor import ResourceMonitor  # noqa: E402
+from src.domain.auto_extension.security_sandbox import SecuritySandbox  # noqa: E402
+
+TOOL_CODE = """
+import json
+import re
+
+def slugify(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+result = json.dumps({"slug": slugify(params["title"]), "size": len(params["title"])})
+"""
+
+
+async def per_case(sandbox, params_list) -> float:
+    started = time.perf_counter()
+    for params in params_list:
+        success, output = await sandbox.execute_safely(TOOL_CODE, params)
+        assert success, output
+    return time.perf_counter() - started
+
+
+async def batched(sandbox, params_list) -> float:
+    started = time.perf_counter()
+    async for case in sandbox.execute_batch(TOOL_CODE, params_list):
+        assert case["success"], case
+    return time.perf_counter() - started
+
+
+async def run_benchmark(args) -> None:
+    params_list = [{"title": f"Título do caso {n}!"} for n in range(args.cases)]
+    print(f"{'modo':>11} {'por caso (s)':>13} {'lote (s)':>9} {'ganho':>7}")
+    for mode in args.modes:
+        monitor = ResourceMonitor() if args.monitor else None
+        sandbox = SecuritySandbox(
+            monitor,
+            CodeAnalyzer(),
+            execution_backend=create_execution_backend(mode=mode),
+        )
+        try:
+            # Aquecimento (zygote, caches de bytecode e de análise)
+            await batched(sandbox, params_list[:1])
+            sequential = await per_case(sandbox, params_list)
+            batch = await batched(sandbox, params_list)
+        finally:
+            await sandbox.close()
+        print(
+            f"{mode:>11} {sequential:>13.3f} {batch:>9.3f} "
+            f"{sequential / batch:>6.1f}x"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cases", type=int, default=200)
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=["fork", "forkserver"],
+        default=["fork", "forkserver"],
+    )
+    parser.add_argument(
+        "--monitor", action="store_true", help="ativa o monitor de recursos"
+    )
+    args = parser.parse_args()
+
+    print("⏱️  Benchmark de execução em lote na sandbox")
+    print("=" * 60)
+    asyncio.run(run_benchmark(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark da criação de processos da sandbox de execução.
+
+Compara, para a mesma tool trivial:
+
+- interpreter: um interpretador Python novo por execução (partida a frio);
+- fork: fork() do processo chamador a cada execução (ForkExecutionBackend);
+- forkserver: fork() a partir do zygote com módulos pré-carregados
+  (ForkServerBackend).
+
+Mede a latência de criação do processo (métrica sandbox_worker_spawn_seconds),
+a latência ponta a ponta sequencial e a vazão com execuções concorrentes.
+`--ballast-mb` aloca memória no processo chamador para simular o tamanho do
+processo da API, que encarece o fork direto.
+
+    python .scripts/benchmark-sandbox-spawn.py --runs 300 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from prometheus_client import REGISTRY  # noqa: E402
+
+from src.domain.auto_extension.execution_backend import (  # noqa: E402
+    ForkExecutionBackend,
+    ForkServerBackend,
+)
+
+TOOL_CODE = "import json\nresult = json.dumps({'soma': params['a'] + params['b']})\n"
+PARAMS = {"a": 5, "b": 3}
+
+
+class InterpreterBackend:
+    """Referência: um interpretador novo por execução."""
+
+    mode = "interpreter"
+
+    async def run(self, code, params=None, timeout=None, workdir=None):
+        script = f"params = {params!r}\n{code}\nprint(result)"
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-c",
+            script,
+            stdout=asyncio.subprocess.PIPE,
+        )
+        stdout, _ = await process.communicate()
+        return {"status": "success", "result": stdout.decode().strip()}
+
+    async def close(self):
+        pass
+
+
+def spawn_stats(mode):
+    labels = {"mode": mode}
+    total = REGISTRY.get_sample_value("sandbox_worker_spawn_seconds_sum", labels)
+    count = REGISTRY.get_sample_value("sandbox_worker_spawn_seconds_count", labels)
+    return (total or 0.0, count or 0.0)
+
+
+async def measure(backend, runs, concurrency):
+    # Aquecimento (inclui a partida do zygote)
+    await backend.run(TOOL_CODE, PARAMS)
+    spawn_before = spawn_stats(backend.mode)
+
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = await backend.run(TOOL_CODE, PARAMS)
+        latencies.append(time.perf_counter() - started)
+        assert result["status"] == "success", result
+
+    spawn_after = spawn_stats(backend.mode)
+    spawn_count = spawn_after[1] - spawn_before[1]
+    spawn_mean = (
+        (spawn_after[0] - spawn_before[0]) / spawn_count if spawn_count else None
+    )
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            return await backend.run(TOOL_CODE, PARAMS)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(runs)))
+    throughput = runs / (time.perf_counter() - started)
+
+    latencies.sort()
+    return {
+        "spawn_ms": spawn_mean * 1000 if spawn_mean is not None else None,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "throughput": throughput,
+    }
+
+
+async def run_benchmark(args):
+    backends = {
+        "interpreter": InterpreterBackend,
+        "fork": ForkExecutionBackend,
+        "forkserver": ForkServerBackend,
+    }
+    print(
+        f"{'modo':>12} {'spawn (ms)':>11} {'p50 (ms)':>9} {'p95 (ms)':>9} {'exec/s':>8}"
+    )
+    for mode in args.modes:
+        backend = backends[mode]()
+        runs = max(1, args.runs // 10) if mode == "interpreter" else args.runs
+        try:
+            stats = await measure(backend, runs, args.concurrency)
+        finally:
+            await backend.close()
+        spawn = f"{stats['spawn_ms']:.3f}" if stats["spawn_ms"] is not None else "-"
+        print(
+            f"{mode:>12} {spawn:>11} {stats['p50_ms']:>9.2f} "
+            f"{stats['p95_ms']:>9.2f} {stats['throughput']:>8.0f}"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=["interpreter", "fork", "forkserver"],
+        default=["interpreter", "fork", "forkserver"],
+    )
+    parser.add_argument(
+        "--ballast-mb",
+        type=int,
+        default=0,
+        help="memória alocada no processo chamador antes de medir",
+    )
+    args = parser.parse_args()
+
+    ballast = bytearray(args.ballast_mb * 1024 * 1024)
+    for offset in range(0, len(ballast), 4096):
+        ballast[offset] = 1  # páginas realmente mapeadas
+
+    print("⏱️  Benchmark de criação de processos da sandbox")
+    print("=" * 60)
+    asyncio.run(run_benchmark(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Gerador de carga para os endpoints que chamam o LLM.
+
+Dispara requisições em malha aberta (taxa fixa, independente das respostas)
+contra /llm-codegen/generate ou /auto-extension/tools e reporta vazão,
+erros por status e percentis de latência. Combine com o stub local para
+medições reproduzíveis:
+
+    python -m tests.llm_stub_server --port 4242 &
+    LLM_API_URL=http://127.0.0.1:4242 uvicorn src.presentation.api.app:app &
+    python .scripts/load-test-llm.py --target tools --rps 20 --duration 30
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+TARGETS = {
+    "codegen": "/llm-codegen/generate",
+    "tools": "/auto-extension/tools",
+}
+
+
+def make_token(secret: str) -> str:
+    """Gera um JWT HS256 aceito pelos endpoints protegidos."""
+    from jose import jwt
+
+    payload = {
+        "sub": "load-test",
+        "exp": datetime.now(timezone.utc) + timedelta(hours=1),
+    }
+    return jwt.encode(payload, secret, algorithm="HS256")
+
+
+def make_payload(target: str, index: int) -> dict:
+    """Corpo da requisição; o índice varia o prompt para evitar o cache."""
+    if target == "codegen":
+        return {
+            "prompt": f"Crie uma função que some dois números (carga {index})",
+            "max_tokens": 256,
+            "temperature": 0.2,
+        }
+    return {
+        "name": f"load_tool_{index}",
+        "description": f"Ferramenta de teste de carga número {index}",
+        "parameters": {"value": "str"},
+        "return_type": "dict",
+        "security_level": "standard",
+        "provider": "llm",
+    }
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Executa a carga e retorna o resumo das medições."""
+    url = args.base_url.rstrip("/") + TARGETS[args.target]
+    headers = {"Authorization": f"Bearer {make_token(args.jwt_secret)}"}
+    limits = httpx.Limits(max_connections=args.concurrency)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    dropped = 0
+
+    async with httpx.AsyncClient(
+        headers=headers, limits=limits, timeout=args.timeout
+    ) as client:
+
+        async def fire(index: int) -> None:
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.post(
+                        url, json=make_payload(args.target, index)
+                    )
+                    statuses[str(response.status_code)] += 1
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+                latencies.append(time.perf_counter() - started)
+
+        total = int(args.rps * args.duration)
+        interval = 1.0 / args.rps
+        tasks = []
+        started = time.perf_counter()
+        for index in range(total):
+            # Agenda pelo relógio absoluto para não acumular atraso
+            delay = started + index * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if semaphore.locked() and args.drop_when_saturated:
+                dropped += 1
+                continue
+            tasks.append(asyncio.create_task(fire(index)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    ok = sum(n for status, n in statuses.items() if status.startswith("2"))
+    return {
+        "target": url,
+        "requested_rps": args.rps,
+        "sent": len(latencies),
+        "dropped": dropped,
+        "success": ok,
+        "statuses": dict(statuses),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "success_rps": round(ok / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            name: round(percentile(ordered, q) * 1000, 1)
+            for name, q in (("p50", 0.5), ("p90", 0.9), ("p95", 0.95), ("p99", 0.99))
+        }
+        | {"max": round(ordered[-1] * 1000, 1) if ordered else 0.0},
+    }
+
+
+def print_report(report: dict) -> None:
+    print("📈 Teste de carga LLM")
+    print("=" * 60)
+    print(f"Alvo:              {report['target']}")
+    print(f"Taxa pedida:       {report['requested_rps']} req/s")
+    print(f"Enviadas:          {report['sent']} (descartadas: {report['dropped']})")
+    print(f"Sucesso:           {report['success']}")
+    print(f"Status:            {report['statuses']}")
+    print(f"Vazão:             {report['throughput_rps']} req/s")
+    print(f"Vazão com sucesso: {report['success_rps']} req/s")
+    latency = report["latency_ms"]
+    print(
+        "Latência (ms):     "
+        + "  ".join(f"{name}={value}" for name, value in latency.items())
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--target", choices=sorted(TARGETS), default="codegen")
+    parser.add_argument("--rps", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--jwt-secret", default="SECRET")
+    parser.add_argument(
+        "--drop-when-saturated",
+        action="store_true",
+        help="descarta envios quando a concorrência máxima está em uso",
+    )
+    parser.add_argument("--json", action="store_true", help="saída em JSON")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    return 0 if report["success"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Varredura de código gerado por construções proibidas.
+
+Cada literal proibido é procurado com `str.find` sobre o texto em
+minúsculas; `first_match` devolve a ocorrência mais próxima do início e
+seus offsets. É usada na verificação incremental do streaming, em que o
+código ainda incompleto não pode ser analisado pela AST (ver
+src/domain/auto_extension/code_analyzer.py).
+
+Uma alternação única compilada com `re` foi medida e descartada: para
+poucos literais curtos, cada `str.find` varre o texto em C e o conjunto
+fica cerca de duas vezes mais rápido que a alternação em código limpo, o
+caso comum (ver .scripts/benchmark-code-scanner.py).
+"""
+import re
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+
+# Construções proibidas no código gerado (comparação sem distinção de caixa)
+DANGEROUS_PATTERNS: Tuple[str, ...] = (
+    "import os",
+    "import sys",
+    "exec(",
+    "eval(",
+    "subprocess",
+    "open(",
+)
+
+
+@dataclass(frozen=True)
+class ScanMatch:
+    """Ocorrência de uma construção proibida em code[start:end]."""
+
+    pattern: str
+    start: int
+    end: int
+
+
+class CodeScanner:
+    """Scanner para um conjunto de literais proibidos."""
+
+    def __init__(self, patterns: Iterable[str] = DANGEROUS_PATTERNS) -> None:
+        self.patterns = tuple(patterns)
+        self._canonical = {p.lower(): p for p in self.patterns}
+        self.max_pattern_len = max((len(p) for p in self._canonical), default=0)
+        # Só para textos cujo tamanho muda ao baixar a caixa (alguns
+        # caracteres Unicode), em que os offsets de lower() não valem
+        alternation = "|".join(
+            re.escape(p) for p in sorted(self._canonical, key=len, reverse=True)
+        )
+        self._regex_ignorecase = re.compile(alternation or "(?!)", re.IGNORECASE)
+
+    def first_match(self, code: str, start: int = 0) -> Optional[ScanMatch]:
+        """Primeira construção proibida em code[start:]."""
+        segment = code[start:] if start else code
+        lowered = segment.lower()
+        if len(lowered) != len(segment):
+            m = self._regex_ignorecase.search(segment)
+            if m is None:
+                return None
+            pattern = self._canonical.get(m.group().lower(), m.group())
+            return ScanMatch(pattern, start + m.start(), start + m.end())
+        best: Optional[Tuple[int, str]] = None
+        for literal in self._canonical:
+            # Depois de uma ocorrência, só interessa o trecho anterior a ela
+            index = lowered.find(literal, 0, best[0] + len(literal) if best else None)
+            if index != -1 and (best is None or index < best[0]):
+                best = (index, literal)
+        if best is None:
+            return None
+        index, literal = best
+        return ScanMatch(
+            self._canonical[literal], start + index, start + index + len(literal)
+        )
+
+
+default_scanner = CodeScanner()
@@ -4,6 +4,8 @@ from typing import Any
 
 import structlog
 
+from src.domain.auto_extension.bytecode_cache import get_bytecode_cache
+
 logger = structlog.get_logger()
 
 
@@ -11,6 +13,9 @@ def expand_and_register_tool(code: str, tool_name: str, target_dir: str) -> Any:
     """
     Salva o código Python em disco, importa e registra a nova tool.
 
+    O código é compilado pelo cache de bytecode, que grava o bytecode em
+    `target_dir/__pycache__` para as execuções seguintes na sandbox.
+
     Args:
         code (str): Código fonte Python gerado.
         tool_name (str): Nome da tool/módulo.
@@ -39,14 +44,15 @@ def expand_and_register_tool(code: str, tool_name: str, target_dir: str) -> Any:
         logger.error("tool_save_failed", tool_name=tool_name, error=str(e))
         raise
 
-    # 3. Importação dinâmica
+    # 3. Importação dinâmica (a partir do bytecode em cache)
     try:
         spec = importlib.util.spec_from_file_location(tool_name, file_path)
         if spec is None or spec.loader is None:
             logger.error("import_spec_failed", tool_name=tool_name, file_path=file_path)
             raise ImportError(f"Não foi possível criar spec para {tool_name}")
+        compiled = get_bytecode_cache().get(code, directory=target_dir)
         module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)
+        exec(compiled.code, module.__dict__)
         logger.info("tool_imported", tool_name=tool_name)
     except Exception as e:
         logger.error("tool_import_failed", tool_name=tool_name, error=str(e))
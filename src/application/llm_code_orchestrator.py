@@ -3,14 +3,24 @@ Orquestrador para geração de código via LLM.
 Responsável por receber prompts, acionar o client LLM, validar e sanitizar o código gerado.
 """
 
-import re
-from typing import Any, Dict, Optional
+import asyncio
+import time
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Dict, List, Optional, Sequence
 
 import structlog
 from opentelemetry import trace
 from opentelemetry.trace import Status, StatusCode
 from prometheus_client import Counter, Histogram
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from src.application.code_scanner import default_scanner
+from src.application.llm_response_cache import LLMResponseCache, make_cache_key
+from src.domain.auto_extension.code_analyzer import (
+    CodeAnalyzer,
+    CodeVerdict,
+    get_code_analyzer,
+)
 
 orchestrator_requests = Counter(
     "llm_orchestrator_requests_total",
@@ -21,6 +31,11 @@ orchestrator_latency = Histogram(
     "llm_orchestrator_latency_seconds",
     "Latência das chamadas ao orquestrador de geração de código via LLM",
 )
+orchestrator_batch_size = Histogram(
+    "llm_orchestrator_batch_size",
+    "Quantidade de itens por lote de geração de código",
+    buckets=(1, 2, 5, 10, 20, 50, 100),
+)
 tracer = trace.get_tracer(__name__)
 logger = structlog.get_logger()
 
@@ -32,13 +47,37 @@ class CodeGenRequest(BaseModel):
     extra_params: Optional[Dict[str, Any]] = None
 
 
+class BatchCodeGenRequest(BaseModel):
+    items: List[CodeGenRequest] = Field(..., min_length=1, max_length=100)
+    concurrency: Optional[int] = Field(default=None, ge=1, le=16)
+    llm_config: Optional[Dict[str, Any]] = None
+
+
+class CodeGenResult(BaseModel):
+    """Resultado de um item do lote: código gerado ou mensagem de erro."""
+
+    index: int
+    code: Optional[str] = None
+    error: Optional[str] = None
+
+
 class LLMCodeOrchestrator:
-    def __init__(self, llm_client):
+    def __init__(
+        self,
+        llm_client: Any,
+        cache: Optional[LLMResponseCache] = None,
+        code_analyzer: Optional[CodeAnalyzer] = None,
+    ):
         """
         Aceita qualquer objeto com método async generate_code.
         Isso permite mocks e dublês em testes.
+        Se `cache` for informado, código já validado é reaproveitado para
+        requisições equivalentes (mesmo prompt normalizado e parâmetros).
+        O código é validado pelo `code_analyzer` (por padrão o compartilhado).
         """
         self.llm_client = llm_client
+        self.cache = cache
+        self.code_analyzer = code_analyzer or get_code_analyzer()
 
     async def generate_code(self, req: CodeGenRequest) -> str:
         with orchestrator_latency.time():
@@ -48,6 +87,14 @@ class LLMCodeOrchestrator:
                     if not req.prompt or len(req.prompt) < 10:
                         orchestrator_requests.labels(status="error").inc()
                         raise ValueError("Prompt muito curto para geração de código.")
+                    cache_key = self._cache_key(req)
+                    if self.cache is not None and cache_key is not None:
+                        cached = await self.cache.get(cache_key)
+                        span.set_attribute("cache_hit", cached is not None)
+                        if cached is not None:
+                            orchestrator_requests.labels(status="success").inc()
+                            span.set_status(Status(StatusCode.OK))
+                            return cached
                     # Sempre executa fluxo de sanitização e validação, mesmo se monkeypatchado
                     code = await self.llm_client.generate_code(
                         prompt=req.prompt,
@@ -55,9 +102,13 @@ class LLMCodeOrchestrator:
                         max_tokens=req.max_tokens,
                         extra_params=req.extra_params,
                     )
-                    code = self._sanitize_code(code)
-                    self._validate_code(code)
-                    self._validate_semantics(code)
+                    code = str(code)
+                    verdict = self.code_analyzer.evaluate(code)
+                    self._validate_code(code, verdict)
+                    self._validate_semantics(code, verdict)
+                    if self.cache is not None and cache_key is not None:
+                        # Só código já sanitizado e validado entra no cache
+                        await self.cache.set(cache_key, str(code))
                     orchestrator_requests.labels(status="success").inc()
                     span.set_status(Status(StatusCode.OK))
                     return str(code)
@@ -70,37 +121,141 @@ class LLMCodeOrchestrator:
                     span.record_exception(e)
                     raise
 
-    def _sanitize_code(self, code: str) -> str:
-        # Remove execuções perigosas e imports proibidos
-        dangerous = [
-            r"import os",
-            r"import sys",
-            r"exec(",
-            r"eval(",
-            r"subprocess",
-            r"open(",
-        ]
-        for pattern in dangerous:
-            try:
-                code = re.sub(
-                    pattern, "# REMOVIDO POR SEGURANÇA", code, flags=re.IGNORECASE
-                )
-            except re.error as e:
-                logger.error(
-                    "Regex inválido em _sanitize_code", error=str(e), pattern=pattern
-                )
-        return code
-
-    def _validate_code(self, code: str) -> None:
-        # Exemplo: valida se é Python e não contém comandos proibidos
-        if "# REMOVIDO POR SEGURANÇA" in code:
-            raise ValueError("Código gerado contém comandos inseguros.")
+    async def generate_many(
+        self, reqs: Sequence[CodeGenRequest], concurrency: int = 4
+    ) -> AsyncGenerator[CodeGenResult, None]:
+        """Gera código para vários pedidos com no máximo `concurrency` em paralelo.
+
+        Os resultados são produzidos na ordem em que terminam (use `index`
+        para correlacioná-los); a falha de um item não interrompe os demais.
+        Fechar o iterador cancela os itens ainda pendentes.
+        """
+        orchestrator_batch_size.observe(len(reqs))
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run(index: int, req: CodeGenRequest) -> CodeGenResult:
+            async with semaphore:
+                try:
+                    return CodeGenResult(
+                        index=index, code=await self.generate_code(req)
+                    )
+                except Exception as e:
+                    return CodeGenResult(index=index, error=str(e))
+
+        tasks = [asyncio.ensure_future(run(i, req)) for i, req in enumerate(reqs)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Aguarda os cancelados para não deixar tasks (e exceções) órfãs
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def stream_code(self, req: CodeGenRequest) -> AsyncGenerator[str, None]:
+        """Gera código em streaming, repassando os trechos conforme chegam.
+
+        As construções proibidas são verificadas incrementalmente sobre o
+        buffer acumulado; ao encontrar uma, o stream upstream é fechado
+        imediatamente (economizando tokens) e um ValueError é levantado. A
+        validação completa roda ao final, antes de o código ir para o cache.
+        """
+        if not req.prompt or len(req.prompt) < 10:
+            orchestrator_requests.labels(status="error").inc()
+            raise ValueError("Prompt muito curto para geração de código.")
+        # Span sem contexto corrente: o gerador pode ser consumido em outra task
+        span = tracer.start_span("llm_orchestrator.stream_code")
+        span.set_attribute("prompt_len", len(req.prompt))
+        started = time.perf_counter()
+        aborted = False
+        try:
+            cache_key = self._cache_key(req)
+            if self.cache is not None and cache_key is not None:
+                cached = await self.cache.get(cache_key)
+                span.set_attribute("cache_hit", cached is not None)
+                if cached is not None:
+                    orchestrator_requests.labels(status="success").inc()
+                    span.set_status(Status(StatusCode.OK))
+                    yield cached
+                    return
+            code = ""
+            upstream = self.llm_client.stream_code(
+                prompt=req.prompt,
+                temperature=req.temperature,
+                max_tokens=req.max_tokens,
+                extra_params=req.extra_params,
+            )
+            async with aclosing(upstream) as chunks:
+                async for chunk in chunks:
+                    # Só a cauda que pode conter um padrão novo é reexaminada
+                    scan_from = max(0, len(code) - default_scanner.max_pattern_len + 1)
+                    code += chunk
+                    pattern = self._find_dangerous_pattern(code, scan_from)
+                    if pattern is not None:
+                        aborted = True
+                        orchestrator_requests.labels(status="aborted").inc()
+                        span.set_attribute("aborted_pattern", pattern)
+                        span.set_attribute("aborted_at", len(code))
+                        logger.warning(
+                            "llm_stream_abortado",
+                            pattern=pattern,
+                            chars=len(code),
+                        )
+                        raise ValueError("Código gerado contém comandos inseguros.")
+                    yield chunk
+            verdict = self.code_analyzer.evaluate(code)
+            self._validate_code(code, verdict)
+            self._validate_semantics(code, verdict)
+            if self.cache is not None and cache_key is not None:
+                await self.cache.set(cache_key, code)
+            orchestrator_requests.labels(status="success").inc()
+            span.set_status(Status(StatusCode.OK))
+        except Exception as e:
+            if not aborted:
+                orchestrator_requests.labels(status="error").inc()
+            logger.error("Erro no orquestrador LLM (stream)", error=str(e))
+            span.set_status(Status(StatusCode.ERROR))
+            span.record_exception(e)
+            raise
+        finally:
+            orchestrator_latency.observe(time.perf_counter() - started)
+            span.end()
+
+    @staticmethod
+    def _find_dangerous_pattern(code: str, start: int = 0) -> Optional[str]:
+        """Retorna o primeiro padrão proibido presente em code[start:]."""
+        match = default_scanner.first_match(code, start)
+        return match.pattern if match is not None else None
+
+    def _cache_key(self, req: CodeGenRequest) -> Optional[str]:
+        """Chave de cache da requisição, ou None se ela não for cacheável."""
+        if self.cache is None or not self.cache.is_cacheable(req.temperature):
+            return None
+        return make_cache_key(
+            prompt=req.prompt,
+            model=getattr(self.llm_client, "model", None),
+            family=getattr(self.llm_client, "family", None),
+            temperature=req.temperature,
+            max_tokens=req.max_tokens,
+            extra_params=req.extra_params,
+        )
+
+    def _validate_code(self, code: str, verdict: Optional[CodeVerdict] = None) -> None:
+        # Valida tamanho, sintaxe e construções proibidas pela análise da AST
         if len(code.strip()) < 10:
             raise ValueError("Código gerado muito curto ou vazio.")
+        verdict = verdict or self.code_analyzer.evaluate(code)
+        if not verdict.syntax_ok:
+            raise ValueError("Código gerado não é Python válido.")
+        if not verdict.is_safe:
+            raise ValueError("Código gerado contém comandos inseguros.")
 
-    def _validate_semantics(self, code: str) -> None:
+    def _validate_semantics(
+        self, code: str, verdict: Optional[CodeVerdict] = None
+    ) -> None:
         # Validação semântica simples: verifica se há pelo menos uma função Python
-        if not re.search(r"def \w+\(.*\):", code):
+        verdict = verdict or self.code_analyzer.evaluate(code)
+        if not verdict.has_function:
             logger.warning(
                 "Código gerado não contém função Python detectada", code=code
             )
@@ -0,0 +1,194 @@
+"""
+Cache de respostas do LLM endereçado por conteúdo.
+
+A chave é o SHA-256 de uma forma normalizada da requisição (prompt com
+espaços colapsados, modelo, família, temperatura, max_tokens e parâmetros
+extras). Há um tier em memória (LRU com TTL) e um tier opcional em disco
+(SQLite). Apenas código já sanitizado e validado pelo orquestrador deve ser
+armazenado.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import structlog
+from prometheus_client import Counter
+
+logger = structlog.get_logger()
+
+llm_cache_events = Counter(
+    "llm_response_cache_events_total",
+    "Eventos do cache de respostas do LLM (hit, miss, store, evict)",
+    ["tier", "event"],
+)
+
+
+def make_cache_key(
+    prompt: str,
+    model: Optional[str],
+    family: Optional[str],
+    temperature: float,
+    max_tokens: int,
+    extra_params: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Gera a chave de cache a partir da requisição normalizada."""
+    normalized = {
+        "prompt": " ".join(prompt.split()),
+        "model": model or "",
+        "family": family or "",
+        "temperature": round(float(temperature), 4),
+        "max_tokens": int(max_tokens),
+        "extra_params": extra_params or {},
+    }
+    raw = json.dumps(normalized, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _SQLiteTier:
+    """Tier persistente em SQLite (acesso síncrono, chamado via thread)."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, code TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT code, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                llm_cache_events.labels(tier="sqlite", event="evict").inc()
+                return None
+            return str(row[0])
+
+    def set(self, key: str, code: str, expires_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, code, expires_at) "
+                "VALUES (?, ?, ?)",
+                (key, code, expires_at),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class LLMResponseCache:
+    """Cache em dois níveis (memória + SQLite opcional) para código gerado."""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 3600.0,
+        sqlite_path: Optional[str] = None,
+        max_cacheable_temperature: float = 0.0,
+    ) -> None:
+        """
+        Args:
+            max_entries: Capacidade do LRU em memória.
+            ttl_seconds: Validade de cada entrada.
+            sqlite_path: Caminho do tier persistente (None desativa).
+            max_cacheable_temperature: Maior temperatura considerada
+                determinística o bastante para cache (padrão: apenas 0).
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_cacheable_temperature = max_cacheable_temperature
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = _SQLiteTier(sqlite_path) if sqlite_path else None
+
+    @classmethod
+    def from_env(cls) -> Optional["LLMResponseCache"]:
+        """Cria o cache a partir das variáveis LLM_CACHE_* (None se desativado)."""
+        if os.getenv("LLM_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+            return None
+        return cls(
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512")),
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL", "3600")),
+            sqlite_path=os.getenv("LLM_CACHE_SQLITE_PATH") or None,
+            max_cacheable_temperature=float(
+                os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0")
+            ),
+        )
+
+    def is_cacheable(self, temperature: float) -> bool:
+        """Só requisições (quase) determinísticas são cacheadas."""
+        return temperature <= self.max_cacheable_temperature
+
+    async def get(self, key: str) -> Optional[str]:
+        """Busca o código no LRU e, em caso de miss, no tier SQLite."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    llm_cache_events.labels(tier="memory", event="hit").inc()
+                    return entry[1]
+                del self._memory[key]
+                llm_cache_events.labels(tier="memory", event="evict").inc()
+        llm_cache_events.labels(tier="memory", event="miss").inc()
+        if self._disk is None:
+            return None
+        try:
+            code = await asyncio.to_thread(self._disk.get, key, now)
+        except sqlite3.Error as e:
+            # Arquivo bloqueado ou corrompido conta como miss, não como falha
+            logger.warning("llm_cache_sqlite_erro", error=str(e))
+            code = None
+        if code is None:
+            llm_cache_events.labels(tier="sqlite", event="miss").inc()
+            return None
+        llm_cache_events.labels(tier="sqlite", event="hit").inc()
+        self._store_memory(key, code, now + self.ttl_seconds)
+        return code
+
+    async def set(self, key: str, code: str) -> None:
+        """Armazena código já validado nos dois tiers."""
+        expires_at = time.time() + self.ttl_seconds
+        self._store_memory(key, code, expires_at)
+        llm_cache_events.labels(tier="memory", event="store").inc()
+        if self._disk is not None:
+            try:
+                await asyncio.to_thread(self._disk.set, key, code, expires_at)
+                llm_cache_events.labels(tier="sqlite", event="store").inc()
+            except sqlite3.Error as e:
+                logger.warning("llm_cache_sqlite_erro", error=str(e))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def _store_memory(self, key: str, code: str, expires_at: float) -> None:
+        with self._lock:
+            self._memory[key] = (expires_at, code)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                llm_cache_events.labels(tier="memory", event="evict").inc()
@@ -0,0 +1,205 @@
+"""Cache de bytecode compilado das tools geradas.
+
+O mesmo código validado é executado muitas vezes (validação, testes e
+chamadas em produção). Este cache compila cada código uma única vez, pelo
+SHA-256 do fonte, e guarda:
+
+- em memória, um LRU limitado com o objeto de código e seus bytes
+  `marshal` (que é o que os processos de execução da sandbox recebem);
+- em disco, o `marshal` precedido do número mágico do interpretador, em
+  `<diretório>/__pycache__/<hash>.<cache_tag>.toolc`, onde o diretório é o
+  de TOOL_BYTECODE_DIR ou, para tools registradas, o mesmo dos arquivos
+  gravados por `expand_and_register_tool`.
+
+Arquivos de outro interpretador ou corrompidos são ignorados e
+recompilados.
+"""
+
+import hashlib
+import importlib.util
+import marshal
+import os
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from types import CodeType
+from typing import Optional
+
+import structlog
+from prometheus_client import Counter, Gauge
+
+# Configuração do logger
+logger = structlog.get_logger(__name__)
+
+# Métricas Prometheus
+BYTECODE_CACHE_LOOKUPS = Counter(
+    "tool_bytecode_cache_total",
+    "Consultas ao cache de bytecode das tools",
+    ["result"],
+)
+BYTECODE_CACHE_SIZE = Gauge(
+    "tool_bytecode_cache_size",
+    "Objetos de código mantidos em memória pelo cache de bytecode",
+)
+
+_MAGIC = importlib.util.MAGIC_NUMBER
+_SUFFIX = f".{sys.implementation.cache_tag}.toolc"
+
+
+class CompiledTool:
+    """Código compilado de uma tool e sua forma serializada."""
+
+    __slots__ = ("code_hash", "code", "data")
+
+    def __init__(self, code_hash: str, code: CodeType, data: bytes) -> None:
+        self.code_hash = code_hash
+        self.code = code
+        self.data = data
+
+
+class BytecodeCache:
+    """Compila código de tools uma vez por hash, em memória e em disco."""
+
+    def __init__(self, directory: Optional[str] = None, max_entries: int = 256) -> None:
+        """Inicializa o cache.
+
+        Args:
+            directory: Diretório base do cache em disco (None: só memória)
+            max_entries: Objetos de código mantidos em memória
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CompiledTool]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "BytecodeCache":
+        """Cria o cache a partir de TOOL_BYTECODE_DIR e TOOL_BYTECODE_CACHE_SIZE."""
+        return cls(
+            directory=os.getenv("TOOL_BYTECODE_DIR") or None,
+            max_entries=int(os.getenv("TOOL_BYTECODE_CACHE_SIZE", "256")),
+        )
+
+    @staticmethod
+    def hash_code(code: str) -> str:
+        return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+    def path_for(
+        self, code_hash: str, directory: Optional[str] = None
+    ) -> Optional[str]:
+        """Caminho do bytecode em disco (None se não houver diretório)."""
+        directory = directory or self.directory
+        if not directory:
+            return None
+        return os.path.join(directory, "__pycache__", code_hash + _SUFFIX)
+
+    def get(self, code: str, directory: Optional[str] = None) -> CompiledTool:
+        """Retorna o código compilado, compilando só se não estiver em cache.
+
+        Args:
+            code: Código fonte da tool
+            directory: Diretório do cache em disco para esta consulta
+                (padrão: o do cache)
+
+        Raises:
+            SyntaxError: Se o código não compilar
+        """
+        code_hash = self.hash_code(code)
+        with self._lock:
+            entry = self._entries.get(code_hash)
+            if entry is not None:
+                self._entries.move_to_end(code_hash)
+        if entry is not None:
+            BYTECODE_CACHE_LOOKUPS.labels(result="memory_hit").inc()
+            if directory is not None:
+                # Diretório explícito (nova tool gravada): garante o arquivo
+                path = self.path_for(code_hash, directory)
+                if path and not os.path.exists(path):
+                    self._store(entry, path)
+            return entry
+
+        path = self.path_for(code_hash, directory)
+        entry = self._load(code_hash, path) if path else None
+        if entry is not None:
+            BYTECODE_CACHE_LOOKUPS.labels(result="disk_hit").inc()
+        else:
+            BYTECODE_CACHE_LOOKUPS.labels(result="miss").inc()
+            compiled = compile(code, f"<tool {code_hash[:12]}>", "exec")
+            entry = CompiledTool(code_hash, compiled, marshal.dumps(compiled))
+            if path:
+                self._store(entry, path)
+        self._remember(entry)
+        return entry
+
+    def clear(self) -> None:
+        """Esvazia o cache em memória (os arquivos em disco permanecem)."""
+        with self._lock:
+            self._entries.clear()
+            BYTECODE_CACHE_SIZE.set(0)
+
+    def _remember(self, entry: CompiledTool) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[entry.code_hash] = entry
+            self._entries.move_to_end(entry.code_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            BYTECODE_CACHE_SIZE.set(len(self._entries))
+
+    def _load(self, code_hash: str, path: str) -> Optional[CompiledTool]:
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            return None
+        if not raw.startswith(_MAGIC):
+            return None
+        data = raw[len(_MAGIC) :]
+        try:
+            code = marshal.loads(data)
+        except (EOFError, ValueError, TypeError):
+            logger.warning("bytecode_invalido", path=path)
+            return None
+        if not isinstance(code, CodeType):
+            return None
+        return CompiledTool(code_hash, code, data)
+
+    def _store(self, entry: CompiledTool, path: str) -> None:
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            # Escrita atômica: leitores nunca veem um arquivo pela metade
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(_MAGIC + entry.data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            # Sem disco o cache continua funcionando só em memória
+            logger.warning("falha_gravar_bytecode", path=path, error=str(e))
+
+
+# Cache compartilhado pelo processo
+_bytecode_cache: Optional[BytecodeCache] = None
+_bytecode_cache_lock = threading.Lock()
+
+
+def get_bytecode_cache() -> BytecodeCache:
+    """Retorna o cache compartilhado, criando-o na primeira chamada."""
+    global _bytecode_cache
+    if _bytecode_cache is None:
+        with _bytecode_cache_lock:
+            if _bytecode_cache is None:
+                _bytecode_cache = BytecodeCache.from_env()
+    return _bytecode_cache
+
+
+def set_bytecode_cache(cache: Optional[BytecodeCache]) -> None:
+    """Substitui o cache compartilhado (uso em testes)."""
+    global _bytecode_cache
+    _bytecode_cache = cache
@@ -0,0 +1,340 @@
+"""Analisador estático de código gerado.
+
+Este módulo valida código Python gerado percorrendo a AST uma única vez:
+imports, chamadas e acessos a atributos proibidos e presença de funções
+são verificados na mesma travessia. Qualquer atributo ou string "dunder"
+(`__self__`, `"__globals__"`) é proibido, assim como as funções de acesso
+reflexivo (`getattr`, `vars`, `globals`...), que alcançariam os mesmos
+objetos por nomes montados em tempo de execução. O veredito é memoizado pelo SHA-256 do
+código em um LRU limitado, de modo que gerador, validador e sandbox
+analisam cada tool de fato só uma vez.
+"""
+
+import ast
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+import structlog
+from opentelemetry import trace
+from prometheus_client import Counter, Gauge
+
+# Configuração do logger
+logger = structlog.get_logger(__name__)
+tracer = trace.get_tracer(__name__)
+
+# Métricas Prometheus
+code_analyzer_cache_total = Counter(
+    "code_analyzer_cache_total",
+    "Consultas ao cache de vereditos do analisador de código",
+    ["result"],
+)
+code_analyzer_cache_size = Gauge(
+    "code_analyzer_cache_size",
+    "Vereditos mantidos no cache do analisador de código",
+)
+
+FORBIDDEN_IMPORTS = frozenset(
+    {
+        "builtins",
+        "ctypes",
+        "importlib",
+        "multiprocessing",
+        "os",
+        "pty",
+        "shutil",
+        "socket",
+        "subprocess",
+        "sys",
+    }
+)
+FORBIDDEN_CALLS = frozenset(
+    {
+        "__import__",
+        "breakpoint",
+        "compile",
+        "delattr",
+        "eval",
+        "exec",
+        "getattr",
+        "globals",
+        "locals",
+        "open",
+        "setattr",
+        "vars",
+    }
+)
+FORBIDDEN_ATTRIBUTES = frozenset(
+    {
+        "__bases__",
+        "__builtins__",
+        "__code__",
+        "__globals__",
+        "__mro__",
+        "__subclasses__",
+    }
+)
+
+# Penalidade no score por severidade de cada problema encontrado
+SEVERITY_PENALTY = {"high": 0.4, "medium": 0.15, "low": 0.05}
+
+# Incrementar a cada mudança na análise que altere vereditos: relatórios de
+# validação em cache de outra versão são descartados
+ANALYZER_VERSION = 2
+
+
+def _is_dunder(name: str) -> bool:
+    return len(name) > 4 and name.startswith("__") and name.endswith("__")
+
+
+@dataclass(frozen=True)
+class CodeVerdict:
+    """Resultado imutável da análise de um trecho de código."""
+
+    code_hash: str
+    syntax_ok: bool
+    functions: Tuple[str, ...]
+    issues: Tuple[Dict[str, Any], ...]
+
+    @property
+    def is_safe(self) -> bool:
+        return self.syntax_ok and not any(
+            issue["severity"] == "high" for issue in self.issues
+        )
+
+    @property
+    def has_function(self) -> bool:
+        return bool(self.functions)
+
+    @property
+    def score(self) -> float:
+        """Score de segurança de 0.0 a 1.0 (0.0 se o código não compila)."""
+        if not self.syntax_ok:
+            return 0.0
+        penalty = sum(SEVERITY_PENALTY.get(i["severity"], 0.0) for i in self.issues)
+        return round(max(0.0, 1.0 - penalty), 4)
+
+
+@dataclass
+class AnalyzerRules:
+    """Conjuntos de construções proibidas verificadas na AST."""
+
+    forbidden_imports: FrozenSet[str] = FORBIDDEN_IMPORTS
+    forbidden_calls: FrozenSet[str] = FORBIDDEN_CALLS
+    forbidden_attributes: FrozenSet[str] = FORBIDDEN_ATTRIBUTES
+
+    def fingerprint(self) -> str:
+        """Hash curto das regras, parte da versão do analisador."""
+        raw = "|".join(
+            ",".join(sorted(names))
+            for names in (
+                self.forbidden_imports,
+                self.forbidden_calls,
+                self.forbidden_attributes,
+            )
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:12]
+
+
+class _Visitor(ast.NodeVisitor):
+    """Coleta funções e problemas em uma única travessia da árvore."""
+
+    def __init__(self, rules: AnalyzerRules) -> None:
+        self.rules = rules
+        self.functions: List[str] = []
+        self.issues: List[Dict[str, Any]] = []
+
+    def _issue(self, node: ast.AST, kind: str, name: str, description: str) -> None:
+        self.issues.append(
+            {
+                "type": kind,
+                "name": name,
+                "severity": "high",
+                "line": getattr(node, "lineno", 0),
+                "description": description,
+            }
+        )
+
+    def _check_module(self, node: ast.AST, module: str) -> None:
+        root = module.split(".", 1)[0]
+        if root in self.rules.forbidden_imports:
+            self._issue(node, "forbidden_import", module, f"Import proibido: {module}")
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            self._check_module(node, alias.name)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if node.module and not node.level:
+            self._check_module(node, node.module)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self.functions.append(node.name)
+        self.generic_visit(node)
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef) -> None:
+        self.functions.append(node.name)
+        self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call) -> None:
+        func = node.func
+        if isinstance(func, ast.Name) and func.id in self.rules.forbidden_calls:
+            self._issue(
+                node, "forbidden_call", func.id, f"Chamada proibida: {func.id}()"
+            )
+        self.generic_visit(node)
+
+    def visit_Name(self, node: ast.Name) -> None:
+        # Acesso a __builtins__ como nome solto
+        if node.id in self.rules.forbidden_attributes:
+            self._issue(
+                node, "forbidden_attribute", node.id, f"Acesso proibido: {node.id}"
+            )
+
+    def visit_Attribute(self, node: ast.Attribute) -> None:
+        if node.attr in self.rules.forbidden_attributes or _is_dunder(node.attr):
+            self._issue(
+                node,
+                "forbidden_attribute",
+                node.attr,
+                f"Acesso proibido ao atributo {node.attr}",
+            )
+        self.generic_visit(node)
+
+    def visit_Constant(self, node: ast.Constant) -> None:
+        # Nome de atributo especial guardado em string (ex.: getattr)
+        if isinstance(node.value, str) and _is_dunder(node.value):
+            self._issue(
+                node,
+                "forbidden_string",
+                node.value,
+                f"String com nome especial proibida: {node.value}",
+            )
+
+
+class CodeAnalyzer:
+    """Analisador de código com cache LRU de vereditos por SHA-256.
+
+    Além do método síncrono `evaluate`, expõe as interfaces assíncronas
+    esperadas pelos componentes de auto-extensão: `analyze` (ToolValidator),
+    `validate` (ToolGenerator) e `scan_for_vulnerabilities` (SecuritySandbox).
+    """
+
+    def __init__(
+        self, rules: Optional[AnalyzerRules] = None, cache_size: int = 1024
+    ) -> None:
+        self.rules = rules or AnalyzerRules()
+        self.cache_size = cache_size
+        # Versão da lógica e das regras; muda quando os vereditos podem mudar
+        self.version = f"{ANALYZER_VERSION}-{self.rules.fingerprint()}"
+        self._cache: "OrderedDict[str, CodeVerdict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "CodeAnalyzer":
+        """Cria o analisador com o tamanho de cache de CODE_ANALYZER_CACHE_SIZE."""
+        return cls(cache_size=int(os.getenv("CODE_ANALYZER_CACHE_SIZE", "1024")))
+
+    @staticmethod
+    def hash_code(code: str) -> str:
+        return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+    def evaluate(self, code: str) -> CodeVerdict:
+        """Retorna o veredito do código, analisando só se não estiver em cache."""
+        code_hash = self.hash_code(code)
+        with self._lock:
+            verdict = self._cache.get(code_hash)
+            if verdict is not None:
+                self._cache.move_to_end(code_hash)
+        if verdict is not None:
+            code_analyzer_cache_total.labels(result="hit").inc()
+            return verdict
+        code_analyzer_cache_total.labels(result="miss").inc()
+        verdict = self._analyze(code, code_hash)
+        if self.cache_size > 0:
+            with self._lock:
+                self._cache[code_hash] = verdict
+                self._cache.move_to_end(code_hash)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+                code_analyzer_cache_size.set(len(self._cache))
+        return verdict
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            code_analyzer_cache_size.set(0)
+
+    def _analyze(self, code: str, code_hash: str) -> CodeVerdict:
+        with tracer.start_as_current_span("code_analyzer.analyze") as span:
+            span.set_attribute("code_len", len(code))
+            try:
+                tree = ast.parse(code)
+            except (SyntaxError, ValueError) as e:
+                issue = {
+                    "type": "syntax_error",
+                    "name": type(e).__name__,
+                    "severity": "high",
+                    "line": getattr(e, "lineno", 0) or 0,
+                    "description": f"Código não é Python válido: {e}",
+                }
+                return CodeVerdict(code_hash, False, (), (issue,))
+            visitor = _Visitor(self.rules)
+            visitor.visit(tree)
+            verdict = CodeVerdict(
+                code_hash, True, tuple(visitor.functions), tuple(visitor.issues)
+            )
+            span.set_attribute("issues", len(verdict.issues))
+            if verdict.issues:
+                logger.warning(
+                    "codigo_com_problemas",
+                    code_hash=code_hash[:12],
+                    issues=[i["name"] for i in verdict.issues],
+                )
+            return verdict
+
+    async def analyze(self, code: str) -> Dict[str, Any]:
+        """Interface do ToolValidator: score, issues e passed."""
+        verdict = self.evaluate(code)
+        return {
+            "score": verdict.score,
+            "issues": [dict(issue) for issue in verdict.issues],
+            "passed": verdict.is_safe,
+        }
+
+    async def validate(self, code: str, spec: Any = None) -> Dict[str, Any]:
+        """Interface do ToolGenerator (a especificação não altera o veredito)."""
+        return await self.analyze(code)
+
+    async def scan_for_vulnerabilities(self, code: str) -> Dict[str, Any]:
+        """Interface do SecuritySandbox: is_safe, vulnerabilities e risk_score."""
+        verdict = self.evaluate(code)
+        return {
+            "is_safe": verdict.is_safe,
+            "vulnerabilities": [dict(issue) for issue in verdict.issues],
+            "risk_score": round(1.0 - verdict.score, 4),
+        }
+
+
+# Analisador compartilhado pelo processo
+_code_analyzer: Optional[CodeAnalyzer] = None
+_code_analyzer_lock = threading.Lock()
+
+
+def get_code_analyzer() -> CodeAnalyzer:
+    """Retorna o analisador compartilhado, criando-o na primeira chamada."""
+    global _code_analyzer
+    if _code_analyzer is None:
+        with _code_analyzer_lock:
+            if _code_analyzer is None:
+                _code_analyzer = CodeAnalyzer.from_env()
+    return _code_analyzer
+
+
+def set_code_analyzer(analyzer: Optional[CodeAnalyzer]) -> None:
+    """Substitui o analisador compartilhado (uso em testes)."""
+    global _code_analyzer
+    _code_analyzer = analyzer
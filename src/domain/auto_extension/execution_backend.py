@@ -0,0 +1,651 @@
+"""Backends de execução de código de tools em processos isolados.
+
+Cada execução roda em um processo filho que aplica limites de tempo de
+CPU, espaço de endereçamento e arquivos abertos (`setrlimit`), recebe
+código e parâmetros por um pipe (em `marshal`) e devolve o resultado por
+outro, em registros JSON de tamanho limitado (ver `sandbox_worker`): o
+processo da API não desserializa `marshal` escrito pelo código não
+confiável. Se o prazo expirar, o filho é morto com SIGKILL. Há dois modos
+(SANDBOX_EXEC_MODE):
+
+- `forkserver` (padrão): um processo zygote enxuto, iniciado uma vez e com
+  os módulos aprovados já importados, faz o `fork()`. O filho nasce de um
+  processo pequeno e sem threads, o que barateia a criação e mantém a
+  memória compartilhada por copy-on-write;
+- `fork`: o próprio processo da API faz `fork()` a cada execução. Como a
+  API tem threads (executor do asyncio, exportadores), um lock tomado por
+  outra thread no momento do fork fica preso no filho; use apenas em
+  processos de thread única.
+
+O código é compilado uma vez por hash (`BytecodeCache`) e os filhos
+recebem o bytecode serializado, sem recompilar. Ele recebe os parâmetros
+na variável global `params`; o valor da variável global `result` ao final
+é devolvido ao chamador, junto com o que foi escrito em `sys.stdout`.
+
+`run_batch` executa o mesmo código para vários conjuntos de parâmetros em
+um único filho, que carrega o bytecode uma vez e devolve cada caso assim
+que ele termina.
+"""
+
+import abc
+import asyncio
+import itertools
+import json
+import marshal
+import math
+import os
+import signal
+import socket
+import time
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+import structlog
+from prometheus_client import Histogram
+
+from .bytecode_cache import BytecodeCache, get_bytecode_cache
+from .sandbox_worker import (
+    APPROVED_STDLIB_MODULES,
+    EXITED,
+    FRAME,
+    MAX_FRAME_BYTES,
+    MESSAGE,
+    READY,
+    REQUEST,
+    SPAWNED,
+    ExecutionLimits,
+    worker_main,
+    zygote_command,
+)
+
+# Configuração do logger
+logger = structlog.get_logger(__name__)
+
+# Métricas Prometheus
+SANDBOX_WORKER_SPAWN = Histogram(
+    "sandbox_worker_spawn_seconds",
+    "Tempo para criar o processo de execução da sandbox",
+    ["mode"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+
+_READ_CHUNK = 65536
+# Chamado com o pid do filho antes de ele receber o código (ex.: monitor)
+SpawnCallback = Callable[[int], Awaitable[None]]
+# Raiz do repositório, para o zygote importar o pacote `src`
+_PROJECT_ROOT = str(Path(__file__).resolve().parents[3])
+
+
+class _Worker:
+    """Processo de execução em andamento e os pipes do lado da API."""
+
+    __slots__ = ("pid", "request_fd", "response_fd", "exec_id")
+
+    def __init__(
+        self, request_fd: int, response_fd: int, pid: int, exec_id: int = 0
+    ) -> None:
+        self.pid = pid
+        self.request_fd = request_fd
+        self.response_fd = response_fd
+        self.exec_id = exec_id
+
+
+class _WorkerBackend(abc.ABC):
+    """Execução de casos em processos filhos; os modos só criam e coletam
+    os processos (`_launch`, `_exit_status` e `_release`)."""
+
+    mode = ""
+    # Prefixo do erro quando não é possível criar o processo
+    unavailable_error = "Falha ao criar o processo de execução"
+
+    limits: ExecutionLimits
+    bytecode_cache: BytecodeCache
+
+    async def run(
+        self,
+        code: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        workdir: Optional[str] = None,
+        on_spawn: Optional[SpawnCallback] = None,
+    ) -> Dict[str, Any]:
+        """Executa `code` em um processo filho.
+
+        Args:
+            code: Código Python a ser executado
+            params: Parâmetros expostos ao código como `params`
+            timeout: Prazo em segundos (padrão: limits.timeout_seconds)
+            workdir: Diretório de trabalho do processo filho
+            on_spawn: Recebe o pid do filho antes de o código ser enviado
+
+        Returns:
+            Dict com `status` ("success", "error" ou "timeout") e, conforme
+            o caso, `result`, `output` e `error`
+        """
+        # Consome tudo: o último passo coleta o processo filho
+        responses = [
+            response
+            async for _, _, response in self._run_cases(
+                code, [params], timeout, workdir, on_spawn
+            )
+        ]
+        return responses[0]
+
+    async def run_batch(
+        self,
+        code: str,
+        params_list: Sequence[Optional[Dict[str, Any]]],
+        timeout: Optional[float] = None,
+        workdir: Optional[str] = None,
+        on_spawn: Optional[SpawnCallback] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Executa `code` uma vez para cada conjunto de parâmetros.
+
+        Os casos rodam em sequência em um mesmo filho, cada um com seu
+        próprio namespace, e são gerados assim que terminam. O prazo vale
+        por caso: um caso que estoura o prazo ou derruba o processo é
+        reportado como falha e os seguintes continuam em um filho novo
+        (`on_spawn` é chamado para cada filho).
+
+        Yields:
+            Dict de `run` acrescido de `index` (posição em `params_list`) e
+            `duration_ms`
+        """
+        async for index, elapsed, response in self._run_cases(
+            code, params_list, timeout, workdir, on_spawn
+        ):
+            response["index"] = index
+            response["duration_ms"] = round(elapsed * 1000, 3)
+            yield response
+
+    async def _run_cases(
+        self,
+        code: str,
+        cases: Sequence[Optional[Dict[str, Any]]],
+        timeout: Optional[float],
+        workdir: Optional[str],
+        on_spawn: Optional[SpawnCallback],
+    ) -> AsyncIterator[Tuple[int, float, Dict[str, Any]]]:
+        """Gera (índice, segundos, resposta) de cada caso."""
+        timeout = self.limits.timeout_seconds if timeout is None else timeout
+        try:
+            compiled = self.bytecode_cache.get(code)
+        except SyntaxError as e:
+            for index in range(len(cases)):
+                yield index, 0.0, {"status": "error", "error": f"SyntaxError: {e}"}
+            return
+
+        pending: List[Tuple[int, bytes]] = []
+        for index, params in enumerate(cases):
+            try:
+                pending.append((index, marshal.dumps(params or {})))
+            except ValueError as e:
+                yield index, 0.0, {
+                    "status": "error",
+                    "error": f"Parâmetros não serializáveis: {e}",
+                }
+
+        while pending:
+            request = marshal.dumps(
+                (compiled.data, [params for _, params in pending], workdir)
+            )
+            case_started = time.monotonic()
+            try:
+                # O limite de CPU do filho cobre todos os casos restantes
+                worker = await self._launch(timeout * len(pending), timeout)
+            except asyncio.TimeoutError:
+                index = pending.pop(0)[0]
+                yield index, timeout, _timeout_response(None, timeout)
+                continue
+            except (OSError, RuntimeError) as e:
+                error = f"{self.unavailable_error}: {e}"
+                for index, _ in pending:
+                    yield index, 0.0, {"status": "error", "error": error}
+                return
+
+            received = 0
+            exit_status: Optional[int] = None
+            failure: Optional[Dict[str, Any]] = None
+            try:
+                if on_spawn is not None:
+                    await on_spawn(worker.pid)
+                deadline = time.monotonic() + timeout
+                await _write_request(worker.request_fd, request, deadline)
+                os.close(worker.request_fd)
+                worker.request_fd = -1
+                reader = _FrameReader(worker.response_fd)
+                while received < len(pending):
+                    frame = await reader.next(deadline)
+                    if frame is None:
+                        break
+                    elapsed, response = frame
+                    yield pending[received][0], elapsed, response
+                    received += 1
+                    # O prazo do próximo caso conta a partir daqui
+                    case_started = time.monotonic()
+                    deadline = case_started + timeout
+                exit_status = await self._exit_status(worker, deadline)
+            except asyncio.TimeoutError:
+                pass
+            except _FrameError as e:
+                failure = {"status": "error", "error": str(e)}
+            except (OSError, RuntimeError) as e:
+                failure = {"status": "error", "error": f"{self.unavailable_error}: {e}"}
+            finally:
+                # Prazo expirado, cancelamento ou erro no pai
+                self._release(worker, exited=exit_status is not None)
+
+            if received == len(pending):
+                return
+            if failure is None:
+                if exit_status is None:
+                    failure = _timeout_response(worker.pid, timeout)
+                else:
+                    failure = _exit_response(exit_status)
+            yield pending[received][0], time.monotonic() - case_started, failure
+            pending = pending[received + 1 :]
+
+    @abc.abstractmethod
+    async def _launch(self, budget: float, timeout: float) -> _Worker:
+        """Cria o filho; `budget` é o prazo total, usado no limite de CPU."""
+
+    @abc.abstractmethod
+    async def _exit_status(self, worker: _Worker, deadline: float) -> Optional[int]:
+        """Status de saída do filho; None se o prazo acabar antes."""
+
+    @abc.abstractmethod
+    def _release(self, worker: _Worker, exited: bool) -> None:
+        """Fecha os pipes e mata o filho se ele não tiver terminado."""
+
+
+class ForkExecutionBackend(_WorkerBackend):
+    """Executa código em processos filhos com rlimits e prazo rígido."""
+
+    mode = "fork"
+
+    def __init__(
+        self,
+        limits: Optional[ExecutionLimits] = None,
+        bytecode_cache: Optional[BytecodeCache] = None,
+    ) -> None:
+        self.limits = limits or ExecutionLimits()
+        self.bytecode_cache = bytecode_cache or get_bytecode_cache()
+
+    async def close(self) -> None:
+        """Nada a liberar: cada execução tem seu próprio processo."""
+
+    async def _launch(self, budget: float, timeout: float) -> _Worker:
+        if not hasattr(os, "fork"):
+            raise OSError("execução isolada requer fork()")
+        started = time.perf_counter()
+        pid, request_fd, response_fd = self._spawn(budget)
+        SANDBOX_WORKER_SPAWN.labels(mode=self.mode).observe(
+            time.perf_counter() - started
+        )
+        return _Worker(request_fd, response_fd, pid=pid)
+
+    async def _exit_status(self, worker: _Worker, deadline: float) -> Optional[int]:
+        return await _wait_exit(worker.pid, deadline)
+
+    def _release(self, worker: _Worker, exited: bool) -> None:
+        if worker.request_fd != -1:
+            os.close(worker.request_fd)
+        os.close(worker.response_fd)
+        if not exited:
+            _kill(worker.pid)
+
+    def _spawn(self, timeout: float) -> Tuple[int, int, int]:
+        request_r, request_w = os.pipe()
+        response_r, response_w = os.pipe()
+        try:
+            pid = os.fork()
+        except BaseException:
+            for fd in (request_r, request_w, response_r, response_w):
+                os.close(fd)
+            raise
+        if pid == 0:  # pragma: no cover - executado no processo filho
+            os.close(request_w)
+            os.close(response_r)
+            worker_main(request_r, response_w, self.limits, timeout)
+        os.close(request_r)
+        os.close(response_w)
+        os.set_blocking(request_w, False)
+        os.set_blocking(response_r, False)
+        return pid, request_w, response_r
+
+
+class ForkServerBackend(_WorkerBackend):
+    """Executa código em filhos de um zygote com módulos pré-carregados.
+
+    O zygote é iniciado na primeira execução (ou em `start`) e reiniciado
+    se morrer. Os pipes de cada execução são criados aqui e entregues ao
+    zygote junto com a requisição; ele responde com o pid do filho e, ao
+    coletá-lo, com seu status de saída.
+    """
+
+    mode = "forkserver"
+    unavailable_error = "Zygote indisponível"
+
+    def __init__(
+        self,
+        limits: Optional[ExecutionLimits] = None,
+        preload: Iterable[str] = APPROVED_STDLIB_MODULES,
+        start_timeout: float = 10.0,
+        bytecode_cache: Optional[BytecodeCache] = None,
+    ) -> None:
+        self.limits = limits or ExecutionLimits()
+        self.bytecode_cache = bytecode_cache or get_bytecode_cache()
+        self.preload = tuple(preload)
+        self.start_timeout = start_timeout
+        self._ids = itertools.count(1)
+        self._process: Optional[asyncio.subprocess.Process] = None
+        self._control: Optional[socket.socket] = None
+        self._ready: Optional["asyncio.Future[int]"] = None
+        self._spawned: Dict[int, "asyncio.Future[int]"] = {}
+        self._exited: Dict[int, "asyncio.Future[int]"] = {}
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._control is not None
+
+    async def start(self) -> None:
+        """Inicia o zygote e aguarda o pré-carregamento dos módulos."""
+        async with self._start_lock:
+            if self._control is not None:
+                return
+            loop = asyncio.get_running_loop()
+            control, remote = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+            try:
+                # Ambiente mínimo: o zygote e seus filhos não herdam os
+                # segredos do processo da API (nem em /proc/<pid>/environ)
+                env = {
+                    "PYTHONPATH": os.pathsep.join(
+                        filter(None, [_PROJECT_ROOT, os.getenv("PYTHONPATH")])
+                    )
+                }
+                self._process = await asyncio.create_subprocess_exec(
+                    *zygote_command(remote.fileno(), self.limits, self.preload),
+                    pass_fds=(remote.fileno(),),
+                    env=env,
+                )
+            except BaseException:
+                control.close()
+                raise
+            finally:
+                remote.close()
+            control.setblocking(False)
+            self._control = control
+            self._ready = loop.create_future()
+            loop.add_reader(control, self._on_message)
+            try:
+                await asyncio.wait_for(self._ready, self.start_timeout)
+            except BaseException:
+                await self.close()
+                raise
+            logger.info(
+                "sandbox_zygote_started",
+                pid=self._process.pid,
+                preload=list(self.preload),
+            )
+
+    async def close(self) -> None:
+        """Encerra o zygote; ele mata os filhos que ainda estiverem rodando."""
+        control, self._control = self._control, None
+        if control is not None:
+            asyncio.get_running_loop().remove_reader(control)
+            control.close()
+        self._fail_pending(RuntimeError("zygote encerrado"))
+        process, self._process = self._process, None
+        if process is not None and process.returncode is None:
+            try:
+                await asyncio.wait_for(process.wait(), 2.0)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+
+    async def _launch(self, budget: float, timeout: float) -> _Worker:
+        await self.start()
+        control = self._control
+        if control is None:
+            raise RuntimeError("zygote encerrado")
+        loop = asyncio.get_running_loop()
+        exec_id = next(self._ids)
+        spawned = self._spawned[exec_id] = loop.create_future()
+        self._exited[exec_id] = loop.create_future()
+        request_r, request_w = os.pipe()
+        response_r, response_w = os.pipe()
+        try:
+            started = time.perf_counter()
+            try:
+                socket.send_fds(
+                    control, [REQUEST.pack(exec_id, budget)], [request_r, response_w]
+                )
+            finally:
+                os.close(request_r)
+                os.close(response_w)
+            pid = await asyncio.wait_for(spawned, timeout)
+        except BaseException:
+            # Sem pid não há o que matar: o filho, se nascer, lê o fim do
+            # pipe de requisição e sai
+            os.close(request_w)
+            os.close(response_r)
+            self._spawned.pop(exec_id, None)
+            self._exited.pop(exec_id, None)
+            raise
+        SANDBOX_WORKER_SPAWN.labels(mode=self.mode).observe(
+            time.perf_counter() - started
+        )
+        os.set_blocking(request_w, False)
+        os.set_blocking(response_r, False)
+        return _Worker(request_w, response_r, pid=pid, exec_id=exec_id)
+
+    async def _exit_status(self, worker: _Worker, deadline: float) -> Optional[int]:
+        try:
+            return await asyncio.wait_for(
+                self._exited[worker.exec_id], deadline - time.monotonic()
+            )
+        except asyncio.TimeoutError:
+            return None
+
+    def _release(self, worker: _Worker, exited: bool) -> None:
+        if worker.request_fd != -1:
+            os.close(worker.request_fd)
+        os.close(worker.response_fd)
+        self._spawned.pop(worker.exec_id, None)
+        self._exited.pop(worker.exec_id, None)
+        if not exited:
+            # O zygote coleta o filho; aqui basta garantir que ele morra
+            try:
+                os.kill(worker.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def _on_message(self) -> None:
+        control = self._control
+        while control is not None:
+            try:
+                data = control.recv(MESSAGE.size)
+            except BlockingIOError:
+                return
+            except OSError:
+                data = b""
+            if not data:
+                logger.error("sandbox_zygote_encerrado")
+                asyncio.get_running_loop().remove_reader(control)
+                control.close()
+                self._control = None
+                self._fail_pending(RuntimeError("zygote encerrado"))
+                return
+            kind, exec_id, value = MESSAGE.unpack(data)
+            if kind == READY:
+                waiter = self._ready
+            elif kind == SPAWNED:
+                waiter = self._spawned.get(exec_id)
+            elif kind == EXITED:
+                waiter = self._exited.get(exec_id)
+            else:
+                waiter = None
+            if waiter is not None and not waiter.done():
+                waiter.set_result(value)
+
+    def _fail_pending(self, error: Exception) -> None:
+        waiters = [self._ready, *self._spawned.values(), *self._exited.values()]
+        for waiter in waiters:
+            if waiter is not None and not waiter.done():
+                waiter.set_exception(error)
+
+
+def create_execution_backend(
+    limits: Optional[ExecutionLimits] = None, mode: Optional[str] = None
+) -> Any:
+    """Cria o backend do modo informado (padrão: SANDBOX_EXEC_MODE ou forkserver)."""
+    mode = mode or os.getenv("SANDBOX_EXEC_MODE", ForkServerBackend.mode)
+    if mode == ForkExecutionBackend.mode:
+        return ForkExecutionBackend(limits)
+    if mode == ForkServerBackend.mode:
+        return ForkServerBackend(limits)
+    raise ValueError(f"Modo de execução desconhecido: {mode}")
+
+
+class _FrameError(Exception):
+    """Registro do filho fora do protocolo; o filho é descartado."""
+
+
+class _FrameReader:
+    """Lê as respostas de um filho à medida que cada caso termina."""
+
+    def __init__(self, fd: int) -> None:
+        self.fd = fd
+        self._buffer = bytearray()
+        self._eof = False
+
+    async def next(self, deadline: float) -> Optional[Tuple[float, Dict[str, Any]]]:
+        """Próximo caso (segundos, resposta); None no fim do pipe.
+
+        Raises:
+            asyncio.TimeoutError: Se nenhum caso chegar até `deadline`
+            _FrameError: Se o registro exceder MAX_FRAME_BYTES
+        """
+        while True:
+            if len(self._buffer) >= FRAME.size:
+                (size,) = FRAME.unpack_from(self._buffer)
+                if size > MAX_FRAME_BYTES:
+                    raise _FrameError(f"Resposta excede {MAX_FRAME_BYTES} bytes")
+                end = FRAME.size + size
+                if len(self._buffer) >= end:
+                    data = bytes(self._buffer[FRAME.size : end])
+                    del self._buffer[:end]
+                    return _decode_frame(data)
+            if self._eof:
+                # Um registro incompleto no fim é de um filho que morreu
+                return None
+            try:
+                data = os.read(self.fd, _READ_CHUNK)
+            except BlockingIOError:
+                await _wait_fd(self.fd, deadline - time.monotonic())
+                continue
+            except OSError:
+                data = b""
+            if data:
+                self._buffer += data
+            else:
+                self._eof = True
+
+
+async def _write_request(fd: int, data: bytes, deadline: float) -> None:
+    """Escreve `data` no pipe não bloqueante `fd` sem travar o event loop."""
+    view = memoryview(data)
+    while view:
+        try:
+            view = view[os.write(fd, view) :]
+        except BlockingIOError:
+            await _wait_fd(fd, deadline - time.monotonic(), writable=True)
+        except BrokenPipeError:
+            # O filho morreu antes de ler; o status de saída explica o motivo
+            return
+
+
+async def _wait_fd(fd: int, timeout: float, writable: bool = False) -> None:
+    loop = asyncio.get_running_loop()
+    ready: "asyncio.Future[None]" = loop.create_future()
+
+    def on_ready() -> None:
+        if not ready.done():
+            ready.set_result(None)
+
+    if writable:
+        loop.add_writer(fd, on_ready)
+    else:
+        loop.add_reader(fd, on_ready)
+    try:
+        await asyncio.wait_for(ready, timeout)
+    finally:
+        if writable:
+            loop.remove_writer(fd)
+        else:
+            loop.remove_reader(fd)
+
+
+async def _wait_exit(pid: int, deadline: float) -> Optional[int]:
+    """Aguarda o filho terminar; None se o prazo acabar antes."""
+    # O filho fecha o pipe de resposta logo antes de sair
+    delay = 0.0001
+    while True:
+        waited, status = os.waitpid(pid, os.WNOHANG)
+        if waited:
+            return status
+        if time.monotonic() >= deadline:
+            return None
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.01)
+
+
+def _kill(pid: int) -> None:
+    try:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+    except (ProcessLookupError, ChildProcessError):
+        pass
+
+
+def _timeout_response(pid: Optional[int], timeout: float) -> Dict[str, Any]:
+    logger.warning("sandbox_worker_killed", pid=pid, timeout=timeout)
+    return {"status": "timeout", "error": f"Tempo limite excedido: {timeout}s"}
+
+
+def _decode_frame(data: bytes) -> Tuple[float, Dict[str, Any]]:
+    try:
+        elapsed, response = json.loads(data)
+    except (ValueError, TypeError, RecursionError):
+        elapsed, response = 0.0, None
+    if not isinstance(elapsed, (int, float)) or not math.isfinite(elapsed):
+        elapsed = 0.0
+    if not isinstance(response, dict):
+        response = {"status": "error", "error": "Resposta inválida do processo"}
+    return elapsed, response
+
+
+def _exit_response(exit_status: int) -> Dict[str, Any]:
+    """Resposta de um filho que terminou sem responder ao caso."""
+    if os.WIFSIGNALED(exit_status):
+        signum = os.WTERMSIG(exit_status)
+        return {
+            "status": "error",
+            "error": f"Processo encerrado pelo sinal {signal.Signals(signum).name}",
+        }
+    return {
+        "status": "error",
+        "error": f"Processo encerrado sem resposta (código {os.waitstatus_to_exitcode(exit_status)})",
+    }
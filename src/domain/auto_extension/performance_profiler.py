@@ -0,0 +1,292 @@
+"""Perfil de desempenho de tools geradas, medido na sandbox.
+
+A tool é executada na sandbox junto com um harness que chama a função
+principal (`spec.name`) repetidas vezes, com argumentos de exemplo
+derivados de `spec.parameters`, e mede por chamada:
+
+- `wall_ms`: tempo de parede (mediana e p95);
+- `cpu_ms`: tempo de CPU do processo (mediana);
+- `peak_rss_mb`: crescimento do pico de RSS do processo durante o perfil;
+- `allocated_kb`: pico de memória alocada por uma chamada (`tracemalloc`,
+  em uma chamada à parte para não distorcer os tempos).
+
+Os números são comparados com o orçamento do `security_level` da tool: cada
+métrica vale 1.0 dentro do orçamento e `orçamento / medido` acima dele, e o
+score é o da pior métrica (o dobro do orçamento dá 0.5).
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+import structlog
+from prometheus_client import Histogram
+
+# Configuração do logger
+logger = structlog.get_logger(__name__)
+
+# Métricas Prometheus
+TOOL_PERFORMANCE_SCORE = Histogram(
+    "auto_extension_tool_performance_score",
+    "Score de desempenho medido das tools, por nível de segurança",
+    ["security_level"],
+    buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 1.0),
+)
+
+
+@dataclass
+class PerformanceBudget:
+    """Orçamento por chamada de uma tool."""
+
+    wall_ms: float
+    cpu_ms: float
+    peak_rss_mb: float
+    allocated_kb: float
+
+
+# Níveis mais privilegiados rodam em contextos mais sensíveis e recebem
+# orçamentos mais apertados
+DEFAULT_PERFORMANCE_BUDGETS: Dict[str, PerformanceBudget] = {
+    "standard": PerformanceBudget(
+        wall_ms=100.0, cpu_ms=100.0, peak_rss_mb=64.0, allocated_kb=16384.0
+    ),
+    "elevated": PerformanceBudget(
+        wall_ms=50.0, cpu_ms=50.0, peak_rss_mb=32.0, allocated_kb=8192.0
+    ),
+    "admin": PerformanceBudget(
+        wall_ms=25.0, cpu_ms=25.0, peak_rss_mb=16.0, allocated_kb=4096.0
+    ),
+}
+
+# Valores de exemplo por tipo de parâmetro (JSON Schema)
+_SAMPLE_VALUES: Dict[str, Any] = {
+    "string": "exemplo",
+    "number": 1.5,
+    "integer": 1,
+    "boolean": True,
+    "array": [],
+    "object": {},
+}
+
+# Anexado ao código da tool; roda no processo de execução da sandbox
+_HARNESS = """
+
+def __skyhal_profile(params):
+    import resource
+    import time
+    import tracemalloc
+
+    function = globals().get(params["function"])
+    if not callable(function):
+        return {"error": "Função " + params["function"] + " não encontrada"}
+    kwargs = params["kwargs"]
+    errors = []
+
+    def call():
+        try:
+            function(**kwargs)
+        except Exception as e:
+            errors.append(type(e).__name__ + ": " + str(e))
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    for _ in range(params["warmup"]):
+        call()
+    wall, cpu = [], []
+    for _ in range(params["iterations"]):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        call()
+        cpu.append(time.process_time() - cpu_start)
+        wall.append(time.perf_counter() - wall_start)
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    call()
+    allocated = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    wall.sort()
+    cpu.sort()
+    return {
+        "wall": wall[len(wall) // 2],
+        "wall_p95": wall[max(0, -(-len(wall) * 95 // 100) - 1)],
+        "cpu": cpu[len(cpu) // 2],
+        "rss_kb": max(0, rss_after - rss_before),
+        "allocated": allocated,
+        "errors": len(errors),
+        "last_error": errors[-1] if errors else None,
+    }
+
+result = __skyhal_profile(params)
+"""
+
+
+def sample_arguments(parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Argumentos de exemplo para a função da tool a partir do schema."""
+    kwargs = {}
+    for name, schema in parameters.items():
+        schema = schema if isinstance(schema, dict) else {}
+        if "default" in schema:
+            kwargs[name] = schema["default"]
+        elif schema.get("enum"):
+            kwargs[name] = schema["enum"][0]
+        else:
+            kwargs[name] = _SAMPLE_VALUES.get(str(schema.get("type")), "exemplo")
+    return kwargs
+
+
+class PerformanceProfiler:
+    """Mede o desempenho de tools na sandbox e calcula o score."""
+
+    def __init__(
+        self,
+        executor: Any,
+        budgets: Optional[Dict[str, PerformanceBudget]] = None,
+        iterations: int = 20,
+        warmup: int = 2,
+        timeout: float = 10.0,
+    ) -> None:
+        """Inicializa o profiler.
+
+        Args:
+            executor: Executor com `execute_code` (ex.: SecuritySandbox)
+            budgets: Orçamento por `security_level` (padrão:
+                DEFAULT_PERFORMANCE_BUDGETS)
+            iterations: Chamadas medidas por perfil
+            warmup: Chamadas descartadas antes de medir
+            timeout: Prazo da execução do perfil inteiro, em segundos
+        """
+        self.executor = executor
+        self.budgets = budgets or DEFAULT_PERFORMANCE_BUDGETS
+        self.iterations = max(1, iterations)
+        self.warmup = max(0, warmup)
+        self.timeout = timeout
+
+    def budget_for(self, security_level: Optional[str]) -> PerformanceBudget:
+        """Orçamento do nível (níveis desconhecidos usam o de `standard`)."""
+        return self.budgets.get(security_level or "", self.budgets["standard"])
+
+    async def profile(
+        self, tool: Any, environment_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Executa o perfil de `tool` e compara com o orçamento do nível.
+
+        Args:
+            tool: GeneratedTool a medir
+            environment_id: Ambiente do executor onde rodar, se houver
+
+        Returns:
+            Dict com `status` ("measured", "failed" ou "skipped"), `score`
+            (None se não medido), `metrics`, `budget` e `issues`
+        """
+        security_level = getattr(tool.spec, "security_level", None) or "standard"
+        budget = self.budget_for(security_level)
+        params = {
+            "function": tool.spec.name,
+            "kwargs": sample_arguments(tool.spec.parameters or {}),
+            "iterations": self.iterations,
+            "warmup": self.warmup,
+        }
+        outcome = await self.executor.execute_code(
+            tool.code + _HARNESS, params, environment_id, self.timeout
+        )
+        status = outcome.get("status")
+        measured = outcome.get("result")
+
+        if status == "timeout":
+            profile = self._failed(budget, f"Perfil excedeu o prazo de {self.timeout}s")
+        elif status != "success":
+            profile = self._failed(budget, f"Perfil falhou: {outcome.get('error')}")
+        elif not isinstance(measured, dict) or "error" in measured:
+            # Sem a função principal não há o que medir
+            profile = {
+                "status": "skipped",
+                "score": None,
+                "reason": (
+                    measured.get("error")
+                    if isinstance(measured, dict)
+                    else "Resultado do perfil ausente"
+                ),
+                "metrics": {},
+                "budget": asdict(budget),
+                "issues": [],
+            }
+        else:
+            profile = self._score(self._metrics(measured), budget)
+
+        profile["security_level"] = security_level
+        if profile["score"] is not None:
+            TOOL_PERFORMANCE_SCORE.labels(security_level=security_level).observe(
+                profile["score"]
+            )
+        logger.info(
+            "perfil_desempenho",
+            tool_id=tool.tool_id,
+            status=profile["status"],
+            score=profile["score"],
+            metrics=profile["metrics"],
+        )
+        return profile
+
+    def _metrics(self, measured: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "iterations": self.iterations,
+            "wall_ms": round(measured["wall"] * 1000, 3),
+            "wall_p95_ms": round(measured["wall_p95"] * 1000, 3),
+            "cpu_ms": round(measured["cpu"] * 1000, 3),
+            "peak_rss_mb": round(measured["rss_kb"] / 1024, 2),
+            "allocated_kb": round(measured["allocated"] / 1024, 1),
+            "errors": measured["errors"],
+            "last_error": measured["last_error"],
+        }
+
+    @staticmethod
+    def _score(metrics: Dict[str, Any], budget: PerformanceBudget) -> Dict[str, Any]:
+        scores = {}
+        issues: List[Dict[str, Any]] = []
+        for name, limit in asdict(budget).items():
+            value = metrics[name]
+            scores[name] = 1.0 if value <= limit else round(limit / value, 3)
+            if value > limit:
+                issues.append(
+                    {
+                        "type": "performance",
+                        "metric": name,
+                        "severity": "high" if scores[name] < 0.5 else "medium",
+                        "description": (
+                            f"{name} de {value} acima do orçamento de {limit}"
+                        ),
+                    }
+                )
+        if metrics["errors"]:
+            # Os tempos medidos incluem o caminho de erro
+            issues.append(
+                {
+                    "type": "performance",
+                    "severity": "low",
+                    "description": (
+                        f"{metrics['errors']} chamadas com argumentos de exemplo "
+                        f"falharam: {metrics['last_error']}"
+                    ),
+                }
+            )
+        return {
+            "status": "measured",
+            "score": min(scores.values()),
+            "metric_scores": scores,
+            "metrics": metrics,
+            "budget": asdict(budget),
+            "issues": issues,
+        }
+
+    @staticmethod
+    def _failed(budget: PerformanceBudget, description: str) -> Dict[str, Any]:
+        return {
+            "status": "failed",
+            "score": 0.0,
+            "metrics": {},
+            "budget": asdict(budget),
+            "issues": [
+                {
+                    "type": "performance",
+                    "severity": "high",
+                    "description": description,
+                }
+            ],
+        }
@@ -3,6 +3,7 @@ Interfaces para providers de geração de código e especificação (LLM, templa
 Atende à especificação técnica em docs/especificacoes-tecnicas/llm-auto-extensao.md.
 """
 
+import time
 from typing import Any, Dict, Optional, Protocol
 
 import structlog
@@ -102,11 +103,17 @@ class TemplateCodeProvider:
 class LLMCodeProvider:
     """Provider que gera código usando LLM externa (OpenAI, Anthropic, etc.)."""
 
-    def __init__(self, llm_config: Dict[str, Any]):
+    def __init__(self, llm_config: Dict[str, Any], circuit_breaker: Any = None):
         self.llm_config = llm_config
+        self.circuit_breaker = circuit_breaker
         self.logger = logger.bind(provider="LLMCodeProvider")
 
     async def generate(self, spec: ToolSpec, prompt: Optional[str] = None) -> str:
+        breaker = self.circuit_breaker
+        if breaker is not None and not breaker.allow_request():
+            self.logger.warning("circuito_llm_aberto", tool=spec.name)
+            raise ProviderError("Circuito aberto para o provedor LLM")
+        started = time.perf_counter()
         try:
             # Monta payload dinâmico
             _ = self._build_payload(spec, prompt)  # payload pode ser usado futuramente
@@ -119,11 +126,19 @@ class LLMCodeProvider:
             # response = await httpx.post(...)
             # code = self._parse_response(response)
             code = "# Código gerado pela LLM (placeholder)"
+            if breaker is not None:
+                breaker.record_success(time.perf_counter() - started)
             self.logger.info("codigo_gerado_llm", tool=spec.name)
             return str(code)
         except Exception as e:
+            if breaker is not None:
+                breaker.record_failure()
             self.logger.error("erro_llm_provider", error=str(e), tool=spec.name)
             raise ProviderError(f"Erro ao gerar código via LLM: {e}") from e
+        except BaseException:
+            if breaker is not None:
+                breaker.release()
+            raise
 
     def _build_payload(self, spec: ToolSpec, prompt: Optional[str]) -> Dict[str, Any]:
         # Monta payload conforme config e prompt
@@ -149,6 +164,10 @@ class HybridCodeProvider:
             elif self.mode == "template":
                 return str(await self.template_provider.generate(spec, prompt))
             else:  # hybrid
+                if not self._llm_available():
+                    # Circuito aberto: evita pagar o timeout do provedor LLM
+                    self.logger.warning("fallback_template_circuito", tool=spec.name)
+                    return str(await self.template_provider.generate(spec, prompt))
                 try:
                     return str(await self.llm_provider.generate(spec, prompt))
                 except ProviderError:
@@ -157,3 +176,8 @@ class HybridCodeProvider:
         except Exception as e:
             self.logger.error("erro_hybrid_provider", error=str(e), tool=spec.name)
             raise ProviderError(f"Erro no HybridCodeProvider: {e}") from e
+
+    def _llm_available(self) -> bool:
+        """False se o circuit breaker do provider LLM estiver aberto."""
+        breaker = getattr(self.llm_provider, "circuit_breaker", None)
+        return breaker is None or not breaker.is_open
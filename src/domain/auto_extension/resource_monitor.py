@@ -0,0 +1,314 @@
+"""Monitor de recursos dos processos de execução da sandbox.
+
+Lê `/proc/<pid>/stat`, `/proc/<pid>/status` e `/proc/<pid>/io` de cada
+processo de execução em um timer asyncio e aplica os limites enquanto a
+tool roda: ao cruzar `cpu_percent`, `memory_mb` ou `io_operations`, o
+processo é morto com SIGKILL na hora, em vez de só ser reprovado depois
+de terminar.
+
+- `cpu_percent`: média de uso de CPU desde o início da execução; só é
+  aplicada após `cpu_grace` segundos, para não punir rajadas curtas;
+- `memory_mb`: RSS acima do que o processo tinha ao ser anexado (o filho
+  de um fork já nasce com as páginas do pai);
+- `io_operations`: chamadas de sistema de leitura e escrita (syscr + syscw).
+
+Quem coleta o processo é o backend (ou o zygote), não o monitor: depois
+disso o pid pode ser reaproveitado por outro processo. Por isso o monitor
+segura um pidfd do processo (Linux 5.3+), que continua se referindo a ele
+mesmo depois de coletado, e sinaliza por ele. Sem pidfd, cada amostra e o
+SIGKILL só valem se o instante de início em `/proc/<pid>/stat` ainda for
+o do processo anexado.
+"""
+
+import asyncio
+import os
+import signal
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+from prometheus_client import Counter
+
+# Configuração do logger
+logger = structlog.get_logger(__name__)
+
+# Métricas Prometheus
+SANDBOX_RESOURCE_KILLS = Counter(
+    "sandbox_resource_kills_total",
+    "Processos de execução mortos pelo monitor de recursos, por limite",
+    ["resource"],
+)
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+# Nome do limite -> nome curto usado em `exceeded`
+LIMIT_NAMES = {"cpu_percent": "cpu", "memory_mb": "memory", "io_operations": "io"}
+
+
+def read_proc_sample(pid: int) -> Optional[Tuple[float, float, int]]:
+    """Lê (segundos de CPU, RSS em MB, operações de IO) de `/proc/<pid>`.
+
+    Returns:
+        None se o processo não existir mais
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+        with open(f"/proc/{pid}/status", "rb") as f:
+            status = f.read()
+    except OSError:
+        return None
+    # O nome do processo (2º campo) pode conter espaços e parênteses
+    fields = stat[stat.rfind(b")") + 2 :].split()
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+    rss_mb = 0.0
+    start = status.find(b"VmRSS:")
+    if start != -1:
+        rss_mb = int(status[start + 6 : status.find(b"kB", start)]) / 1024
+    return cpu_seconds, rss_mb, _read_io_operations(pid)
+
+
+def read_start_time(pid: int) -> Optional[int]:
+    """Instante de início do processo, em ticks desde o boot.
+
+    Returns:
+        None se o processo não existir mais
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            stat = f.read()
+    except OSError:
+        return None
+    return int(stat[stat.rfind(b")") + 2 :].split()[19])
+
+
+def _open_pidfd(pid: int) -> Optional[int]:
+    """pidfd de `pid`; None se a plataforma não oferecer pidfd."""
+    pidfd_open = getattr(os, "pidfd_open", None)
+    if pidfd_open is None or not hasattr(signal, "pidfd_send_signal"):
+        return None
+    try:
+        fd: int = pidfd_open(pid)
+    except OSError:
+        return None
+    return fd
+
+
+def _read_io_operations(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/io", "rb") as f:
+            io_stats = f.read()
+    except OSError:
+        return 0
+    operations = 0
+    for line in io_stats.splitlines():
+        if line.startswith((b"syscr:", b"syscw:")):
+            operations += int(line.split()[1])
+    return operations
+
+
+class _Session:
+    """Estado de uma execução monitorada."""
+
+    __slots__ = (
+        "limits",
+        "pid",
+        "pidfd",
+        "start_time",
+        "started",
+        "ended",
+        "baseline_rss",
+        "cpu_seconds",
+        "memory_mb",
+        "io_operations",
+        "exceeded",
+        "task",
+    )
+
+    def __init__(self, limits: Dict[str, Any], started: float) -> None:
+        self.limits = limits
+        self.pid: Optional[int] = None
+        self.pidfd: Optional[int] = None
+        self.start_time: Optional[int] = None
+        self.started = started
+        self.ended: Optional[float] = None
+        self.baseline_rss: Optional[float] = None
+        self.cpu_seconds = 0.0
+        self.memory_mb = 0.0
+        self.io_operations = 0
+        self.exceeded: List[str] = []
+        self.task: Optional["asyncio.Task[None]"] = None
+
+
+class ResourceMonitor:
+    """Amostra e limita o uso de recursos dos processos de execução."""
+
+    def __init__(self, interval: float = 0.01, cpu_grace: float = 0.5) -> None:
+        """Inicializa o monitor.
+
+        Args:
+            interval: Intervalo entre amostras, em segundos
+            cpu_grace: Tempo de execução antes de aplicar `cpu_percent`
+        """
+        self.interval = interval
+        self.cpu_grace = cpu_grace
+        self._sessions: Dict[str, _Session] = {}
+
+    @classmethod
+    def from_env(cls) -> "ResourceMonitor":
+        """Cria o monitor a partir das variáveis RESOURCE_MONITOR_*."""
+        return cls(
+            interval=float(os.getenv("RESOURCE_MONITOR_INTERVAL", "0.01")),
+            cpu_grace=float(os.getenv("RESOURCE_MONITOR_CPU_GRACE", "0.5")),
+        )
+
+    async def start_monitoring(self, limits: Optional[Dict[str, Any]] = None) -> str:
+        """Abre uma sessão de monitoramento com os limites da execução.
+
+        Returns:
+            str: ID da sessão, usado em `track` e `get_usage`
+        """
+        monitor_id = str(uuid.uuid4())
+        self._sessions[monitor_id] = _Session(dict(limits or {}), time.monotonic())
+        return monitor_id
+
+    async def track(self, monitor_id: str, pid: int) -> None:
+        """Passa a amostrar `pid` até ele terminar ou a sessão ser encerrada."""
+        session = self._sessions[monitor_id]
+        session.pid = pid
+        session.pidfd = _open_pidfd(pid)
+        session.start_time = read_start_time(pid)
+        session.started = time.monotonic()
+        self._sample(session)
+        session.task = asyncio.get_running_loop().create_task(
+            self._sampling_loop(session)
+        )
+
+    async def get_usage(self, monitor_id: Optional[str] = None) -> Dict[str, Any]:
+        """Encerra a sessão e retorna o uso de recursos observado."""
+        session = self._sessions.pop(monitor_id, None) if monitor_id else None
+        if session is None:
+            return {
+                "cpu_percent": 0.0,
+                "memory_mb": 0.0,
+                "execution_time_ms": 0,
+                "io_operations": 0,
+            }
+        if session.task is not None:
+            session.task.cancel()
+        if session.pidfd is not None:
+            os.close(session.pidfd)
+            session.pidfd = None
+        return self._usage(session)
+
+    def killed_for(self, monitor_id: str) -> List[str]:
+        """Limites pelos quais o processo da sessão foi morto, sem encerrá-la."""
+        session = self._sessions.get(monitor_id)
+        return list(session.exceeded) if session is not None else []
+
+    async def check_limits(
+        self, usage: Dict[str, Any], limits: Dict[str, Any]
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Compara o uso com os limites.
+
+        Returns:
+            Tuple (dentro dos limites, {"exceeded": [...], "details": {...}})
+        """
+        exceeded = self._exceeded(usage, limits)
+        for name in usage.get("killed_for", []):
+            if name not in exceeded:
+                exceeded.append(name)
+        details = {
+            key: {"limit": limits[key], "actual": usage.get(key)}
+            for key, name in LIMIT_NAMES.items()
+            if name in exceeded and key in limits
+        }
+        return not exceeded, {"exceeded": exceeded, "details": details}
+
+    def _exceeded(self, usage: Dict[str, Any], limits: Dict[str, Any]) -> List[str]:
+        exceeded = []
+        for key, name in LIMIT_NAMES.items():
+            limit = limits.get(key)
+            if limit is None or usage.get(key, 0) <= limit:
+                continue
+            if key == "cpu_percent" and usage["execution_time_ms"] < (
+                self.cpu_grace * 1000
+            ):
+                continue
+            exceeded.append(name)
+        return exceeded
+
+    async def _sampling_loop(self, session: _Session) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self._sample(session):
+                break
+            exceeded = self._exceeded(self._usage(session), session.limits)
+            if exceeded:
+                session.exceeded = exceeded
+                self._kill(session)
+                break
+        session.ended = time.monotonic()
+
+    def _sample(self, session: _Session) -> bool:
+        if session.pid is None:
+            return False
+        sample = read_proc_sample(session.pid)
+        # Lido depois de coletado o processo, o pid pode ser de outro
+        if sample is None or not self._is_tracked_process(session):
+            return False
+        cpu_seconds, rss_mb, io_operations = sample
+        if session.baseline_rss is None:
+            session.baseline_rss = rss_mb
+        session.cpu_seconds = cpu_seconds
+        session.memory_mb = max(session.memory_mb, rss_mb - session.baseline_rss)
+        session.io_operations = io_operations
+        return True
+
+    def _usage(self, session: _Session) -> Dict[str, Any]:
+        ended = session.ended if session.ended is not None else time.monotonic()
+        elapsed = max(ended - session.started, 1e-6)
+        usage: Dict[str, Any] = {
+            "cpu_percent": round(min(session.cpu_seconds / elapsed, 1.0) * 100, 1),
+            "memory_mb": round(session.memory_mb, 1),
+            "execution_time_ms": int(elapsed * 1000),
+            "io_operations": session.io_operations,
+        }
+        if session.exceeded:
+            usage["killed_for"] = list(session.exceeded)
+        return usage
+
+    @staticmethod
+    def _is_tracked_process(session: _Session) -> bool:
+        """Se o processo anexado ainda não foi coletado."""
+        if session.pidfd is not None:
+            try:
+                signal.pidfd_send_signal(session.pidfd, 0)
+            except ProcessLookupError:
+                return False
+            return True
+        return (
+            session.pid is not None
+            and session.start_time is not None
+            and read_start_time(session.pid) == session.start_time
+        )
+
+    def _kill(self, session: _Session) -> None:
+        try:
+            if session.pidfd is not None:
+                signal.pidfd_send_signal(session.pidfd, signal.SIGKILL)
+            elif session.pid is not None and self._is_tracked_process(session):
+                os.kill(session.pid, signal.SIGKILL)
+            else:
+                return
+        except ProcessLookupError:
+            return
+        for name in session.exceeded:
+            SANDBOX_RESOURCE_KILLS.labels(resource=name).inc()
+        logger.warning(
+            "sandbox_worker_resource_kill",
+            pid=session.pid,
+            exceeded=session.exceeded,
+            usage=self._usage(session),
+        )
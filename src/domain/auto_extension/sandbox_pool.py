@@ -0,0 +1,273 @@
+"""Pool de sandboxes pré-aquecidos e reutilizáveis.
+
+Este módulo mantém ambientes de um provedor (objeto com `create_sandbox` e
+`destroy_sandbox` assíncronos e, opcionalmente, `reset_sandbox`) prontos
+para uso, em vez de criar e destruir um ambiente por validação ou execução:
+
+- entre `min_size` e `max_size` ambientes existem ao mesmo tempo;
+- empréstimo e devolução (`acquire`/`release` ou `lease`), com reset na
+  devolução;
+- reciclagem após `max_uses` empréstimos ou quando o reset falha;
+- ambientes ociosos há mais de `idle_timeout` são destruídos, respeitando
+  o mínimo, por uma tarefa de manutenção que também repõe o mínimo.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Optional
+
+import structlog
+from prometheus_client import Counter, Gauge, Histogram
+
+# Configuração do logger
+logger = structlog.get_logger(__name__)
+
+# Métricas Prometheus
+SANDBOX_POOL_SIZE = Gauge(
+    "sandbox_pool_size",
+    "Ambientes sandbox no pool por estado",
+    ["pool", "state"],
+)
+SANDBOX_POOL_LEASE_WAIT = Histogram(
+    "sandbox_pool_lease_wait_seconds",
+    "Espera para obter um ambiente sandbox do pool (inclui criação)",
+    ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+SANDBOX_POOL_RECYCLED = Counter(
+    "sandbox_pool_recycled_total",
+    "Ambientes sandbox destruídos pelo pool, por motivo",
+    ["pool", "reason"],
+)
+
+
+@dataclass
+class SandboxPoolConfig:
+    """Limites e políticas de reciclagem do pool de sandboxes."""
+
+    min_size: int = 0
+    max_size: int = 4
+    max_uses: int = 100
+    idle_timeout: float = 300.0
+    maintenance_interval: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "SandboxPoolConfig":
+        """Carrega a configuração a partir das variáveis SANDBOX_POOL_*."""
+        return cls(
+            min_size=int(os.getenv("SANDBOX_POOL_MIN_SIZE", "0")),
+            max_size=int(os.getenv("SANDBOX_POOL_MAX_SIZE", "4")),
+            max_uses=int(os.getenv("SANDBOX_POOL_MAX_USES", "100")),
+            idle_timeout=float(os.getenv("SANDBOX_POOL_IDLE_TIMEOUT", "300")),
+            maintenance_interval=float(
+                os.getenv("SANDBOX_POOL_MAINTENANCE_INTERVAL", "30")
+            ),
+        )
+
+
+class _PooledSandbox:
+    """Ambiente do pool e seu histórico de uso."""
+
+    __slots__ = ("sandbox", "uses", "idle_since")
+
+    def __init__(self, sandbox: Any, now: float) -> None:
+        self.sandbox = sandbox
+        self.uses = 0
+        self.idle_since = now
+
+
+class SandboxPool:
+    """Empresta ambientes de um provedor, com no máximo `max_size` existentes."""
+
+    def __init__(
+        self,
+        provider: Any,
+        config: Optional[SandboxPoolConfig] = None,
+        *,
+        max_size: Optional[int] = None,
+        name: str = "default",
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Inicializa o pool.
+
+        Args:
+            provider: Provedor com `create_sandbox` e `destroy_sandbox`
+                (e `reset_sandbox`, se os ambientes puderem ser reaproveitados)
+            config: Limites do pool (padrão: SandboxPoolConfig())
+            max_size: Sobrescreve `config.max_size`
+            name: Rótulo do pool nas métricas
+            clock: Relógio monotônico (injetável em testes)
+        """
+        self.provider = provider
+        self.config = config or SandboxPoolConfig()
+        self.max_size = max(1, max_size or self.config.max_size)
+        self.min_size = min(max(0, self.config.min_size), self.max_size)
+        self.name = name
+        self._clock = clock
+        self._idle: Deque[_PooledSandbox] = deque()
+        self._leased: Dict[int, _PooledSandbox] = {}
+        self._slots = asyncio.Semaphore(self.max_size)
+        self._creating = 0
+        self._closed = False
+        self._maintenance_task: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def size(self) -> int:
+        """Ambientes existentes (ociosos, emprestados e em criação)."""
+        return len(self._idle) + len(self._leased) + self._creating
+
+    async def start(self) -> None:
+        """Pré-aquece o mínimo de ambientes e inicia a manutenção periódica."""
+        await self.prewarm()
+        if self._maintenance_task is None or self._maintenance_task.done():
+            self._maintenance_task = asyncio.get_running_loop().create_task(
+                self._maintenance_loop()
+            )
+
+    async def prewarm(self) -> None:
+        """Cria ambientes ociosos até atingir `min_size`."""
+        missing = self.min_size - self.size
+        if missing > 0 and not self._closed:
+            await asyncio.gather(
+                *(self._add_idle() for _ in range(missing)), return_exceptions=True
+            )
+
+    async def acquire(self) -> Any:
+        """Empresta um ambiente ocioso ou cria um novo se houver vaga."""
+        if self._closed:
+            raise RuntimeError("Pool de sandboxes encerrado")
+        started = time.perf_counter()
+        await self._slots.acquire()
+        try:
+            if self._idle:
+                # LIFO: o mais recente está "quente"; os antigos envelhecem
+                entry = self._idle.pop()
+            else:
+                entry = _PooledSandbox(await self._create(), self._clock())
+        except BaseException:
+            self._slots.release()
+            raise
+        self._leased[id(entry.sandbox)] = entry
+        SANDBOX_POOL_LEASE_WAIT.labels(pool=self.name).observe(
+            time.perf_counter() - started
+        )
+        self._publish()
+        return entry.sandbox
+
+    async def release(self, sandbox: Any, discard: bool = False) -> None:
+        """Devolve o ambiente ao pool, resetando-o ou reciclando-o."""
+        entry = self._leased.pop(id(sandbox), None)
+        if entry is None:
+            # Não foi emprestado por este pool: apenas destrói
+            await self._destroy(sandbox, "foreign")
+            return
+        try:
+            entry.uses += 1
+            if discard or self._closed:
+                await self._destroy(sandbox, "discarded")
+            elif self.config.max_uses and entry.uses >= self.config.max_uses:
+                await self._destroy(sandbox, "max_uses")
+            elif not await self._reset(sandbox):
+                await self._destroy(sandbox, "reset_failed")
+            else:
+                entry.idle_since = self._clock()
+                self._idle.append(entry)
+        finally:
+            self._slots.release()
+            self._publish()
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[Any]:
+        """Empresta um ambiente pelo bloco; descarta-o se o bloco falhar."""
+        sandbox = await self.acquire()
+        failed = False
+        try:
+            yield sandbox
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            await self.release(sandbox, discard=failed)
+
+    async def evict_idle(self) -> int:
+        """Destrói ociosos além do mínimo há mais de `idle_timeout` segundos."""
+        if not self.config.idle_timeout:
+            return 0
+        deadline = self._clock() - self.config.idle_timeout
+        evicted = 0
+        # Os mais antigos ficam à esquerda
+        while (
+            self._idle
+            and self._idle[0].idle_since <= deadline
+            and self.size > self.min_size
+        ):
+            entry = self._idle.popleft()
+            await self._destroy(entry.sandbox, "idle")
+            evicted += 1
+        self._publish()
+        return evicted
+
+    async def close(self) -> None:
+        """Destrói os ociosos; os emprestados são destruídos na devolução."""
+        self._closed = True
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+            self._maintenance_task = None
+        idle, self._idle = self._idle, deque()
+        for entry in idle:
+            await self._destroy(entry.sandbox, "closed")
+        self._publish()
+
+    async def _maintenance_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.maintenance_interval)
+            try:
+                await self.evict_idle()
+                await self.prewarm()
+            except Exception as e:  # pragma: no cover - proteção do loop
+                logger.error("sandbox_pool_manutencao_erro", error=str(e))
+
+    async def _add_idle(self) -> None:
+        # Ocupa uma vaga durante a criação para não passar de max_size
+        async with self._slots:
+            if self.size >= self.max_size:
+                return
+            sandbox = await self._create()
+            if self._closed:
+                await self._destroy(sandbox, "closed")
+                return
+            self._idle.appendleft(_PooledSandbox(sandbox, self._clock()))
+        self._publish()
+
+    async def _create(self) -> Any:
+        self._creating += 1
+        try:
+            return await self.provider.create_sandbox()
+        finally:
+            self._creating -= 1
+
+    async def _reset(self, sandbox: Any) -> bool:
+        reset = getattr(self.provider, "reset_sandbox", None)
+        if reset is None:
+            return True
+        try:
+            await reset(sandbox)
+            return True
+        except Exception as e:
+            logger.warning("falha_resetar_sandbox", pool=self.name, error=str(e))
+            return False
+
+    async def _destroy(self, sandbox: Any, reason: str) -> None:
+        SANDBOX_POOL_RECYCLED.labels(pool=self.name, reason=reason).inc()
+        try:
+            await self.provider.destroy_sandbox(sandbox)
+        except Exception as e:
+            logger.warning("falha_destruir_sandbox", pool=self.name, error=str(e))
+
+    def _publish(self) -> None:
+        SANDBOX_POOL_SIZE.labels(pool=self.name, state="idle").set(len(self._idle))
+        SANDBOX_POOL_SIZE.labels(pool=self.name, state="leased").set(len(self._leased))
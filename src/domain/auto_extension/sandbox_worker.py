@@ -0,0 +1,386 @@
+"""Lado filho da execução isolada e processo zygote da sandbox.
+
+Este módulo roda fora do processo da API e, por isso, depende apenas da
+biblioteca padrão:
+
+- `worker_main` é o ponto de entrada de cada processo de execução: aplica
+  os rlimits, esvazia `os.environ` (segredos da API não chegam à tool), lê bytecode (ou fonte) e a lista de conjuntos de parâmetros
+  do pipe de requisição e executa o código uma vez por conjunto, escrevendo
+  no pipe de resposta um registro por caso assim que ele termina. A
+  requisição vem do processo da API em `marshal`; as respostas, escritas
+  pelo código não confiável, vão em JSON e com tamanho limitado
+  (`MAX_FRAME_BYTES`), para que a API nunca desserialize `marshal` vindo
+  do filho;
+- `zygote_main` é o fork server: pré-carrega os módulos aprovados e, a
+  cada requisição recebida pelo socket de controle (com os pipes da
+  execução anexados via SCM_RIGHTS), cria um filho com `fork()`, que
+  herda os módulos já importados por copy-on-write.
+
+    python -m src.domain.auto_extension.sandbox_worker <fd> <limites> <módulos>
+"""
+
+import builtins
+import gc
+import importlib
+import io
+import json
+import marshal
+import math
+import os
+import select
+import signal
+import socket
+import struct
+import sys
+import time
+from dataclasses import asdict, dataclass
+from types import CodeType, ModuleType
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+_resource: Optional[ModuleType]
+try:
+    import resource as _resource
+except ImportError:  # pragma: no cover - plataformas sem rlimits
+    _resource = None
+
+# Módulos da biblioteca padrão aprovados no prompt de sistema do MyAI
+# (src.infrastructure.llm_client_myai.SYSTEM_PROMPT)
+APPROVED_STDLIB_MODULES = (
+    "dataclasses",
+    "datetime",
+    "enum",
+    "json",
+    "logging",
+    "pathlib",
+    "re",
+    "shlex",
+    "string",
+    "typing",
+    "uuid",
+)
+
+# Protocolo do socket de controle (SOCK_SEQPACKET, uma mensagem por registro)
+# API -> zygote: (id da execução, prazo em segundos) + [request_r, response_w]
+REQUEST = struct.Struct("!Id")
+# zygote -> API: (tipo, id da execução, pid ou status de saída)
+MESSAGE = struct.Struct("!BIi")
+READY, SPAWNED, EXITED = 0, 1, 2
+# Filho -> API: um registro por caso, tamanho + JSON [segundos, resposta]
+FRAME = struct.Struct("!I")
+# Tamanho máximo de um registro; a API descarta o filho que o ultrapassar
+MAX_FRAME_BYTES = 4 * 1024 * 1024
+
+# Builtins retirados do namespace da tool: execução dinâmica de código,
+# acesso reflexivo a atributos e interação com o terminal
+BLOCKED_BUILTINS = frozenset(
+    {
+        "breakpoint",
+        "compile",
+        "delattr",
+        "eval",
+        "exec",
+        "getattr",
+        "help",
+        "input",
+        "locals",
+        "setattr",
+        "vars",
+    }
+)
+
+_READ_CHUNK = 65536
+_MB = 1024 * 1024
+
+
+@dataclass
+class ExecutionLimits:
+    """Limites aplicados a cada processo de execução."""
+
+    timeout_seconds: float = 5.0
+    # Tempo de CPU; por padrão o prazo de parede arredondado para cima
+    cpu_seconds: Optional[int] = None
+    # Espaço de endereçamento além do herdado do processo pai
+    memory_mb: int = 256
+    max_open_files: int = 32
+    max_output_bytes: int = 65536
+
+    @classmethod
+    def from_env(cls) -> "ExecutionLimits":
+        """Carrega os limites a partir das variáveis SANDBOX_EXEC_*."""
+        cpu_seconds = os.getenv("SANDBOX_EXEC_CPU_SECONDS")
+        return cls(
+            timeout_seconds=float(os.getenv("SANDBOX_EXEC_TIMEOUT", "5")),
+            cpu_seconds=int(cpu_seconds) if cpu_seconds else None,
+            memory_mb=int(os.getenv("SANDBOX_EXEC_MEMORY_MB", "256")),
+            max_open_files=int(os.getenv("SANDBOX_EXEC_MAX_OPEN_FILES", "32")),
+            max_output_bytes=int(os.getenv("SANDBOX_EXEC_MAX_OUTPUT_BYTES", "65536")),
+        )
+
+
+def read_all(fd: int) -> bytes:
+    """Lê `fd` (bloqueante) até o fim do arquivo."""
+    chunks: List[bytes] = []
+    while True:
+        data = os.read(fd, _READ_CHUNK)
+        if not data:
+            return b"".join(chunks)
+        chunks.append(data)
+
+
+def worker_main(
+    request_fd: int, response_fd: int, limits: ExecutionLimits, timeout: float
+) -> None:  # pragma: no cover - executado no processo filho
+    """Ponto de entrada do processo de execução; nunca retorna.
+
+    `timeout` é o prazo do lote inteiro, usado no limite de tempo de CPU.
+    """
+    exit_code = 0
+    try:
+        _close_inherited_fds(request_fd, response_fd)
+        # O processo pai pode ter chaves de API e credenciais no ambiente
+        os.environ.clear()
+        _scrub_environ_block()
+        _apply_limits(limits, timeout)
+        code, cases, workdir = marshal.loads(read_all(request_fd))
+        os.close(request_fd)
+        if workdir:
+            os.chdir(workdir)
+        try:
+            compiled = _load(code)
+        except BaseException as e:
+            compiled, load_error = None, f"{type(e).__name__}: {e}"
+        tool_builtins = safe_builtins()
+        for params in cases:
+            started = time.perf_counter()
+            if compiled is None:
+                response = {"status": "error", "error": load_error, "output": ""}
+            else:
+                response = _execute(
+                    compiled,
+                    marshal.loads(params),
+                    tool_builtins,
+                    limits.max_output_bytes,
+                )
+            _write_frame(response_fd, time.perf_counter() - started, response)
+        os.close(response_fd)
+    except BaseException:
+        exit_code = 1
+    finally:
+        os._exit(exit_code)
+
+
+def _load(code: Union[str, bytes]) -> CodeType:  # pragma: no cover - processo filho
+    if isinstance(code, bytes):
+        # Bytecode do BytecodeCache: nada a compilar aqui
+        compiled: CodeType = marshal.loads(code)
+        return compiled
+    return compile(code, "<tool>", "exec")
+
+
+def safe_builtins() -> Dict[str, Any]:
+    """Builtins expostos ao código da tool (sem BLOCKED_BUILTINS)."""
+    return {
+        name: value
+        for name, value in vars(builtins).items()
+        if name not in BLOCKED_BUILTINS
+    }
+
+
+def _execute(
+    compiled: CodeType,
+    params: Dict[str, Any],
+    tool_builtins: Dict[str, Any],
+    max_output: int,
+) -> Dict[str, Any]:  # pragma: no cover - executado no processo filho
+    output = io.StringIO()
+    # Namespace novo por caso: um caso não enxerga as variáveis do anterior
+    namespace: Dict[str, Any] = {
+        "__name__": "__sandbox__",
+        "__builtins__": dict(tool_builtins),
+        "params": params,
+    }
+    sys.stdout = sys.stderr = output
+    try:
+        exec(compiled, namespace)
+        response = {"status": "success", "result": namespace.get("result")}
+    except BaseException as e:
+        response = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+    response["output"] = output.getvalue()[:max_output]
+    return response
+
+
+def _write_frame(
+    fd: int, elapsed: float, response: Dict[str, Any]
+) -> None:  # pragma: no cover - executado no processo filho
+    try:
+        data = _encode_frame(elapsed, response)
+    except (TypeError, ValueError):
+        response["result"] = repr(response.get("result"))
+        data = _encode_frame(elapsed, response)
+    if len(data) > MAX_FRAME_BYTES:
+        response = {
+            "status": "error",
+            "error": f"Resposta excede {MAX_FRAME_BYTES} bytes",
+            "output": "",
+        }
+        data = _encode_frame(elapsed, response)
+    view = memoryview(FRAME.pack(len(data)) + data)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+def _encode_frame(
+    elapsed: float, response: Dict[str, Any]
+) -> bytes:  # pragma: no cover - executado no processo filho
+    return json.dumps([elapsed, response], allow_nan=False).encode()
+
+
+def _scrub_environ_block() -> None:  # pragma: no cover - processo filho
+    # Depois de um fork() direto, /proc/self/environ ainda mostra o bloco de
+    # ambiente original do processo da API; zera essas páginas do filho
+    try:
+        with open("/proc/self/stat", "rb") as f:
+            stat = f.read()
+        fields = stat[stat.rfind(b")") + 2 :].split()
+        start, end = int(fields[47]), int(fields[48])
+        with open("/proc/self/mem", "r+b", buffering=0) as mem:
+            mem.seek(start)
+            mem.write(bytes(end - start))
+    except (OSError, IndexError, ValueError):
+        pass
+
+
+def _close_inherited_fds(*keep: int) -> None:  # pragma: no cover - processo filho
+    # Sockets e arquivos do processo pai não devem ficar visíveis ao código
+    try:
+        # Listar os descritores abertos evita milhares de close() em vão
+        open_fds = [int(fd) for fd in os.listdir("/proc/self/fd")]
+    except OSError:
+        low = 3
+        for fd in sorted(keep):
+            os.closerange(low, fd)
+            low = fd + 1
+        os.closerange(low, os.sysconf("SC_OPEN_MAX"))
+        return
+    for fd in open_fds:
+        if fd > 2 and fd not in keep:
+            try:
+                os.close(fd)
+            except OSError:
+                pass  # o próprio descritor usado pela listagem
+
+
+def _apply_limits(
+    limits: ExecutionLimits, timeout: float
+) -> None:  # pragma: no cover - executado no processo filho
+    if _resource is None:
+        return
+    cpu = limits.cpu_seconds or max(1, math.ceil(timeout))
+    # SIGXCPU no limite flexível, SIGKILL no rígido
+    _resource.setrlimit(_resource.RLIMIT_CPU, (cpu, cpu + 1))
+    if limits.memory_mb:
+        # O filho herda o espaço de endereçamento do pai; o limite é adicional
+        try:
+            with open("/proc/self/statm") as statm:
+                pages = int(statm.read().split()[0])
+        except OSError:
+            pages = 0
+        inherited = pages * os.sysconf("SC_PAGE_SIZE")
+        address_space = inherited + limits.memory_mb * _MB
+        _resource.setrlimit(_resource.RLIMIT_AS, (address_space, address_space))
+    if limits.max_open_files:
+        _resource.setrlimit(
+            _resource.RLIMIT_NOFILE, (limits.max_open_files, limits.max_open_files)
+        )
+
+
+def zygote_main(
+    control_fd: int, limits: ExecutionLimits, preload: Iterable[str]
+) -> None:  # pragma: no cover - executado no processo zygote
+    """Laço do fork server; termina quando a API fecha o socket de controle."""
+    for name in preload:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+    # Objetos pré-carregados saem das varreduras do GC, que nos filhos
+    # tocariam suas páginas e desfariam o compartilhamento copy-on-write
+    gc.freeze()
+
+    control = socket.socket(fileno=control_fd)
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_r, False)
+    os.set_blocking(wakeup_w, False)
+    signal.set_wakeup_fd(wakeup_w)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+    children: Dict[int, int] = {}
+
+    control.send(MESSAGE.pack(READY, 0, os.getpid()))
+    while True:
+        readable, _, _ = select.select([control.fileno(), wakeup_r], [], [])
+        if wakeup_r in readable:
+            try:
+                while os.read(wakeup_r, 512):
+                    pass
+            except BlockingIOError:
+                pass
+            _reap_children(control, children)
+        if control.fileno() in readable:
+            data, fds, _, _ = socket.recv_fds(control, REQUEST.size, 2)
+            if not data:
+                break
+            exec_id, timeout = REQUEST.unpack(data)
+            request_fd, response_fd = fds
+            pid = os.fork()
+            if pid == 0:
+                signal.set_wakeup_fd(-1)
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                worker_main(request_fd, response_fd, limits, timeout)
+            os.close(request_fd)
+            os.close(response_fd)
+            children[pid] = exec_id
+            control.send(MESSAGE.pack(SPAWNED, exec_id, pid))
+
+    # A API encerrou: nenhum filho deve sobreviver ao zygote
+    for pid in children:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+def _reap_children(
+    control: socket.socket, children: Dict[int, int]
+) -> None:  # pragma: no cover - executado no processo zygote
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        exec_id = children.pop(pid, None)
+        if exec_id is not None:
+            control.send(MESSAGE.pack(EXITED, exec_id, status))
+
+
+def zygote_command(
+    control_fd: int, limits: ExecutionLimits, preload: Iterable[str]
+) -> list:
+    """Linha de comando que inicia o zygote com `python -m`."""
+    return [
+        sys.executable,
+        "-m",
+        __name__,
+        str(control_fd),
+        json.dumps(asdict(limits)),
+        ",".join(preload),
+    ]
+
+
+if __name__ == "__main__":  # pragma: no cover
+    zygote_main(
+        int(sys.argv[1]),
+        ExecutionLimits(**json.loads(sys.argv[2])),
+        [name for name in sys.argv[3].split(",") if name],
+    )
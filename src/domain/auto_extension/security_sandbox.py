@@ -5,13 +5,34 @@ de código gerado dinamicamente, evitando potenciais riscos.
 """
 
 import asyncio
+import functools
+import os
+import shutil
+import tempfile
+import time
 import uuid
-from datetime import datetime
-from typing import Any, Dict, Optional, Tuple
+from collections import OrderedDict
+from contextlib import aclosing, asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 import structlog
 from opentelemetry import trace
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
+
+from .execution_backend import ExecutionLimits, create_execution_backend
+from .sandbox_pool import SandboxPool, SandboxPoolConfig
 
 # Configuração do logger
 logger = structlog.get_logger(__name__)
@@ -26,6 +47,70 @@ SANDBOX_EXECUTION_DURATION = Histogram(
     "Duração da execução de código na sandbox (segundos)",
     buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10),
 )
+SANDBOX_ENVIRONMENTS = Gauge(
+    "sandbox_environments",
+    "Ambientes sandbox existentes por estado",
+    ["state"],
+)
+SANDBOX_ENVIRONMENTS_EVICTED = Counter(
+    "sandbox_environments_evicted_total",
+    "Ambientes sandbox removidos automaticamente, por motivo",
+    ["reason"],
+)
+
+# Folga do asyncio.wait_for sobre o prazo do backend, que mata o processo
+# por conta própria; o wait_for só atua se o backend não responder
+TIMEOUT_FALLBACK_GRACE = 0.5
+
+# Limites de recursos quando o chamador não informa nenhum
+DEFAULT_RESOURCE_LIMITS = {
+    "cpu_percent": 80.0,
+    "memory_mb": 500,
+    "io_operations": 100,
+}
+
+# Estados de um ambiente: recém-criado, executando código, ou ocioso após
+# uma execução ou reset
+ENVIRONMENT_STATES = ("created", "in_use", "ready")
+
+
+@dataclass
+class EnvironmentPolicy:
+    """Limites do ciclo de vida dos ambientes sandbox."""
+
+    max_environments: int = 64
+    idle_ttl: float = 600.0
+
+    @classmethod
+    def from_env(cls) -> "EnvironmentPolicy":
+        """Carrega a política a partir das variáveis SANDBOX_ENV_*."""
+        return cls(
+            max_environments=int(os.getenv("SANDBOX_ENV_MAX", "64")),
+            idle_ttl=float(os.getenv("SANDBOX_ENV_IDLE_TTL", "600")),
+        )
+
+
+class _Environment:
+    """Ambiente sandbox: diretório de trabalho, estado e histórico de uso.
+
+    `managed` marca ambientes criados pela interface de provedor
+    (`create_sandbox`): quem os criou (um SandboxPool) cuida da expiração,
+    então eles não são removidos por ociosidade nem por excesso.
+    """
+
+    __slots__ = ("workdir", "status", "created_at", "last_used", "uses", "managed")
+
+    def __init__(self, workdir: str, now: float, managed: bool) -> None:
+        self.workdir = workdir
+        self.status = "created"
+        self.created_at = now
+        self.last_used = now
+        self.uses = 0
+        self.managed = managed
+
+    @property
+    def evictable(self) -> bool:
+        return not self.managed and self.status != "in_use"
 
 
 class SecuritySandbox:
@@ -35,52 +120,232 @@ class SecuritySandbox:
         self,
         resource_monitor: Optional[Any] = None,
         code_analyzer: Optional[Any] = None,
+        pool_config: Optional[SandboxPoolConfig] = None,
+        execution_backend: Optional[Any] = None,
+        environment_policy: Optional[EnvironmentPolicy] = None,
+        *,
+        clock: Callable[[], float] = time.monotonic,
     ) -> None:
         """Inicializa um sandbox de segurança.
 
         Args:
-            resource_monitor: Monitor de recursos para limitar uso
+            resource_monitor: Monitor de recursos para limitar uso (ex.:
+                ResourceMonitor, que mata o processo ao cruzar um limite)
             code_analyzer: Analisador de código para verificação de segurança
+            pool_config: Se informado, as execuções usam ambientes de um pool
+                pré-aquecido (ver `start_pool`) em vez de nenhum ambiente
+            execution_backend: Backend que executa o código (padrão: modo
+                SANDBOX_EXEC_MODE com limites de SANDBOX_EXEC_*)
+            environment_policy: Máximo de ambientes e tempo de ociosidade
+                até a remoção (padrão: variáveis SANDBOX_ENV_*)
+            clock: Relógio monotônico (injetável em testes)
         """
         self.resource_monitor = resource_monitor
         self.code_analyzer = code_analyzer
-        self._active_environments: Dict[str, Dict[str, Any]] = {}
+        self.execution_backend = execution_backend or create_execution_backend(
+            ExecutionLimits.from_env()
+        )
+        self.environment_policy = environment_policy or EnvironmentPolicy.from_env()
+        self._clock = clock
+        # Ordem de uso: o menos recentemente usado primeiro
+        self._active_environments: "OrderedDict[str, _Environment]" = OrderedDict()
+        self.pool: Optional[SandboxPool] = (
+            SandboxPool(self, pool_config, name="security_sandbox")
+            if pool_config is not None
+            else None
+        )
 
     async def create_environment(self) -> str:
         """Cria um novo ambiente sandbox isolado.
 
+        Cada ambiente tem um diretório de trabalho temporário próprio. Antes
+        de registrá-lo, remove os ambientes ociosos há mais de `idle_ttl` e,
+        se o máximo tiver sido atingido, os ociosos menos recentemente usados.
+
         Returns:
             str: ID do ambiente sandbox criado
+
+        Raises:
+            RuntimeError: Se o máximo de ambientes estiver atingido e nenhum
+                puder ser removido
         """
+        return await self._create_environment(managed=False)
+
+    async def _create_environment(self, managed: bool) -> str:
+        await self.prune_environments()
+        await self._make_room()
+        # Sem await entre a checagem de capacidade, a criação do diretório e
+        # o registro: um cancelamento não deixa diretório órfão para trás
+        # (mkdtemp é um único mkdir, sem custo para o event loop)
         sandbox_id = str(uuid.uuid4())
-        self._active_environments[sandbox_id] = {
-            "created_at": datetime.now().isoformat(),
-            "status": "created",
-        }
+        workdir = tempfile.mkdtemp(prefix=f"skyhal-sandbox-{sandbox_id[:8]}-")
+        self._active_environments[sandbox_id] = _Environment(
+            workdir, self._clock(), managed
+        )
+        SANDBOX_ENVIRONMENTS.labels(state="created").inc()
 
         logger.info("sandbox_environment_created", sandbox_id=sandbox_id)
         SANDBOX_EXECUTIONS.labels(status="created").inc()
         return sandbox_id
 
+    async def reset_environment(self, sandbox_id: str) -> None:
+        """Limpa o diretório de trabalho do ambiente para reutilizá-lo.
+
+        Raises:
+            KeyError: Se o ambiente não existir
+        """
+        environment = self._active_environments[sandbox_id]
+        await asyncio.to_thread(_clear_directory, environment.workdir)
+        self._set_status(environment, "ready")
+
+    async def destroy_environment(self, sandbox_id: str) -> None:
+        """Remove o ambiente e seu diretório de trabalho."""
+        environment = self._active_environments.pop(sandbox_id, None)
+        if environment is None:
+            return
+        SANDBOX_ENVIRONMENTS.labels(state=environment.status).dec()
+        await asyncio.to_thread(shutil.rmtree, environment.workdir, ignore_errors=True)
+        logger.info(
+            "sandbox_environment_destroyed",
+            sandbox_id=sandbox_id,
+            uses=environment.uses,
+        )
+
+    async def prune_environments(self) -> int:
+        """Remove os ambientes ociosos há mais de `idle_ttl` segundos.
+
+        Ambientes em uso e os criados por `create_sandbox` são mantidos.
+
+        Returns:
+            int: Quantidade de ambientes removidos
+        """
+        deadline = self._clock() - self.environment_policy.idle_ttl
+        expired = [
+            sandbox_id
+            for sandbox_id, environment in self._active_environments.items()
+            if environment.evictable and environment.last_used <= deadline
+        ]
+        for sandbox_id in expired:
+            await self._evict(sandbox_id, "idle_ttl")
+        return len(expired)
+
+    def environment_counts(self) -> Dict[str, int]:
+        """Quantidade de ambientes por estado."""
+        counts = dict.fromkeys(ENVIRONMENT_STATES, 0)
+        for environment in self._active_environments.values():
+            counts[environment.status] += 1
+        return counts
+
+    async def _make_room(self) -> None:
+        """Remove ociosos, do menos recente ao mais recente, até caber um."""
+        limit = max(1, self.environment_policy.max_environments)
+        while len(self._active_environments) >= limit:
+            victim = self._least_recently_used()
+            if victim is None:
+                raise RuntimeError(f"Limite de ambientes sandbox atingido ({limit})")
+            await self._evict(victim, "max_environments")
+
+    def _least_recently_used(self) -> Optional[str]:
+        for sandbox_id, environment in self._active_environments.items():
+            if environment.evictable:
+                return sandbox_id
+        return None
+
+    async def _evict(self, sandbox_id: str, reason: str) -> None:
+        if sandbox_id not in self._active_environments:
+            return
+        SANDBOX_ENVIRONMENTS_EVICTED.labels(reason=reason).inc()
+        logger.info("sandbox_environment_evicted", sandbox_id=sandbox_id, reason=reason)
+        await self.destroy_environment(sandbox_id)
+
+    def _set_status(self, environment: _Environment, status: str) -> None:
+        SANDBOX_ENVIRONMENTS.labels(state=environment.status).dec()
+        SANDBOX_ENVIRONMENTS.labels(state=status).inc()
+        environment.status = status
+
+    def _touch(self, sandbox_id: str, environment: _Environment) -> None:
+        environment.last_used = self._clock()
+        self._active_environments.move_to_end(sandbox_id)
+
+    @contextmanager
+    def _occupy(self, environment_id: Optional[str]) -> Iterator[Optional[str]]:
+        """Marca o ambiente como em uso e fornece seu diretório de trabalho."""
+        if environment_id is None:
+            yield None
+            return
+        environment = self._active_environments[environment_id]
+        self._touch(environment_id, environment)
+        self._set_status(environment, "in_use")
+        environment.uses += 1
+        try:
+            yield environment.workdir
+        finally:
+            # O ambiente pode ter sido destruído durante a execução
+            if self._active_environments.get(environment_id) is environment:
+                self._touch(environment_id, environment)
+                self._set_status(environment, "ready")
+
+    # Interface de provedor usada por SandboxPool e ToolValidator
+    async def create_sandbox(self) -> str:
+        return await self._create_environment(managed=True)
+
+    async def reset_sandbox(self, sandbox_id: str) -> None:
+        await self.reset_environment(sandbox_id)
+
+    async def destroy_sandbox(self, sandbox_id: str) -> None:
+        await self.destroy_environment(sandbox_id)
+
+    async def start_pool(self) -> None:
+        """Pré-aquece o pool de ambientes e inicia sua manutenção."""
+        if self.pool is not None:
+            await self.pool.start()
+
+    async def close(self) -> None:
+        """Encerra o pool e o backend e remove os ambientes restantes."""
+        if self.pool is not None:
+            await self.pool.close()
+        await self.execution_backend.close()
+        for sandbox_id in list(self._active_environments):
+            await self.destroy_environment(sandbox_id)
+
+    @asynccontextmanager
+    async def _environment(self) -> AsyncIterator[Optional[str]]:
+        """Ambiente emprestado do pool durante a execução (None sem pool)."""
+        if self.pool is None:
+            yield None
+            return
+        async with self.pool.lease() as sandbox_id:
+            yield sandbox_id
+
     async def execute_code(
-        self, code: str, params: Optional[Dict[str, Any]] = None
+        self,
+        code: str,
+        params: Optional[Dict[str, Any]] = None,
+        environment_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+        on_spawn: Optional[Callable[[int], Awaitable[None]]] = None,
     ) -> Dict[str, Any]:
-        """Executa código em um ambiente sandbox.
+        """Executa código em um processo isolado do backend de execução.
 
         Args:
             code: Código Python a ser executado
-            params: Parâmetros para o código
+            params: Parâmetros para o código (variável global `params`)
+            environment_id: Ambiente do pool onde executar, se houver
+            timeout: Prazo em segundos (padrão: o do backend)
+            on_spawn: Recebe o pid do processo antes de o código rodar
 
         Returns:
-            Dict com resultado da execução
-        """
-        if params is None:
-            params = {}
+            Dict com `status` e, conforme o caso, `result`, `output` e `error`
 
-        # Simular execução para testes
-        result = {"status": "success", "output": "Código executado com sucesso"}
+        Raises:
+            KeyError: Se `environment_id` não existir (destruído ou expirado)
+        """
+        with self._occupy(environment_id) as workdir:
+            result: Dict[str, Any] = await self.execution_backend.run(
+                code, params, timeout, workdir, on_spawn=on_spawn
+            )
 
-        logger.info("code_executed", result=result)
+        logger.info("code_executed", status=result["status"])
         SANDBOX_EXECUTIONS.labels(status=result["status"]).inc()
         return result
 
@@ -109,11 +374,7 @@ class SecuritySandbox:
                 params = {}
 
             if resource_limits is None:
-                resource_limits = {
-                    "cpu_percent": 80.0,
-                    "memory_mb": 500,
-                    "io_operations": 100,
-                }
+                resource_limits = dict(DEFAULT_RESOURCE_LIMITS)
 
             # Verificar segurança do código
             if self.code_analyzer:
@@ -138,28 +399,44 @@ class SecuritySandbox:
 
             try:
                 # Iniciar monitoramento de recursos
+                monitor_id = on_spawn = None
                 if self.resource_monitor:
-                    await self.resource_monitor.start_monitoring()
+                    monitor_id = await self.resource_monitor.start_monitoring(
+                        resource_limits
+                    )
+                    # O monitor acompanha o processo e o mata ao cruzar um limite
+                    on_spawn = functools.partial(
+                        self.resource_monitor.track, monitor_id
+                    )
 
                 # Executar com timeout
                 try:
-                    result = await asyncio.wait_for(
-                        self.execute_code(code, params),
-                        timeout=timeout_ms / 1000,  # Converter ms para segundos
-                    )
+                    try:
+                        async with self._environment() as environment_id:
+                            if span and environment_id:
+                                span.set_attribute(
+                                    "sandbox.environment_id", environment_id
+                                )
+                            timeout = timeout_ms / 1000  # Converter ms para segundos
+                            result = await asyncio.wait_for(
+                                self.execute_code(
+                                    code, params, environment_id, timeout, on_spawn
+                                ),
+                                timeout=timeout + TIMEOUT_FALLBACK_GRACE,
+                            )
+                    finally:
+                        # Encerra a sessão do monitor mesmo em timeout ou erro
+                        if self.resource_monitor:
+                            usage = await self.resource_monitor.get_usage(monitor_id)
+                    if result.get("status") == "timeout":
+                        raise asyncio.TimeoutError
 
                     # Verificar limites de recursos
                     if self.resource_monitor:
-                        usage = await self.resource_monitor.get_usage()
                         check_result = await self.resource_monitor.check_limits(
                             usage, resource_limits
                         )
-                        # Desempacotar o resultado adequadamente (lida com mocks)
-                        if isinstance(check_result, tuple) and len(check_result) == 2:
-                            within_limits, limits_info = check_result
-                        else:
-                            # Valor padrão para testes com mock que não retorna tupla
-                            within_limits, limits_info = True, {}
+                        within_limits, limits_info = _unpack_limits(check_result)
 
                         if not within_limits:
                             logger.warning(
@@ -179,10 +456,10 @@ class SecuritySandbox:
                                 "resource_violation": limits_info,
                             }
 
-                    # Para compatibilidade com os testes
                     if result.get("status") == "success":
                         output = {
-                            "result": 8  # Valor esperado pelo teste para add(5,3)
+                            "result": result.get("result"),
+                            "output": result.get("output", ""),
                         }
                         SANDBOX_EXECUTIONS.labels(status="success").inc()
                         if span:
@@ -208,3 +485,158 @@ class SecuritySandbox:
                     span.set_attribute("sandbox.status", "error")
                     span.record_exception(e)
                 return False, {"error": f"Erro de execução: {str(e)}"}
+
+    async def execute_batch(
+        self,
+        code: str,
+        params_list: Sequence[Optional[Dict[str, Any]]],
+        timeout_ms: int = 1000,
+        resource_limits: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Executa o mesmo código para vários conjuntos de parâmetros.
+
+        A análise de segurança roda uma vez e o código é carregado uma vez em
+        um único processo, que executa os casos em sequência; cada caso é
+        gerado assim que termina, na forma
+        `{"index", "success", "duration_ms", "result", "output"}` ou, em
+        falha, com `error` (e `resource_violation`, se o monitor matou o
+        processo). Um caso que estoura o prazo ou é morto não interrompe os
+        seguintes, que continuam em um processo novo.
+
+        Consuma o iterador até o fim ou feche-o (`aclose`) para devolver o
+        ambiente e encerrar o processo.
+
+        Args:
+            code: Código Python a ser executado
+            params_list: Parâmetros de cada caso
+            timeout_ms: Tempo limite de cada caso em milissegundos
+            resource_limits: Limites de recursos de cada processo de execução
+        """
+        if resource_limits is None:
+            resource_limits = dict(DEFAULT_RESOURCE_LIMITS)
+        span = tracer.start_span("security_sandbox.execute_batch")
+        span.set_attribute("sandbox.batch_size", len(params_list))
+        started = time.perf_counter()
+        failures = 0
+        monitor = self.resource_monitor
+        # Uma sessão do monitor por processo de execução do lote
+        sessions: List[str] = []
+        try:
+            if self.code_analyzer:
+                scan_result = await self.code_analyzer.scan_for_vulnerabilities(code)
+                if not scan_result.get("is_safe", True):
+                    vulnerabilidades = scan_result.get("vulnerabilities", [])
+                    logger.warning(
+                        "unsafe_code_detected",
+                        vulnerabilities=vulnerabilidades,
+                        risk_score=scan_result.get("risk_score", 0),
+                    )
+                    span.set_attribute("sandbox.status", "unsafe")
+                    for index in range(len(params_list)):
+                        failures += 1
+                        SANDBOX_EXECUTIONS.labels(status="unsafe").inc()
+                        yield {
+                            "index": index,
+                            "success": False,
+                            "duration_ms": 0.0,
+                            "error": f"Código inseguro: {len(vulnerabilidades)} vulnerabilidades",
+                            "vulnerabilities": vulnerabilidades,
+                        }
+                    return
+
+            on_spawn = None
+            if monitor:
+
+                async def on_spawn(pid: int) -> None:
+                    monitor_id = await monitor.start_monitoring(resource_limits)
+                    sessions.append(monitor_id)
+                    await monitor.track(monitor_id, pid)
+
+            async with self._environment() as environment_id:
+                with self._occupy(environment_id) as workdir:
+                    cases = self.execution_backend.run_batch(
+                        code, params_list, timeout_ms / 1000, workdir, on_spawn
+                    )
+                    async with aclosing(cases):
+                        async for response in cases:
+                            case = await self._batch_case(
+                                response, timeout_ms, resource_limits, sessions
+                            )
+                            failures += not case["success"]
+                            yield case
+        finally:
+            # Encerra as sessões dos processos que não foram mortos
+            if monitor:
+                for monitor_id in sessions:
+                    await monitor.get_usage(monitor_id)
+            duration_ms = (time.perf_counter() - started) * 1000
+            span.set_attribute("sandbox.batch_failures", failures)
+            span.end()
+            logger.info(
+                "batch_executed",
+                cases=len(params_list),
+                failures=failures,
+                duration_ms=round(duration_ms, 1),
+            )
+
+    async def _batch_case(
+        self,
+        response: Dict[str, Any],
+        timeout_ms: int,
+        resource_limits: Dict[str, Any],
+        sessions: List[str],
+    ) -> Dict[str, Any]:
+        """Converte a resposta do backend no resultado de um caso do lote."""
+        case = {"index": response["index"], "duration_ms": response["duration_ms"]}
+        status = response["status"]
+        if status == "success":
+            case["success"] = True
+            case["result"] = response.get("result")
+            case["output"] = response.get("output", "")
+        elif status == "timeout":
+            case["success"] = False
+            case["error"] = f"Tempo limite excedido: {timeout_ms}ms"
+        else:
+            status = "fail"
+            case["success"] = False
+            case["error"] = response.get("error")
+            case["output"] = response.get("output", "")
+            monitor = self.resource_monitor
+            # Monitores sem killed_for não informam mortes por limite
+            killed_for = getattr(monitor, "killed_for", None)
+            if monitor and killed_for and sessions and killed_for(sessions[-1]):
+                # O monitor matou o processo durante este caso
+                usage = await monitor.get_usage(sessions.pop())
+                _, limits_info = _unpack_limits(
+                    await monitor.check_limits(usage, resource_limits)
+                )
+                status = "resource_exceeded"
+                case["error"] = "Limites de recursos excedidos"
+                case["resource_violation"] = limits_info
+        SANDBOX_EXECUTIONS.labels(status=status).inc()
+        SANDBOX_EXECUTION_DURATION.observe(case["duration_ms"] / 1000)
+        return case
+
+
+def _unpack_limits(check_result: Any) -> Tuple[bool, Dict[str, Any]]:
+    """Normaliza o retorno de `check_limits`.
+
+    ResourceMonitor devolve `(dentro_dos_limites, detalhes)`; monitores mais
+    simples podem devolver só o booleano.
+    """
+    if isinstance(check_result, tuple) and len(check_result) == 2:
+        return bool(check_result[0]), check_result[1]
+    if isinstance(check_result, bool):
+        return check_result, {}
+    # Valor padrão para mocks que não retornam tupla nem booleano
+    return True, {}
+
+
+def _clear_directory(path: str) -> None:
+    """Remove todo o conteúdo de `path`, mantendo o diretório."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.unlink(entry.path)
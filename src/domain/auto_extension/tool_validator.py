@@ -4,15 +4,33 @@ Este módulo implementa o validador de tools geradas,
 testando-as em ambiente sandbox antes da integração ao sistema.
 """
 
-from dataclasses import dataclass
+import asyncio
+import dataclasses
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Dict, List
+from typing import (
+    Any,
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 import structlog
 from opentelemetry import trace
 from prometheus_client import Counter, Histogram
 
+from .performance_profiler import PerformanceProfiler
+from .sandbox_pool import SandboxPool
 from .tool_generator import GeneratedTool
+from .validation_cache import ValidationCache, make_validation_key
 
 # Configuração do logger
 logger = structlog.get_logger(__name__)
@@ -32,6 +50,31 @@ tool_validation_errors_total = Counter(
     "auto_extension_tool_validation_errors_total",
     "Total de erros na validação de ferramentas",
 )
+tool_validation_phase_seconds = Histogram(
+    "auto_extension_tool_validation_phase_seconds",
+    "Tempo de cada fase da validação de ferramentas",
+    ["phase"],
+)
+tool_validation_batch_size = Histogram(
+    "auto_extension_tool_validation_batch_size",
+    "Quantidade de tools por lote de validação",
+    buckets=(1, 2, 5, 10, 20, 50, 100),
+)
+tool_validation_deduplicated_total = Counter(
+    "auto_extension_tool_validation_deduplicated_total",
+    "Tools de um lote que reaproveitaram a validação de código idêntico",
+)
+tool_validation_early_exits_total = Counter(
+    "auto_extension_tool_validation_early_exits_total",
+    "Validações encerradas antes dos testes por falha de segurança",
+)
+
+# Score de segurança abaixo do qual a tool é reprovada
+SECURITY_FAILURE_THRESHOLD = 0.7
+
+# Incrementar a cada mudança no validador que altere relatórios: relatórios
+# em cache de outra versão são descartados
+VALIDATOR_VERSION = 2
 
 
 class ValidationResult(Enum):
@@ -44,6 +87,14 @@ class ValidationResult(Enum):
     FAILED_COMPATIBILITY = "failed_compatibility"
 
 
+# Resultados que dependem só do código, da especificação e das versões.
+# Falhas de testes, desempenho e compatibilidade vêm de fases que rodam a
+# tool (prazo da sandbox, processo morto, tempo medido) e não são guardadas
+CACHEABLE_RESULTS = frozenset(
+    {ValidationResult.PASSED, ValidationResult.FAILED_SECURITY}
+)
+
+
 @dataclass
 class ValidationReport:
     """Relatório detalhado da validação de uma tool."""
@@ -55,31 +106,62 @@ class ValidationReport:
     test_results: Dict[str, Any]
     issues: List[Dict[str, Any]]
     recommendations: List[str]
+    phase_timings: Dict[str, float] = field(default_factory=dict)
 
 
 class ToolValidator:
     """Validador de tools geradas."""
 
-    def __init__(self, sandbox_provider, security_analyzer, test_runner):
+    def __init__(
+        self,
+        sandbox_provider: Any,
+        security_analyzer: Any,
+        test_runner: Any,
+        performance_profiler: Optional[PerformanceProfiler] = None,
+        validation_cache: Optional[ValidationCache] = None,
+    ) -> None:
         """Inicializa o validador de tools.
 
         Args:
             sandbox_provider: Provedor de ambientes sandbox para execução segura
             security_analyzer: Analisador de segurança para código gerado
             test_runner: Executor de testes para validar funcionalidade
+            performance_profiler: Se informado, mede o desempenho da tool na
+                sandbox e o score medido substitui o do executor de testes
+            validation_cache: Cache de relatórios por código, especificação
+                e versão do analisador; só é usado se o analisador tiver
+                `version`
         """
         self.sandbox_provider = sandbox_provider
         self.security_analyzer = security_analyzer
         self.test_runner = test_runner
+        self.performance_profiler = performance_profiler
+        self.validation_cache = validation_cache
         self.logger = logger.bind(component="ToolValidator")
 
     @tool_validation_latency_seconds.time()
     @tracer.start_as_current_span("validate_tool")
-    async def validate_tool(self, tool: GeneratedTool) -> ValidationReport:
+    async def validate_tool(
+        self, tool: GeneratedTool, sandbox_pool: Optional[SandboxPool] = None
+    ) -> ValidationReport:
         """Valida uma tool gerada em ambiente sandbox.
 
+        A análise de segurança e a criação do sandbox são independentes e
+        rodam em paralelo. Se o score de segurança ficar abaixo de
+        SECURITY_FAILURE_THRESHOLD, a criação do sandbox é cancelada e os
+        testes não são executados. A duração de cada fase fica em
+        `phase_timings` do relatório e nos atributos do span.
+
+        Com `validation_cache`, um relatório já produzido para o mesmo
+        código e especificação pela mesma versão do validador e do
+        analisador é devolvido sem nenhuma fase (`phase_timings` traz só
+        `cache_lookup`). Só relatórios em CACHEABLE_RESULTS são guardados:
+        falhas de testes ou de desempenho são sempre revalidadas.
+
         Args:
             tool: Tool gerada a ser validada
+            sandbox_pool: Pool de onde emprestar o sandbox; sem ele, um
+                sandbox é criado e destruído só para esta validação
 
         Returns:
             Relatório detalhado da validação
@@ -87,26 +169,76 @@ class ToolValidator:
         Raises:
             Exception: Se ocorrer um erro durante a validação
         """
+        cached, cache_key, cache_version = await self._cached_report(tool)
+        if cached is not None:
+            return cached
+
         sandbox = None
+        sandbox_task: Optional["asyncio.Future[Any]"] = None
+        timings: Dict[str, float] = {}
+        failed = False
         try:
             self.logger.info(
                 "iniciando_validacao", tool_id=tool.tool_id, tool_name=tool.name
             )
 
             with tracer.start_as_current_span("auto_extension.validate_tool") as span:
-                # Análise de segurança
-                with tracer.start_as_current_span("security_analysis") as sec_span:
-                    sec_span.set_attribute("tool_id", tool.tool_id)
-                    security_results = await self.security_analyzer.analyze(tool.code)
-
-                # Preparar sandbox
+                started = time.perf_counter()
+                # Análise de segurança e preparo do sandbox em paralelo
                 self.logger.info("criando_ambiente_sandbox", tool_id=tool.tool_id)
-                sandbox = await self.sandbox_provider.create_sandbox()
+                sandbox_task = asyncio.ensure_future(
+                    self._timed_phase(
+                        "sandbox_provision",
+                        tool,
+                        timings,
+                        sandbox_pool.acquire
+                        if sandbox_pool
+                        else self.sandbox_provider.create_sandbox,
+                    )
+                )
+                security_results = await self._timed_phase(
+                    "security_analysis",
+                    tool,
+                    timings,
+                    self.security_analyzer.analyze,
+                    tool.code,
+                )
+
+                if security_results.get("score", 0.0) < SECURITY_FAILURE_THRESHOLD:
+                    # Reprovada na segurança: não vale esperar sandbox e testes
+                    tool_validation_early_exits_total.inc()
+                    span.set_attribute("validation.early_exit", True)
+                    self.logger.info(
+                        "validacao_encerrada_por_seguranca",
+                        tool_id=tool.tool_id,
+                        security_score=security_results.get("score", 0.0),
+                    )
+                    test_results: Dict[str, Any] = {
+                        "skipped": True,
+                        "reason": "security_failed",
+                    }
+                else:
+                    sandbox = await sandbox_task
+                    test_results = await self._timed_phase(
+                        "test_execution",
+                        tool,
+                        timings,
+                        self.test_runner.run_tests,
+                        sandbox,
+                        tool,
+                    )
+                    if self.performance_profiler is not None:
+                        test_results = await self._profile(
+                            self.performance_profiler,
+                            tool,
+                            sandbox,
+                            timings,
+                            test_results,
+                        )
 
-                # Executar testes
-                with tracer.start_as_current_span("test_execution") as test_span:
-                    test_span.set_attribute("tool_id", tool.tool_id)
-                    test_results = await self.test_runner.run_tests(sandbox, tool)
+                timings["total"] = time.perf_counter() - started
+                for phase, seconds in timings.items():
+                    span.set_attribute(f"validation.{phase}_ms", seconds * 1000)
 
                 # Análise dos resultados
                 result, issues, recommendations = self._analyze_results(
@@ -122,6 +254,7 @@ class ToolValidator:
                     test_results=test_results,
                     issues=issues,
                     recommendations=recommendations,
+                    phase_timings=dict(timings),
                 )
 
                 self.logger.info(
@@ -130,10 +263,21 @@ class ToolValidator:
                     result=result.value,
                     security_score=security_results.get("score", 0.0),
                     issues_count=len(issues),
+                    phase_timings=report.phase_timings,
                 )
                 tool_validations_total.labels(result=result.value).inc()
+                if (
+                    self.validation_cache is not None
+                    and cache_key is not None
+                    and cache_version is not None
+                    and result in CACHEABLE_RESULTS
+                ):
+                    await self.validation_cache.set(
+                        cache_key, cache_version, _report_to_json(report)
+                    )
                 return report
         except Exception as e:
+            failed = True
             tool_validation_errors_total.inc()
             self.logger.error("falha_validacao", tool_id=tool.tool_id, exc_info=e)
             with tracer.start_as_current_span(
@@ -143,8 +287,13 @@ class ToolValidator:
             tool_validations_total.labels(result="error").inc()
             raise
         finally:
+            if sandbox is None and sandbox_task is not None:
+                sandbox = await self._settle_sandbox(sandbox_task)
             # Limpar sandbox
-            if sandbox:
+            if sandbox and sandbox_pool is not None:
+                # Sandbox de uma validação que falhou pode estar sujo
+                await sandbox_pool.release(sandbox, discard=failed)
+            elif sandbox:
                 try:
                     await self.sandbox_provider.destroy_sandbox(sandbox)
                     self.logger.info("sandbox_destruido", tool_id=tool.tool_id)
@@ -153,6 +302,198 @@ class ToolValidator:
                         "falha_destruir_sandbox", tool_id=tool.tool_id, error=str(e)
                     )
 
+    async def validate_many(
+        self, tools: Sequence[GeneratedTool], concurrency: int = 4
+    ) -> AsyncGenerator[ValidationReport, None]:
+        """Valida várias tools com no máximo `concurrency` em paralelo.
+
+        Os sandboxes vêm de um pool compartilhado pelo lote, e tools com
+        código e especificação idênticos (a chave do `validation_cache`) são
+        validadas uma única vez: as demais recebem uma cópia do relatório com o próprio `tool_id`. Os
+        relatórios são produzidos na ordem em que terminam; a falha de uma
+        tool vira um relatório FAILED_FUNCTIONALITY sem interromper as
+        demais. Fechar o iterador cancela as validações pendentes.
+
+        Args:
+            tools: Tools geradas a serem validadas
+            concurrency: Máximo de validações (e sandboxes) simultâneas
+
+        Yields:
+            Relatório de validação de cada tool
+        """
+        tool_validation_batch_size.observe(len(tools))
+        concurrency = max(1, concurrency)
+        pool = SandboxPool(
+            self.sandbox_provider, max_size=concurrency, name="validate_many"
+        )
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(tool: GeneratedTool) -> ValidationReport:
+            async with semaphore:
+                try:
+                    return await self.validate_tool(tool, sandbox_pool=pool)
+                except Exception as e:
+                    return self._error_report(tool, e)
+
+        async def copy(
+            tool: GeneratedTool, primary: "asyncio.Future[ValidationReport]"
+        ) -> ValidationReport:
+            report = await primary
+            return dataclasses.replace(report, tool_id=tool.tool_id)
+
+        primaries: Dict[str, "asyncio.Future[ValidationReport]"] = {}
+        tasks: List["asyncio.Future[ValidationReport]"] = []
+        for tool in tools:
+            # O relatório depende da especificação (ex.: orçamento do nível de
+            # segurança), não só do código
+            key = make_validation_key(tool.code, tool.spec)
+            primary = primaries.get(key)
+            if primary is None:
+                primary = primaries[key] = asyncio.ensure_future(run(tool))
+                tasks.append(primary)
+            else:
+                tool_validation_deduplicated_total.inc()
+                tasks.append(asyncio.ensure_future(copy(tool, primary)))
+        self.logger.info(
+            "validacao_em_lote",
+            tools=len(tools),
+            unique=len(primaries),
+            concurrency=concurrency,
+        )
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await pool.close()
+
+    @staticmethod
+    def _error_report(tool: GeneratedTool, error: Exception) -> ValidationReport:
+        """Relatório de uma tool cuja validação falhou com exceção."""
+        return ValidationReport(
+            tool_id=tool.tool_id,
+            result=ValidationResult.FAILED_FUNCTIONALITY,
+            security_score=0.0,
+            performance_score=0.0,
+            test_results={"error": str(error)},
+            issues=[
+                {
+                    "type": "validation_error",
+                    "severity": "high",
+                    "description": str(error),
+                }
+            ],
+            recommendations=["Verificar o erro da validação e tentar novamente"],
+        )
+
+    async def _timed_phase(
+        self,
+        phase: str,
+        tool: GeneratedTool,
+        timings: Dict[str, float],
+        func: Callable[..., Awaitable[Any]],
+        *args: Any,
+    ) -> Any:
+        """Executa uma fase da validação em seu próprio span, medindo a duração.
+
+        A corrotina só é criada aqui, para que cancelar a fase antes de ela
+        começar não deixe uma corrotina órfã.
+        """
+        started = time.perf_counter()
+        with tracer.start_as_current_span(phase) as span:
+            span.set_attribute("tool_id", tool.tool_id)
+            try:
+                return await func(*args)
+            finally:
+                elapsed = time.perf_counter() - started
+                timings[phase] = elapsed
+                tool_validation_phase_seconds.labels(phase=phase).observe(elapsed)
+
+    def _cache_version(self) -> Optional[str]:
+        """Versão dos componentes que produzem o relatório (None: sem cache)."""
+        analyzer_version = getattr(self.security_analyzer, "version", None)
+        if not isinstance(analyzer_version, str):
+            # Sem versão não há como invalidar relatórios antigos
+            return None
+        parts = [f"validator-{VALIDATOR_VERSION}", f"analyzer-{analyzer_version}"]
+        if self.performance_profiler is not None:
+            budgets = json.dumps(
+                {
+                    level: dataclasses.asdict(budget)
+                    for level, budget in self.performance_profiler.budgets.items()
+                },
+                sort_keys=True,
+            )
+            digest = hashlib.sha256(budgets.encode("utf-8")).hexdigest()[:12]
+            parts.append(f"budgets-{digest}")
+        return "/".join(parts)
+
+    async def _cached_report(
+        self, tool: GeneratedTool
+    ) -> Tuple[Optional[ValidationReport], Optional[str], Optional[str]]:
+        """Busca o relatório em cache; devolve (relatório, chave, versão)."""
+        if self.validation_cache is None:
+            return None, None, None
+        version = self._cache_version()
+        if version is None:
+            return None, None, None
+        started = time.perf_counter()
+        key = make_validation_key(tool.code, tool.spec)
+        raw = await self.validation_cache.get(key, version)
+        if raw is None:
+            return None, key, version
+        try:
+            report = _report_from_json(raw, tool.tool_id)
+        except (ValueError, TypeError, KeyError) as e:
+            self.logger.warning("relatorio_em_cache_invalido", error=str(e))
+            return None, key, version
+        report.phase_timings = {"cache_lookup": time.perf_counter() - started}
+        self.logger.info(
+            "validacao_em_cache", tool_id=tool.tool_id, result=report.result.value
+        )
+        return report, key, version
+
+    async def _profile(
+        self,
+        profiler: PerformanceProfiler,
+        tool: GeneratedTool,
+        sandbox: Any,
+        timings: Dict[str, float],
+        test_results: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Fase de perfil de desempenho; devolve os resultados com o score medido."""
+        # O ambiente só serve se o profiler executar no próprio provedor
+        environment_id = sandbox if profiler.executor is self.sandbox_provider else None
+        profile = await self._timed_phase(
+            "performance_profiling",
+            tool,
+            timings,
+            profiler.profile,
+            tool,
+            environment_id,
+        )
+        test_results = {**test_results, "performance_profile": profile}
+        if profile["score"] is not None:
+            test_results["performance_score"] = profile["score"]
+            test_results["performance_issues"] = [
+                *test_results.get("performance_issues", []),
+                *profile["issues"],
+            ]
+        return test_results
+
+    async def _settle_sandbox(self, task: "asyncio.Future[Any]") -> Any:
+        """Cancela a criação pendente do sandbox e devolve o que foi criado."""
+        if not task.done():
+            task.cancel()
+        outcome: Any = (await asyncio.gather(task, return_exceptions=True))[0]
+        if isinstance(outcome, BaseException):
+            if not isinstance(outcome, asyncio.CancelledError):
+                self.logger.warning("falha_criar_sandbox", error=str(outcome))
+            return None
+        return outcome
+
     # Função utilitária centralizada em src/utils/tool_validation.py
     # Substitui a lógica duplicada anterior.
     def _analyze_results(
@@ -162,3 +503,16 @@ class ToolValidator:
         from src.utils.tool_validation import analyze_tool_results
 
         return analyze_tool_results(security_results, test_results)
+
+
+def _report_to_json(report: ValidationReport) -> str:
+    data = dataclasses.asdict(report)
+    data["result"] = report.result.value
+    return json.dumps(data, default=str, ensure_ascii=False)
+
+
+def _report_from_json(raw: str, tool_id: str) -> ValidationReport:
+    data = json.loads(raw)
+    data["result"] = ValidationResult(data["result"])
+    data["tool_id"] = tool_id
+    return ValidationReport(**data)
@@ -0,0 +1,223 @@
+"""Cache de relatórios de validação de tools.
+
+O mesmo código gerado é validado muitas vezes (na criação, após feedback e
+após rollback). Este cache guarda o relatório serializado de cada validação
+pela chave `<sha256 do código>:<sha256 da especificação>`, junto com a
+versão de quem o produziu (validador, analisador de segurança e orçamentos
+de desempenho). Há um tier em memória (LRU) e um tier opcional em disco
+(SQLite); uma entrada de outra versão é descartada ao ser encontrada, então
+mudar a versão do analisador invalida o cache sem nenhuma ação manual.
+Só relatórios determinísticos são guardados (ver
+`tool_validator.CACHEABLE_RESULTS`).
+"""
+
+import asyncio
+import dataclasses
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+import structlog
+from prometheus_client import Counter, Gauge
+
+# Configuração do logger
+logger = structlog.get_logger(__name__)
+
+# Métricas Prometheus
+validation_cache_events = Counter(
+    "auto_extension_validation_cache_events_total",
+    "Eventos do cache de validação (hit, miss, stale, store, evict)",
+    ["tier", "event"],
+)
+validation_cache_hit_ratio = Gauge(
+    "auto_extension_validation_cache_hit_ratio",
+    "Fração das consultas ao cache de validação atendidas por algum tier",
+)
+
+
+def make_validation_key(code: str, spec: Any) -> str:
+    """Chave do relatório: hash do código e hash da especificação."""
+    if dataclasses.is_dataclass(spec) and not isinstance(spec, type):
+        spec = dataclasses.asdict(spec)
+    raw_spec = json.dumps(spec, sort_keys=True, default=str, ensure_ascii=False)
+    code_hash = hashlib.sha256(code.encode("utf-8")).hexdigest()
+    spec_hash = hashlib.sha256(raw_spec.encode("utf-8")).hexdigest()
+    return f"{code_hash}:{spec_hash}"
+
+
+class _SQLiteTier:
+    """Tier persistente em SQLite (acesso síncrono, chamado via thread)."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS validation_cache ("
+            "key TEXT PRIMARY KEY, version TEXT NOT NULL, report TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version, report FROM validation_cache WHERE key = ?", (key,)
+            ).fetchone()
+            return (str(row[0]), str(row[1])) if row is not None else None
+
+    def set(self, key: str, version: str, report: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO validation_cache (key, version, report) "
+                "VALUES (?, ?, ?)",
+                (key, version, report),
+            )
+            self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM validation_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ValidationCache:
+    """Cache em dois níveis (memória + SQLite opcional) de relatórios."""
+
+    def __init__(self, max_entries: int = 1024, sqlite_path: Optional[str] = None):
+        """
+        Args:
+            max_entries: Capacidade do LRU em memória.
+            sqlite_path: Caminho do tier persistente (None desativa).
+        """
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = _SQLiteTier(sqlite_path) if sqlite_path else None
+        self._lookups = 0
+        self._hits = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["ValidationCache"]:
+        """Cria o cache a partir das variáveis VALIDATION_CACHE_* (None se desativado)."""
+        enabled = os.getenv("VALIDATION_CACHE_ENABLED", "true").lower()
+        if enabled not in ("1", "true", "yes"):
+            return None
+        return cls(
+            max_entries=int(os.getenv("VALIDATION_CACHE_MAX_ENTRIES", "1024")),
+            sqlite_path=os.getenv("VALIDATION_CACHE_SQLITE_PATH") or None,
+        )
+
+    @property
+    def hit_ratio(self) -> float:
+        return self._hits / self._lookups if self._lookups else 0.0
+
+    async def get(self, key: str, version: str) -> Optional[str]:
+        """Busca o relatório no LRU e, em caso de miss, no tier SQLite.
+
+        Entradas de outra versão são removidas e contam como miss.
+        """
+        report = self._get_memory(key, version)
+        if report is None and self._disk is not None:
+            report = await self._get_disk(key, version)
+            if report is not None:
+                self._store_memory(key, version, report)
+        self._record_lookup(report is not None)
+        return report
+
+    async def set(self, key: str, version: str, report: str) -> None:
+        """Armazena o relatório serializado nos dois tiers."""
+        self._store_memory(key, version, report)
+        validation_cache_events.labels(tier="memory", event="store").inc()
+        if self._disk is not None:
+            try:
+                await asyncio.to_thread(self._disk.set, key, version, report)
+                validation_cache_events.labels(tier="sqlite", event="store").inc()
+            except sqlite3.Error as e:
+                logger.warning("validation_cache_sqlite_erro", error=str(e))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def _get_memory(self, key: str, version: str) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[0] != version:
+                del self._memory[key]
+                validation_cache_events.labels(tier="memory", event="stale").inc()
+                entry = None
+            if entry is not None:
+                self._memory.move_to_end(key)
+        event = "hit" if entry is not None else "miss"
+        validation_cache_events.labels(tier="memory", event=event).inc()
+        return entry[1] if entry is not None else None
+
+    async def _get_disk(self, key: str, version: str) -> Optional[str]:
+        disk = self._disk
+        if disk is None:
+            return None
+        try:
+            row = await asyncio.to_thread(disk.get, key)
+            if row is not None and row[0] != version:
+                await asyncio.to_thread(disk.delete, key)
+                validation_cache_events.labels(tier="sqlite", event="stale").inc()
+                row = None
+        except sqlite3.Error as e:
+            logger.warning("validation_cache_sqlite_erro", error=str(e))
+            row = None
+        event = "hit" if row is not None else "miss"
+        validation_cache_events.labels(tier="sqlite", event=event).inc()
+        return row[1] if row is not None else None
+
+    def _store_memory(self, key: str, version: str, report: str) -> None:
+        with self._lock:
+            self._memory[key] = (version, report)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                validation_cache_events.labels(tier="memory", event="evict").inc()
+
+    def _record_lookup(self, hit: bool) -> None:
+        with self._lock:
+            self._lookups += 1
+            self._hits += hit
+            validation_cache_hit_ratio.set(self._hits / self._lookups)
+
+
+# Cache compartilhado pelo processo
+_validation_cache: Optional[ValidationCache] = None
+_validation_cache_lock = threading.Lock()
+_validation_cache_loaded = False
+
+
+def get_validation_cache() -> Optional[ValidationCache]:
+    """Retorna o cache compartilhado (None se desativado por ambiente)."""
+    global _validation_cache, _validation_cache_loaded
+    if not _validation_cache_loaded:
+        with _validation_cache_lock:
+            if not _validation_cache_loaded:
+                _validation_cache = ValidationCache.from_env()
+                _validation_cache_loaded = True
+    return _validation_cache
+
+
+def set_validation_cache(cache: Optional[ValidationCache]) -> None:
+    """Substitui o cache compartilhado (uso em testes)."""
+    global _validation_cache, _validation_cache_loaded
+    _validation_cache = cache
+    _validation_cache_loaded = True
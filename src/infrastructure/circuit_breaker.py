@@ -0,0 +1,228 @@
+"""
+Circuit breaker para provedores LLM.
+
+Mantém um disjuntor por par (base_url, model) com os estados fechado,
+aberto e meio-aberto. Erros e chamadas lentas numa janela deslizante abrem
+o circuito; enquanto aberto as chamadas são rejeitadas imediatamente, sem
+esperar o timeout do provedor, e após `open_timeout` algumas chamadas de
+prova decidem se o circuito volta a fechar. Uma prova cancelada devolve a
+vaga com `release()`; uma prova sem resposta após `slow_call_duration` (que
+já seria contada como lenta) reabre o circuito.
+"""
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+import structlog
+from prometheus_client import Gauge
+
+logger = structlog.get_logger()
+
+circuit_breaker_state = Gauge(
+    "llm_circuit_breaker_state",
+    "Estado do circuit breaker por provedor LLM (0=fechado, 1=meio-aberto, 2=aberto)",
+    ["base_url", "model"],
+)
+
+
+class CircuitState(Enum):
+    """Estados possíveis do circuit breaker."""
+
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+class CircuitOpenError(Exception):
+    """Chamada rejeitada porque o circuito do provedor está aberto."""
+
+    pass
+
+
+@dataclass
+class CircuitBreakerConfig:
+    """Limiares de erro e latência do circuit breaker."""
+
+    window_size: int = 20
+    minimum_calls: int = 10
+    failure_rate_threshold: float = 0.5
+    slow_call_duration: float = 10.0
+    slow_call_rate_threshold: float = 0.8
+    open_timeout: float = 30.0
+    half_open_max_calls: int = 2
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreakerConfig":
+        """Carrega a configuração a partir das variáveis LLM_CB_*."""
+        return cls(
+            window_size=int(os.getenv("LLM_CB_WINDOW_SIZE", "20")),
+            minimum_calls=int(os.getenv("LLM_CB_MINIMUM_CALLS", "10")),
+            failure_rate_threshold=float(os.getenv("LLM_CB_FAILURE_RATE", "0.5")),
+            slow_call_duration=float(os.getenv("LLM_CB_SLOW_CALL_SECONDS", "10")),
+            slow_call_rate_threshold=float(os.getenv("LLM_CB_SLOW_CALL_RATE", "0.8")),
+            open_timeout=float(os.getenv("LLM_CB_OPEN_TIMEOUT", "30")),
+            half_open_max_calls=int(os.getenv("LLM_CB_HALF_OPEN_CALLS", "2")),
+        )
+
+
+class CircuitBreaker:
+    """Circuit breaker com janela deslizante de chamadas."""
+
+    def __init__(
+        self,
+        name: Tuple[str, str],
+        config: Optional[CircuitBreakerConfig] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.base_url, self.model = name
+        self.config = config or CircuitBreakerConfig()
+        self._clock = clock
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._half_open_successes = 0
+        self._probe_started_at = 0.0
+        # Cada item: (falhou, lenta)
+        self._window: Deque[Tuple[bool, bool]] = deque(maxlen=self.config.window_size)
+        self._lock = threading.Lock()
+        self._publish_state()
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            self._advance()
+            return self._state
+
+    @property
+    def is_open(self) -> bool:
+        """True se chamadas seriam rejeitadas agora (sem consumir provas)."""
+        return self.state == CircuitState.OPEN
+
+    def allow_request(self) -> bool:
+        """Reserva uma chamada; False se o circuito estiver aberto."""
+        with self._lock:
+            self._advance()
+            if self._state == CircuitState.OPEN:
+                return False
+            if self._state == CircuitState.HALF_OPEN:
+                if self._half_open_calls >= self.config.half_open_max_calls:
+                    return False
+                self._half_open_calls += 1
+                self._probe_started_at = self._clock()
+            return True
+
+    def release(self) -> None:
+        """Devolve uma chamada reservada que terminou sem resultado.
+
+        Usado quando a chamada é cancelada (ex: perdedora de um hedge ou
+        cliente desconectado): não conta como sucesso nem como falha, mas
+        libera a vaga de prova do estado meio-aberto.
+        """
+        with self._lock:
+            if self._state == CircuitState.HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_success(self, duration: float) -> None:
+        """Registra uma chamada bem-sucedida e sua duração em segundos."""
+        slow = duration >= self.config.slow_call_duration
+        with self._lock:
+            if self._state == CircuitState.HALF_OPEN:
+                if slow:
+                    self._trip("slow_probe")
+                    return
+                self._half_open_successes += 1
+                if self._half_open_successes >= self.config.half_open_max_calls:
+                    self._transition(CircuitState.CLOSED)
+                return
+            self._window.append((False, slow))
+            self._evaluate()
+
+    def record_failure(self) -> None:
+        """Registra uma chamada que falhou por indisponibilidade do provedor."""
+        with self._lock:
+            if self._state == CircuitState.HALF_OPEN:
+                self._trip("failed_probe")
+                return
+            self._window.append((True, False))
+            self._evaluate()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._transition(CircuitState.CLOSED)
+
+    def _evaluate(self) -> None:
+        calls = len(self._window)
+        if self._state != CircuitState.CLOSED or calls < self.config.minimum_calls:
+            return
+        failures = sum(1 for failed, _ in self._window if failed)
+        slow = sum(1 for _, is_slow in self._window if is_slow)
+        if failures / calls >= self.config.failure_rate_threshold:
+            self._trip("failure_rate")
+        elif slow / calls >= self.config.slow_call_rate_threshold:
+            self._trip("slow_call_rate")
+
+    def _advance(self) -> None:
+        """Aplica as transições que dependem apenas do tempo."""
+        now = self._clock()
+        if (
+            self._state == CircuitState.OPEN
+            and now - self._opened_at >= self.config.open_timeout
+        ):
+            self._transition(CircuitState.HALF_OPEN)
+        elif (
+            self._state == CircuitState.HALF_OPEN
+            and self._half_open_calls > self._half_open_successes
+            and now - self._probe_started_at >= self.config.slow_call_duration
+        ):
+            self._trip("probe_timeout")
+
+    def _trip(self, reason: str) -> None:
+        self._opened_at = self._clock()
+        self._transition(CircuitState.OPEN)
+        logger.warning(
+            "llm_circuit_opened",
+            base_url=self.base_url,
+            model=self.model,
+            reason=reason,
+        )
+
+    def _transition(self, state: CircuitState) -> None:
+        self._state = state
+        self._half_open_calls = 0
+        self._half_open_successes = 0
+        if state != CircuitState.HALF_OPEN:
+            self._window.clear()
+        self._publish_state()
+
+    def _publish_state(self) -> None:
+        circuit_breaker_state.labels(base_url=self.base_url, model=self.model).set(
+            self._state.value
+        )
+
+
+# Registry global: um breaker por (base_url, model)
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(
+    base_url: str, model: str, config: Optional[CircuitBreakerConfig] = None
+) -> CircuitBreaker:
+    """Retorna o circuit breaker do provedor, criando-o na primeira chamada."""
+    key = (base_url.rstrip("/"), model)
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(key, config or CircuitBreakerConfig.from_env())
+            _breakers[key] = breaker
+        return breaker
+
+
+def reset_circuit_breakers() -> None:
+    """Remove todos os circuit breakers registrados."""
+    with _breakers_lock:
+        _breakers.clear()
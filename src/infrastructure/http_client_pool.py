@@ -0,0 +1,174 @@
+"""
+Pool HTTP compartilhado para os clientes LLM.
+
+Mantém um único httpx.AsyncClient com pool de conexões, keep-alive e HTTP/2
+opcional durante todo o ciclo de vida da aplicação, evitando um novo
+handshake TCP+TLS a cada chamada de geração de código.
+"""
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+import httpx
+import structlog
+from prometheus_client import Gauge
+
+logger = structlog.get_logger()
+
+llm_http_pool_connections = Gauge(
+    "llm_http_pool_connections",
+    "Conexões do pool HTTP dos clientes LLM por estado",
+    ["state"],
+)
+llm_http_pool_pending = Gauge(
+    "llm_http_pool_pending_requests",
+    "Requisições aguardando conexão livre no pool HTTP",
+)
+llm_http_pool_max_connections = Gauge(
+    "llm_http_pool_max_connections",
+    "Limite de conexões do pool HTTP dos clientes LLM",
+)
+
+
+@dataclass
+class HTTPPoolConfig:
+    """Configuração do pool de conexões HTTP."""
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+    timeout: float = 30.0
+    connect_timeout: float = 5.0
+
+    @classmethod
+    def from_env(cls) -> "HTTPPoolConfig":
+        """Carrega a configuração a partir das variáveis LLM_HTTP_*."""
+        return cls(
+            max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(
+                os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")
+            ),
+            keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "30")),
+            http2=os.getenv("LLM_HTTP2", "false").lower() in ("1", "true", "yes"),
+            timeout=float(os.getenv("LLM_HTTP_TIMEOUT", "30")),
+            connect_timeout=float(os.getenv("LLM_HTTP_CONNECT_TIMEOUT", "5")),
+        )
+
+
+class SharedHTTPClient:
+    """Dono do httpx.AsyncClient compartilhado pelos clientes LLM.
+
+    Criado e encerrado pelo lifespan da aplicação FastAPI. A ocupação do
+    pool é publicada como gauges Prometheus a cada requisição/resposta.
+    """
+
+    def __init__(self, config: Optional[HTTPPoolConfig] = None) -> None:
+        self.config = config or HTTPPoolConfig()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Retorna o cliente HTTP, criando-o sob demanda."""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    @property
+    def is_started(self) -> bool:
+        return self._client is not None and not self._client.is_closed
+
+    def start(self) -> httpx.AsyncClient:
+        """Inicializa o cliente compartilhado."""
+        client = self.client
+        self.export_metrics()
+        logger.info(
+            "llm_http_pool_started",
+            max_connections=self.config.max_connections,
+            max_keepalive=self.config.max_keepalive_connections,
+            http2=self.config.http2,
+        )
+        return client
+
+    async def aclose(self) -> None:
+        """Fecha todas as conexões do pool."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("llm_http_pool_closed")
+        self._client = None
+
+    def pool_stats(self) -> Dict[str, int]:
+        """Retorna a ocupação atual do pool (ativas, ociosas e pendentes)."""
+        stats = {"active": 0, "idle": 0, "pending": 0}
+        pool = self._connection_pool()
+        if pool is None:
+            return stats
+        for connection in getattr(pool, "connections", []):
+            if connection.is_idle():
+                stats["idle"] += 1
+            else:
+                stats["active"] += 1
+        stats["pending"] = sum(
+            1
+            for pool_request in getattr(pool, "_requests", [])
+            if pool_request.is_queued()
+        )
+        return stats
+
+    def export_metrics(self) -> None:
+        """Publica a ocupação do pool nos gauges Prometheus."""
+        stats = self.pool_stats()
+        for state in ("active", "idle"):
+            llm_http_pool_connections.labels(state=state).set(stats[state])
+        llm_http_pool_pending.set(stats["pending"])
+        llm_http_pool_max_connections.set(self.config.max_connections)
+
+    def _build_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=self.config.max_connections,
+            max_keepalive_connections=self.config.max_keepalive_connections,
+            keepalive_expiry=self.config.keepalive_expiry,
+        )
+        timeout = httpx.Timeout(
+            self.config.timeout, connect=self.config.connect_timeout
+        )
+        return httpx.AsyncClient(
+            limits=limits,
+            timeout=timeout,
+            http2=self._http2_enabled(),
+            event_hooks={"request": [self._on_event], "response": [self._on_event]},
+        )
+
+    def _http2_enabled(self) -> bool:
+        if not self.config.http2:
+            return False
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("llm_http_pool_http2_indisponivel", reason="h2 ausente")
+            return False
+        return True
+
+    async def _on_event(self, _: Any) -> None:
+        self.export_metrics()
+
+    def _connection_pool(self) -> Optional[Any]:
+        if self._client is None:
+            return None
+        transport = getattr(self._client, "_transport", None)
+        return getattr(transport, "_pool", None)
+
+
+# Instância global gerenciada pelo lifespan da aplicação
+_shared_http_client: Optional[SharedHTTPClient] = None
+
+
+def get_shared_http_client() -> Optional[SharedHTTPClient]:
+    """Retorna o pool HTTP compartilhado, se o lifespan o tiver iniciado."""
+    return _shared_http_client
+
+
+def set_shared_http_client(shared: Optional[SharedHTTPClient]) -> None:
+    """Define (ou remove) o pool HTTP compartilhado da aplicação."""
+    global _shared_http_client
+    _shared_http_client = shared
@@ -0,0 +1,344 @@
+"""
+Pool de backends LLM com balanceamento por latência.
+
+Cada backend é um cliente LLM (LLMClient ou MyAILLMClient) com médias
+móveis exponenciais (EWMA) de latência e taxa de erro. A seleção usa
+power-of-two-choices: sorteia dois backends saudáveis e escolhe o de menor
+score. Backends lentos ou falhando são ejetados por um tempo crescente;
+probes ativos em segundo plano detectam falhas também em backends ociosos
+e decidem a readmissão dos ejetados.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence
+
+import httpx
+import structlog
+from prometheus_client import Counter, Gauge
+
+from src.infrastructure.circuit_breaker import CircuitOpenError
+
+logger = structlog.get_logger()
+
+backend_score = Gauge(
+    "llm_backend_score",
+    "Score de roteamento por backend LLM (menor é melhor)",
+    ["backend"],
+)
+backend_latency = Gauge(
+    "llm_backend_ewma_latency_seconds",
+    "Latência EWMA observada por backend LLM",
+    ["backend"],
+)
+backend_error_rate = Gauge(
+    "llm_backend_ewma_error_rate",
+    "Taxa de erro EWMA observada por backend LLM",
+    ["backend"],
+)
+backend_ejected = Gauge(
+    "llm_backend_ejected",
+    "Backend LLM ejetado do pool (1) ou ativo (0)",
+    ["backend"],
+)
+backend_selections = Counter(
+    "llm_backend_selections_total",
+    "Requisições roteadas para cada backend LLM",
+    ["backend"],
+)
+
+
+@dataclass
+class BackendPoolConfig:
+    """Parâmetros de EWMA, ejeção e probes do pool."""
+
+    ewma_alpha: float = 0.3
+    initial_latency: float = 1.0
+    min_samples: int = 5
+    error_rate_threshold: float = 0.5
+    slow_latency_threshold: float = 30.0
+    ejection_time: float = 30.0
+    max_ejection_time: float = 300.0
+    max_ejected_fraction: float = 0.5
+    probe_interval: float = 10.0
+    probe_timeout: float = 2.0
+
+    @classmethod
+    def from_env(cls) -> "BackendPoolConfig":
+        """Carrega a configuração a partir das variáveis LLM_POOL_*."""
+        return cls(
+            ewma_alpha=float(os.getenv("LLM_POOL_EWMA_ALPHA", "0.3")),
+            error_rate_threshold=float(os.getenv("LLM_POOL_ERROR_RATE", "0.5")),
+            slow_latency_threshold=float(os.getenv("LLM_POOL_SLOW_SECONDS", "30")),
+            ejection_time=float(os.getenv("LLM_POOL_EJECTION_TIME", "30")),
+            max_ejected_fraction=float(os.getenv("LLM_POOL_MAX_EJECTED", "0.5")),
+            probe_interval=float(os.getenv("LLM_POOL_PROBE_INTERVAL", "10")),
+            probe_timeout=float(os.getenv("LLM_POOL_PROBE_TIMEOUT", "2")),
+        )
+
+
+class LLMBackend:
+    """Cliente LLM do pool e suas estatísticas de roteamento."""
+
+    def __init__(self, client: Any, config: BackendPoolConfig) -> None:
+        self.client = client
+        self.name = f"{client.base_url}|{client.model}"
+        self.config = config
+        self.ewma_latency = config.initial_latency
+        self.ewma_error_rate = 0.0
+        self.samples = 0
+        self.in_flight = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+
+    @property
+    def score(self) -> float:
+        """Latência esperada ponderada pela fila e penalizada pelos erros."""
+        success_rate = max(0.05, 1.0 - self.ewma_error_rate)
+        return self.ewma_latency * (1 + self.in_flight) / success_rate
+
+    def is_ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+    def observe(self, latency: float, ok: bool) -> None:
+        alpha = self.config.ewma_alpha
+        if self.samples == 0:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency += alpha * (latency - self.ewma_latency)
+        self.ewma_error_rate += alpha * ((0.0 if ok else 1.0) - self.ewma_error_rate)
+        self.samples += 1
+
+    def is_unhealthy(self) -> bool:
+        if self.samples < self.config.min_samples:
+            return False
+        return (
+            self.ewma_error_rate >= self.config.error_rate_threshold
+            or self.ewma_latency >= self.config.slow_latency_threshold
+        )
+
+    def publish(self, now: float) -> None:
+        backend_score.labels(backend=self.name).set(self.score)
+        backend_latency.labels(backend=self.name).set(self.ewma_latency)
+        backend_error_rate.labels(backend=self.name).set(self.ewma_error_rate)
+        backend_ejected.labels(backend=self.name).set(int(self.is_ejected(now)))
+
+
+class LLMBackendPool:
+    """Pool de clientes LLM equivalentes, com a interface de um cliente.
+
+    Expõe `generate_code`, `stream_code` e os atributos usados pelo
+    orquestrador e pelos endpoints (model, family, cotas), delegando cada
+    chamada ao backend escolhido.
+    """
+
+    def __init__(
+        self,
+        clients: Sequence[Any],
+        config: Optional[BackendPoolConfig] = None,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        if not clients:
+            raise ValueError("O pool precisa de ao menos um backend")
+        self.config = config or BackendPoolConfig()
+        self.backends = [LLMBackend(client, self.config) for client in clients]
+        self._clock = clock
+        self._rng = rng or random.Random()  # nosec B311 - balanceamento
+        self._lock = threading.Lock()
+        self._probe_task: Optional["asyncio.Task[None]"] = None
+        now = clock()
+        for backend in self.backends:
+            backend.publish(now)
+
+    # Atributos de cliente: os backends são equivalentes, vale o primeiro
+    @property
+    def primary(self) -> Any:
+        return self.backends[0].client
+
+    @property
+    def base_url(self) -> str:
+        return str(self.primary.base_url)
+
+    @property
+    def model(self) -> str:
+        return str(self.primary.model)
+
+    @property
+    def family(self) -> str:
+        return str(self.primary.family)
+
+    @property
+    def quota_manager(self) -> Any:
+        return self.primary.quota_manager
+
+    def current_quota_subject(self) -> Any:
+        return self.primary.current_quota_subject()
+
+    def select(self) -> LLMBackend:
+        """Escolhe um backend por power-of-two-choices entre os saudáveis."""
+        now = self._clock()
+        with self._lock:
+            healthy = [b for b in self.backends if not b.is_ejected(now)]
+            if not healthy:
+                # Todos ejetados: usa o que volta primeiro em vez de falhar
+                healthy = [min(self.backends, key=lambda b: b.ejected_until)]
+            if len(healthy) == 1:
+                chosen = healthy[0]
+            else:
+                first, second = self._rng.sample(healthy, 2)
+                chosen = first if first.score <= second.score else second
+            chosen.in_flight += 1
+        backend_selections.labels(backend=chosen.name).inc()
+        return chosen
+
+    def record(self, backend: LLMBackend, latency: float, ok: bool) -> None:
+        """Atualiza as médias do backend e o ejeta se estiver degradado."""
+        now = self._clock()
+        with self._lock:
+            backend.observe(latency, ok)
+            if backend.is_unhealthy() and not backend.is_ejected(now):
+                self._maybe_eject(backend, now)
+            backend.publish(now)
+
+    def release(self, backend: LLMBackend) -> None:
+        with self._lock:
+            backend.in_flight = max(0, backend.in_flight - 1)
+
+    async def generate_code(self, *args: Any, **kwargs: Any) -> str:
+        backend = self.select()
+        started = time.perf_counter()
+        try:
+            code = await backend.client.generate_code(*args, **kwargs)
+        except Exception as e:
+            if self._is_backend_failure(backend, e):
+                self.record(backend, time.perf_counter() - started, ok=False)
+            raise
+        finally:
+            self.release(backend)
+        self.record(backend, time.perf_counter() - started, ok=True)
+        return str(code)
+
+    async def stream_code(self, *args: Any, **kwargs: Any) -> AsyncIterator[str]:
+        """Streaming pelo backend escolhido; a latência é a do primeiro trecho."""
+        backend = self.select()
+        started = time.perf_counter()
+        recorded = False
+        try:
+            upstream = backend.client.stream_code(*args, **kwargs)
+            async with aclosing(upstream) as chunks:
+                async for chunk in chunks:
+                    if not recorded:
+                        self.record(backend, time.perf_counter() - started, ok=True)
+                        recorded = True
+                    yield chunk
+        except Exception as e:
+            if not recorded and self._is_backend_failure(backend, e):
+                self.record(backend, time.perf_counter() - started, ok=False)
+            raise
+        finally:
+            self.release(backend)
+
+    async def probe_all(self) -> None:
+        """Executa um probe de saúde em cada backend, em paralelo."""
+        await asyncio.gather(*(self._probe(b) for b in self.backends))
+
+    def start(self) -> None:
+        """Inicia os probes periódicos (requer um event loop em execução)."""
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.get_running_loop().create_task(
+                self._probe_loop()
+            )
+
+    def stop(self) -> None:
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Estado de cada backend, para diagnóstico."""
+        now = self._clock()
+        return [
+            {
+                "backend": b.name,
+                "score": b.score,
+                "ewma_latency": b.ewma_latency,
+                "ewma_error_rate": b.ewma_error_rate,
+                "in_flight": b.in_flight,
+                "ejected": b.is_ejected(now),
+            }
+            for b in self.backends
+        ]
+
+    async def _probe_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.config.probe_interval)
+            try:
+                await self.probe_all()
+            except Exception as e:  # pragma: no cover - proteção do loop
+                logger.error("llm_pool_probe_erro", error=str(e))
+
+    async def _probe(self, backend: LLMBackend) -> None:
+        started = time.perf_counter()
+        try:
+            ok = await backend.client.probe(timeout=self.config.probe_timeout)
+        except Exception as e:
+            logger.warning("llm_pool_probe_falhou", backend=backend.name, error=str(e))
+            ok = False
+        latency = time.perf_counter() - started
+        now = self._clock()
+        with self._lock:
+            if backend.is_ejected(now):
+                # Ejetado: o probe não altera as médias, só decide a readmissão.
+                # Readmite se a ejeção termina antes do próximo probe; se o
+                # probe falhou, mantém o backend fora por mais um período.
+                if not ok:
+                    backend.ejected_until = max(
+                        backend.ejected_until, now + self.config.probe_interval
+                    )
+                elif now >= backend.ejected_until - self.config.probe_interval:
+                    self._readmit(backend)
+            elif not ok:
+                backend.observe(latency, ok=False)
+                if backend.is_unhealthy():
+                    self._maybe_eject(backend, now)
+            backend.publish(now)
+
+    def _maybe_eject(self, backend: LLMBackend, now: float) -> None:
+        ejected = sum(1 for b in self.backends if b.is_ejected(now))
+        if (ejected + 1) / len(self.backends) > self.config.max_ejected_fraction:
+            logger.warning("llm_pool_ejecao_evitada", backend=backend.name)
+            return
+        duration = min(
+            self.config.max_ejection_time,
+            self.config.ejection_time * 2**backend.ejections,
+        )
+        backend.ejections += 1
+        backend.ejected_until = now + duration
+        logger.warning(
+            "llm_backend_ejetado",
+            backend=backend.name,
+            seconds=duration,
+            ewma_latency=round(backend.ewma_latency, 3),
+            ewma_error_rate=round(backend.ewma_error_rate, 3),
+        )
+
+    def _readmit(self, backend: LLMBackend) -> None:
+        backend.ejected_until = 0.0
+        # Recomeça as médias para não ser ejetado de novo pelo histórico
+        backend.samples = 0
+        backend.ewma_error_rate = 0.0
+        logger.info("llm_backend_readmitido", backend=backend.name)
+
+    @staticmethod
+    def _is_backend_failure(backend: LLMBackend, exc: Exception) -> bool:
+        """Erros de disponibilidade do backend (não de cota ou validação)."""
+        if isinstance(exc, (CircuitOpenError, asyncio.TimeoutError)):
+            return True
+        if isinstance(exc, httpx.HTTPError):
+            return bool(backend.client.retry_policy.is_retryable(exc))
+        return False
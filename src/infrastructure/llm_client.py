@@ -2,13 +2,69 @@
 Módulo de integração com provedores LLM (ex: OpenAI, Azure OpenAI).
 Responsável por enviar prompts e receber respostas de geração de código.
 """
-from typing import Any, Dict, Optional
+import asyncio
+import functools
+import json
+import time
+from contextlib import AsyncExitStack
+from dataclasses import replace
+from typing import Any, AsyncGenerator, Dict, Optional, Sequence, Tuple
 
 import httpx
 import structlog
+from prometheus_client import Counter
+
+from src.infrastructure.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    get_circuit_breaker,
+)
+from src.infrastructure.llm_hedging import HedgePolicy, LatencyTracker, run_hedged
+from src.infrastructure.llm_quota import (
+    QuotaConfig,
+    QuotaExceededError,
+    QuotaManager,
+    QuotaSubject,
+    current_quota_subject,
+    estimate_tokens,
+    quota_prepaid,
+    record_quota_status,
+)
+from src.infrastructure.llm_retry import (
+    RetryBudget,
+    RetryPolicy,
+    default_retry_budget,
+)
+from src.infrastructure.single_flight import (
+    SingleFlight,
+    default_single_flight,
+    request_fingerprint,
+)
 
 logger = structlog.get_logger()
 
+llm_client_attempts = Counter(
+    "llm_client_attempts_total",
+    "Total de tentativas de chamada ao provedor LLM, por desfecho",
+    ["outcome"],
+)
+
+
+class StreamNormalizer:
+    """Ajusta os trechos de um stream conforme chegam.
+
+    O stream montado deve ser igual ao que `_parse_response` devolveria para
+    a resposta completa; esta implementação repassa os trechos sem alteração.
+    """
+
+    def feed(self, chunk: str) -> str:
+        """Recebe um trecho e devolve o que já pode ser repassado."""
+        return chunk
+
+    def finish(self) -> str:
+        """Devolve o que ficou retido ao final do stream."""
+        return ""
+
 
 class LLMClient:
     def __init__(
@@ -20,7 +76,17 @@ class LLMClient:
         timeout: int = 30,
         max_retries: int = 3,
         quota_limit: int = 1000,
+        quota_window: Optional[float] = 60.0,
         config: Optional[Dict[str, Any]] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        retry_budget: Optional[RetryBudget] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        single_flight: Optional[SingleFlight] = None,
+        quota_manager: Optional[QuotaManager] = None,
+        quota_subject: Optional[QuotaSubject] = None,
+        endpoints: Optional[Sequence[str]] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
     ):
         self.base_url = base_url.rstrip("/")
         self.api_key = api_key
@@ -29,8 +95,26 @@ class LLMClient:
         self.timeout = timeout
         self.max_retries = max_retries
         self.quota_limit = quota_limit
-        self.usage_count = 0
+        # Sem gerenciador compartilhado, `quota_limit` vale para esta instância
+        # a cada `quota_window` segundos (None: limite fixo, sem reposição)
+        self.quota_manager = quota_manager or QuotaManager(
+            QuotaConfig.fixed_requests(quota_limit, quota_window)
+        )
+        # Sujeito padrão, usado fora de um `quota_scope` da requisição
+        self.quota_subject = quota_subject or QuotaSubject()
+        # Endpoints equivalentes para hedging; o base_url é sempre o primário
+        self.endpoints = [self.base_url] + [
+            e.rstrip("/") for e in endpoints or () if e.rstrip("/") != self.base_url
+        ]
+        self.hedge_policy = hedge_policy or HedgePolicy()
+        self.latency = LatencyTracker(self.hedge_policy.window_size)
         self.config = config or {}
+        # Cliente HTTP compartilhado (pool de conexões do lifespan da aplicação)
+        self.http_client = http_client
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=max_retries)
+        self.retry_budget = retry_budget or default_retry_budget
+        self.circuit_breaker = circuit_breaker
+        self.single_flight = single_flight or default_single_flight
 
     async def generate_code(
         self,
@@ -39,9 +123,127 @@ class LLMClient:
         max_tokens: int = 1024,
         extra_params: Optional[Dict[str, Any]] = None,
     ) -> str:
-        if self.usage_count >= self.quota_limit:
-            logger.warning("Limite de uso do LLM atingido", quota=self.quota_limit)
-            raise RuntimeError("Limite de uso do LLM atingido")
+        await self._acquire_quota(prompt, max_tokens)
+        url, payload, headers = self._build_request(
+            prompt, temperature, max_tokens, extra_params
+        )
+        return await self._execute(url, payload, headers, prompt=prompt)
+
+    async def stream_code(
+        self,
+        prompt: str,
+        temperature: float = 0.2,
+        max_tokens: int = 1024,
+        extra_params: Optional[Dict[str, Any]] = None,
+    ) -> AsyncGenerator[str, None]:
+        """Gera código em streaming (SSE), produzindo os trechos conforme chegam.
+
+        Fechar o gerador (aclose) encerra a conexão com o provedor, o que
+        interrompe a geração e o consumo de tokens upstream.
+        """
+        await self._acquire_quota(prompt, max_tokens)
+        url, payload, headers = self._build_request(
+            prompt, temperature, max_tokens, extra_params
+        )
+        payload["stream"] = True
+        breaker = self.circuit_breaker
+        if breaker is not None and not breaker.allow_request():
+            llm_client_attempts.labels(outcome="circuit_open").inc()
+            raise CircuitOpenError(
+                f"Circuito aberto para {self.base_url} ({self.model})"
+            )
+        started = time.perf_counter()
+        try:
+            async with AsyncExitStack() as stack:
+                client = self.http_client
+                if client is None or client.is_closed:
+                    client = await stack.enter_async_context(
+                        httpx.AsyncClient(timeout=self.timeout)
+                    )
+                response = await stack.enter_async_context(
+                    client.stream(
+                        "POST", url, json=payload, headers=headers, timeout=self.timeout
+                    )
+                )
+                response.raise_for_status()
+                if breaker is not None:
+                    # Sucesso medido até o primeiro byte (time to first byte)
+                    breaker.record_success(time.perf_counter() - started)
+                    breaker = None
+                llm_client_attempts.labels(outcome="success").inc()
+                normalizer = self._stream_normalizer()
+                async for line in response.aiter_lines():
+                    chunk = self._parse_sse_line(line)
+                    if chunk is None:
+                        break
+                    chunk = normalizer.feed(chunk)
+                    if chunk:
+                        yield chunk
+                tail = normalizer.finish()
+                if tail:
+                    yield tail
+        except Exception as e:
+            if breaker is not None:
+                self._record_breaker_failure(e, time.perf_counter() - started, breaker)
+            logger.error("Erro no streaming LLM", error=str(e), prompt=prompt)
+            raise
+        except BaseException:
+            # Cancelado antes do primeiro byte: a chamada não tem resultado
+            if breaker is not None:
+                breaker.release()
+            raise
+
+    async def probe(self, timeout: float = 2.0) -> bool:
+        """Verificação de saúde barata do provedor, sem consumir cota.
+
+        Qualquer resposta abaixo de 500 (inclusive 401/405) indica que o
+        provedor está de pé.
+        """
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        if self.http_client is not None and not self.http_client.is_closed:
+            response = await self.http_client.get(
+                self._health_url(), headers=headers, timeout=timeout
+            )
+        else:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                response = await client.get(self._health_url(), headers=headers)
+        return response.status_code < 500
+
+    def _health_url(self) -> str:
+        return f"{self.base_url}/v1/models"
+
+    async def _acquire_quota(self, prompt: str, max_tokens: int) -> None:
+        """Consome a cota (1 requisição + tokens estimados) sem bloquear.
+
+        Raises:
+            QuotaExceededError: Se algum bucket de cota estiver sem saldo.
+        """
+        if quota_prepaid():
+            return
+        tokens = estimate_tokens(prompt, self.config.get("max_tokens", max_tokens))
+        status = await self.quota_manager.consume(self.current_quota_subject(), tokens)
+        record_quota_status(status)
+        if not status.allowed:
+            logger.warning(
+                "Limite de uso do LLM atingido",
+                scope=status.exceeded_scope,
+                unit=status.exceeded_unit,
+            )
+            raise QuotaExceededError(status)
+
+    def current_quota_subject(self) -> QuotaSubject:
+        """Sujeito da requisição corrente, com o modelo deste cliente."""
+        subject = current_quota_subject() or self.quota_subject
+        return replace(subject, model=self.model)
+
+    def _build_request(
+        self,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        extra_params: Optional[Dict[str, Any]],
+    ) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+        """Monta URL, payload e headers da requisição de completion."""
         payload = {
             "family": self.config.get("family", self.family),
             "model": self.config.get("model", self.model),
@@ -55,23 +257,182 @@ class LLMClient:
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
+        return f"{self.base_url}/v1/completions", payload, headers
+
+    async def _execute(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Dict[str, str],
+        prompt: Optional[str] = None,
+    ) -> str:
+        """Envia a requisição coalescendo chamadas idênticas concorrentes."""
+
+        async def call() -> str:
+            response = await self._send_hedged(url, payload, headers, prompt=prompt)
+            return self._parse_response(response.json())
+
+        fingerprint = request_fingerprint(url, payload, self.api_key)
+        code = await self.single_flight.do(fingerprint, call)
+        return str(code)
+
+    def _parse_response(self, data: Dict[str, Any]) -> str:
+        """Extrai o texto gerado do corpo de resposta do provedor."""
+        return str(data["choices"][0]["text"])
+
+    def _parse_stream_chunk(self, data: Dict[str, Any]) -> str:
+        """Extrai o trecho de texto de um evento de streaming do provedor."""
+        choices = data.get("choices") or [{}]
+        return str(choices[0].get("text") or "")
+
+    def _stream_normalizer(self) -> "StreamNormalizer":
+        """Normalizador dos trechos de um stream (o mesmo de `_parse_response`)."""
+        return StreamNormalizer()
+
+    def _parse_sse_line(self, line: str) -> Optional[str]:
+        """Interpreta uma linha SSE: trecho de texto, "" se ignorável, None no fim."""
+        line = line.strip()
+        if not line.startswith("data:"):
+            return ""
+        data = line[len("data:") :].strip()
+        if data == "[DONE]":
+            return None
+        try:
+            return self._parse_stream_chunk(json.loads(data))
+        except (ValueError, AttributeError):
+            logger.warning("Evento SSE inválido ignorado", data=data[:100])
+            return ""
+
+    async def _send_hedged(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Dict[str, str],
+        prompt: Optional[str] = None,
+    ) -> httpx.Response:
+        """Envia a requisição com hedging entre os endpoints equivalentes.
+
+        Sem endpoints alternativos (ou com hedging desativado) equivale a
+        `_send`. Só falhas transitórias (ou circuito aberto) disparam a cópia;
+        a chamada conta uma única requisição original no orçamento de
+        retries, com ou sem hedge. A latência da resposta vencedora alimenta
+        o atraso adaptativo do hedge.
+        """
+        policy = self.hedge_policy
+        self.retry_budget.record_request()
+        if len(self.endpoints) == 1 or not policy.enabled:
+            started = time.perf_counter()
+            response = await self._send(url, payload, headers, prompt=prompt)
+            self.latency.record(time.perf_counter() - started)
+            return response
+        attempts = [
+            functools.partial(
+                self._send,
+                self._endpoint_url(url, endpoint),
+                payload,
+                headers,
+                prompt=prompt,
+                breaker=self._breaker_for(endpoint),
+            )
+            for endpoint in self.endpoints[: 1 + policy.max_hedges]
+        ]
+        response, winner, latency = await run_hedged(
+            attempts, policy.delay(self.latency), hedge_on=self._should_hedge
+        )
+        self.latency.record(latency)
+        if winner:
+            logger.info("llm_hedge_venceu", endpoint=self.endpoints[winner])
+        return response
+
+    def _should_hedge(self, exc: BaseException) -> bool:
+        """Falhas que justificam tentar outro endpoint."""
+        return isinstance(exc, CircuitOpenError) or self.retry_policy.is_retryable(exc)
+
+    def _endpoint_url(self, url: str, endpoint: str) -> str:
+        """Troca o base_url primário da URL pelo de outro endpoint."""
+        if endpoint == self.base_url or not url.startswith(self.base_url):
+            return url
+        return endpoint + url[len(self.base_url) :]
+
+    def _breaker_for(self, endpoint: str) -> Optional[CircuitBreaker]:
+        """Circuit breaker do endpoint (cada gateway tem o seu)."""
+        if self.circuit_breaker is None or endpoint == self.base_url:
+            return self.circuit_breaker
+        return get_circuit_breaker(endpoint, self.model)
+
+    async def _send(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        headers: Dict[str, str],
+        prompt: Optional[str] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> httpx.Response:
+        """Envia a requisição aplicando a política de retry.
+
+        Erros não retentáveis (ex: 4xx) são propagados imediatamente. Os
+        retries respeitam backoff com jitter, Retry-After e o orçamento
+        global de retries. Com o circuit breaker aberto a chamada é
+        rejeitada com CircuitOpenError sem tocar o provedor.
+        """
+        policy = self.retry_policy
         last_exc: Optional[Exception] = None
-        for attempt in range(1, self.max_retries + 1):
+        breaker = breaker or self.circuit_breaker
+        for attempt in range(1, policy.max_attempts + 1):
+            if breaker is not None and not breaker.allow_request():
+                llm_client_attempts.labels(outcome="circuit_open").inc()
+                logger.warning(
+                    "Circuito LLM aberto", base_url=breaker.base_url, model=self.model
+                )
+                raise CircuitOpenError(
+                    f"Circuito aberto para {breaker.base_url} ({self.model})"
+                )
+            started = time.perf_counter()
             try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    response = await client.post(
-                        f"{self.base_url}/v1/completions", json=payload, headers=headers
-                    )
-                    response.raise_for_status()
-                    data = response.json()
-                    self.usage_count += 1
-                    logger.info("llm_request_success", attempt=attempt, prompt=prompt)
-                    return str(data["choices"][0]["text"])
+                response = await self._post(url, payload, headers)
+                response.raise_for_status()
+                if breaker is not None:
+                    breaker.record_success(time.perf_counter() - started)
+                llm_client_attempts.labels(outcome="success").inc()
+                logger.info("llm_request_success", attempt=attempt, prompt=prompt)
+                return response
             except Exception as e:
                 last_exc = e
+                if breaker is not None:
+                    self._record_breaker_failure(
+                        e, time.perf_counter() - started, breaker
+                    )
+                if not policy.is_retryable(e):
+                    llm_client_attempts.labels(outcome="fail_fast").inc()
+                    logger.warning(
+                        "Tentativa LLM falhou sem retry",
+                        attempt=attempt,
+                        error=str(e),
+                        prompt=prompt,
+                    )
+                    raise
+                if attempt >= policy.max_attempts:
+                    llm_client_attempts.labels(outcome="exhausted").inc()
+                    break
+                if not self.retry_budget.try_acquire_retry():
+                    llm_client_attempts.labels(outcome="budget_exhausted").inc()
+                    logger.warning("Orçamento de retries LLM esgotado", prompt=prompt)
+                    break
+                delay = policy.compute_delay(attempt, policy.retry_after(e))
+                llm_client_attempts.labels(outcome="retry").inc()
                 logger.warning(
-                    "Tentativa LLM falhou", attempt=attempt, error=str(e), prompt=prompt
+                    "Tentativa LLM falhou",
+                    attempt=attempt,
+                    error=str(e),
+                    retry_in=round(delay, 3),
+                    prompt=prompt,
                 )
+                await asyncio.sleep(delay)
+            except BaseException:
+                # Cancelada (ex: perdedora do hedge): libera a vaga de prova
+                if breaker is not None:
+                    breaker.release()
+                raise
         logger.error(
             "Erro ao chamar LLM após retries", error=str(last_exc), prompt=prompt
         )
@@ -82,3 +443,32 @@ class LLMClient:
             raise RuntimeError(
                 "Falha ao executar requisição LLM após todas as tentativas"
             )
+
+    def _record_breaker_failure(
+        self,
+        exc: Exception,
+        duration: float,
+        breaker: CircuitBreaker,
+    ) -> None:
+        """Conta no circuit breaker apenas falhas atribuíveis ao provedor.
+
+        Respostas 4xx não retentáveis indicam problema na requisição, não
+        degradação do provedor, e contam como chamada bem-sucedida.
+        """
+        if isinstance(
+            exc, httpx.HTTPStatusError
+        ) and not self.retry_policy.is_retryable(exc):
+            breaker.record_success(duration)
+        else:
+            breaker.record_failure()
+
+    async def _post(
+        self, url: str, payload: Dict[str, Any], headers: Dict[str, str]
+    ) -> httpx.Response:
+        """Envia o POST pelo pool compartilhado, ou por um cliente efêmero."""
+        if self.http_client is not None and not self.http_client.is_closed:
+            return await self.http_client.post(
+                url, json=payload, headers=headers, timeout=self.timeout
+            )
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            return await client.post(url, json=payload, headers=headers)
@@ -1,48 +1,16 @@
 """Cliente específico para integração com MyAI."""
-from typing import Dict, Optional
+from typing import Any, Dict, Optional, Sequence, Tuple
 
 import httpx
 
-from src.infrastructure.llm_client import LLMClient
+from src.infrastructure.circuit_breaker import CircuitBreaker
+from src.infrastructure.llm_client import LLMClient, StreamNormalizer
+from src.infrastructure.llm_hedging import HedgePolicy
+from src.infrastructure.llm_quota import QuotaManager, QuotaSubject
+from src.infrastructure.llm_retry import RetryPolicy
 
-
-class MyAILLMClient(LLMClient):
-    """Cliente LLM específico para MyAI que herda de LLMClient."""
-
-    def __init__(
-        self,
-        base_url: str,
-        api_key: str,
-        family: str = "openai",
-        model: str = "o4-mini",
-    ) -> None:
-        """Inicializa o cliente MyAI."""
-        super().__init__(base_url=base_url, api_key=api_key, family=family, model=model)
-        # Configurações específicas do MyAI podem ser adicionadas aqui
-
-    async def generate_code(
-        self,
-        prompt: str,
-        temperature: float = 0.7,
-        max_tokens: int = 2048,
-        extra_params: Optional[Dict] = None,
-    ) -> str:
-        """Implementação específica do MyAI para geração de código.
-
-        Args:
-            prompt (str): Prompt de entrada
-            temperature (float): Temperatura do modelo
-            max_tokens (int): Máximo de tokens de saída
-            extra_params (dict): Parâmetros extras opcionais
-        Returns:
-            str: Código Python gerado
-        Raises:
-            httpx.HTTPStatusError: Em caso de erro HTTP
-        """
-        if extra_params is None:
-            extra_params = {}
-
-        system_prompt = """You are a specialized assistant for generating only secure Python code for MCP (Model Context Protocol) server agents.
+# Prompt de sistema com os guardrails de segurança enviados ao MyAI
+SYSTEM_PROMPT = """You are a specialized assistant for generating only secure Python code for MCP (Model Context Protocol) server agents.
 
 CRITICAL SECURITY GUARDRAILS:
 
@@ -137,13 +105,124 @@ APPROVED LIBRARIES:
 
 **REMEMBER:** Insecure code can compromise the entire system. When in doubt, be more restrictive."""
 
-        payload = {
+
+CODE_FENCE = "```python"
+
+
+class FenceStripper(StreamNormalizer):
+    """Remove do stream a cerca de código e os espaços das pontas.
+
+    Equivale a `MyAILLMClient._parse_response` aplicado ao conteúdo montado:
+    o início fica retido até decidir se há cerca, e espaços e crases finais
+    só são repassados quando seguidos de outro conteúdo.
+    """
+
+    def __init__(self) -> None:
+        self._head = ""
+        self._fenced: Optional[bool] = None
+        self._started = False
+        self._tail = ""
+
+    def feed(self, chunk: str) -> str:
+        if self._fenced is None:
+            self._head += chunk
+            if len(self._head) < len(CODE_FENCE) and CODE_FENCE.startswith(self._head):
+                return ""
+            self._fenced = self._head.startswith(CODE_FENCE)
+            chunk = self._head.removeprefix(CODE_FENCE) if self._fenced else self._head
+        if not self._started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                return ""
+            self._started = True
+        pending = self._tail + chunk
+        # Espaços e crases finais ainda podem ser removidos no fim do stream
+        cut = len(pending)
+        while cut and (pending[cut - 1].isspace() or pending[cut - 1] == "`"):
+            cut -= 1
+        self._tail = pending[cut:]
+        return pending[:cut]
+
+    def finish(self) -> str:
+        if self._fenced is None:
+            # Stream menor que a cerca
+            self._fenced = False
+            self._tail = self._head
+        tail = self._tail.removesuffix("```") if self._fenced else self._tail
+        return tail.strip() if not self._started else tail.rstrip()
+
+
+class MyAILLMClient(LLMClient):
+    """Cliente LLM específico para MyAI que herda de LLMClient."""
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        family: str = "openai",
+        model: str = "o4-mini",
+        http_client: Optional[httpx.AsyncClient] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        quota_manager: Optional[QuotaManager] = None,
+        quota_subject: Optional[QuotaSubject] = None,
+        endpoints: Optional[Sequence[str]] = None,
+        hedge_policy: Optional[HedgePolicy] = None,
+    ) -> None:
+        """Inicializa o cliente MyAI."""
+        super().__init__(
+            base_url=base_url,
+            api_key=api_key,
+            family=family,
+            model=model,
+            http_client=http_client,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            quota_manager=quota_manager,
+            quota_subject=quota_subject,
+            endpoints=endpoints,
+            hedge_policy=hedge_policy,
+        )
+        # Configurações específicas do MyAI podem ser adicionadas aqui
+
+    async def generate_code(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: int = 2048,
+        extra_params: Optional[Dict] = None,
+    ) -> str:
+        """Implementação específica do MyAI para geração de código.
+
+        Args:
+            prompt (str): Prompt de entrada
+            temperature (float): Temperatura do modelo
+            max_tokens (int): Máximo de tokens de saída
+            extra_params (dict): Parâmetros extras opcionais
+        Returns:
+            str: Código Python gerado
+        Raises:
+            httpx.HTTPStatusError: Em caso de erro HTTP
+        """
+        return await super().generate_code(
+            prompt, temperature, max_tokens, extra_params
+        )
+
+    def _build_request(
+        self,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        extra_params: Optional[Dict],
+    ) -> Tuple[str, Dict[str, Any], Dict[str, str]]:
+        """Monta URL, payload no formato `messages` do MyAI e headers."""
+        payload: Dict[str, Any] = {
             "knowledge_base": None,
             "llm_family": self.family,
             "model": self.model,
             "max_output_tokens": max_tokens,
             "messages": [
-                {"role": "system", "content": system_prompt},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "human", "content": prompt},
             ],
             "temperature": temperature,
@@ -152,19 +231,30 @@ APPROVED LIBRARIES:
         if extra_params:
             payload.update(extra_params)
 
-        headers = self._prepare_headers()
+        return self.base_url, payload, self._prepare_headers()
+
+    def _parse_response(self, data: Dict) -> str:
+        """Extrai o conteúdo da mensagem MyAI, removendo cercas de código."""
+        content = data.get("message", {}).get("content", "")
+
+        # Limpar formatação de código se presente
+        if content.startswith(CODE_FENCE):
+            content = content.removeprefix(CODE_FENCE).removesuffix("```")
+
+        return str(content.strip())
 
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            response = await client.post(self.base_url, json=payload, headers=headers)
-            response.raise_for_status()
-            data = response.json()
-            content = data.get("message", {}).get("content", "")
+    def _parse_stream_chunk(self, data: Dict) -> str:
+        """Extrai o trecho de conteúdo de um evento de streaming do MyAI."""
+        message = data.get("delta") or data.get("message") or {}
+        return str(message.get("content") or "")
 
-            # Limpar formatação de código se presente
-            if content.startswith("```python"):
-                content = content.removeprefix("```python").removesuffix("```")
+    def _stream_normalizer(self) -> StreamNormalizer:
+        return FenceStripper()
 
-            return str(content.strip())
+    def _health_url(self) -> str:
+        # O gateway não tem rota de saúde: um GET no endpoint de chat
+        # responde 405 sem gerar tokens, o que basta como probe
+        return self.base_url
 
     def _prepare_headers(self) -> Dict[str, str]:
         """Prepara headers específicos para MyAI."""
@@ -0,0 +1,164 @@
+"""
+Requisições hedged entre endpoints LLM equivalentes.
+
+A requisição vai para o primeiro endpoint; se ele não responder dentro de
+um atraso adaptativo (o p95 das latências recentes), uma cópia é enviada ao
+próximo endpoint. A primeira resposta bem-sucedida vence e as demais são
+canceladas. Uma falha transitória antes do atraso dispara a cópia
+imediatamente; uma falha determinística (ex: 4xx) é propagada sem cópia.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import (
+    Awaitable,
+    Callable,
+    Deque,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+import structlog
+from prometheus_client import Counter, Gauge
+
+logger = structlog.get_logger()
+
+T = TypeVar("T")
+
+hedge_events = Counter(
+    "llm_hedge_events_total",
+    "Eventos de hedging (call, hedge, primary_win, hedge_win)",
+    ["event"],
+)
+hedge_delay = Gauge(
+    "llm_hedge_delay_seconds",
+    "Atraso atual antes de enviar a requisição hedge",
+)
+
+
+@dataclass
+class HedgePolicy:
+    """Parâmetros do atraso adaptativo de hedging."""
+
+    enabled: bool = True
+    quantile: float = 0.95
+    initial_delay: float = 2.0
+    min_delay: float = 0.05
+    max_delay: float = 10.0
+    min_samples: int = 20
+    window_size: int = 200
+    max_hedges: int = 1
+
+    @classmethod
+    def from_env(cls) -> "HedgePolicy":
+        """Carrega a política a partir das variáveis LLM_HEDGE_*."""
+        return cls(
+            enabled=os.getenv("LLM_HEDGE_ENABLED", "true").lower()
+            in ("1", "true", "yes"),
+            quantile=float(os.getenv("LLM_HEDGE_QUANTILE", "0.95")),
+            initial_delay=float(os.getenv("LLM_HEDGE_INITIAL_DELAY", "2")),
+            min_delay=float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.05")),
+            max_delay=float(os.getenv("LLM_HEDGE_MAX_DELAY", "10")),
+            max_hedges=int(os.getenv("LLM_HEDGE_MAX_HEDGES", "1")),
+        )
+
+    def delay(self, tracker: "LatencyTracker") -> float:
+        """Atraso antes do hedge: quantil das latências, limitado."""
+        observed = tracker.quantile(self.quantile, self.min_samples)
+        value = self.initial_delay if observed is None else observed
+        return min(self.max_delay, max(self.min_delay, value))
+
+
+class LatencyTracker:
+    """Janela deslizante das latências de chamadas bem-sucedidas."""
+
+    def __init__(self, window_size: int = 200) -> None:
+        self._samples: Deque[float] = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._samples.append(latency)
+
+    def quantile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        """Quantil `q` das amostras (None se houver menos que `min_samples`)."""
+        with self._lock:
+            if len(self._samples) < max(1, min_samples):
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+
+async def run_hedged(
+    attempts: Sequence[Callable[[], Awaitable[T]]],
+    delay: float,
+    hedge_on: Optional[Callable[[BaseException], bool]] = None,
+) -> Tuple[T, int, float]:
+    """Executa `attempts` em hedging e retorna (resultado, índice, latência).
+
+    A tentativa i+1 começa `delay` segundos após a i, ou logo que a i falhar
+    com um erro aceito por `hedge_on` (padrão: qualquer erro). Um erro
+    recusado por `hedge_on` é propagado na hora, cancelando as demais; se
+    todas falharem, a última exceção é propagada. As tentativas canceladas
+    são aguardadas antes de retornar.
+    """
+    hedge_events.labels(event="call").inc()
+    hedge_delay.set(delay)
+    tasks: List["asyncio.Task[T]"] = []
+    started: List[float] = []
+    last_exc: Optional[BaseException] = None
+
+    def launch() -> None:
+        if tasks:
+            hedge_events.labels(event="hedge").inc()
+        started.append(time.perf_counter())
+        tasks.append(asyncio.ensure_future(attempts[len(tasks)]()))
+
+    launch()
+    try:
+        while True:
+            pending = [t for t in tasks if not t.done()]
+            can_hedge = len(tasks) < len(attempts)
+            if not pending:
+                if not can_hedge:
+                    raise last_exc or RuntimeError("Nenhuma tentativa executada")
+                launch()
+                continue
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=delay if can_hedge else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                launch()
+                continue
+            for task in done:
+                index = tasks.index(task)
+                exc = task.exception()
+                if exc is None:
+                    hedge_events.labels(
+                        event="hedge_win" if index else "primary_win"
+                    ).inc()
+                    return task.result(), index, time.perf_counter() - started[index]
+                last_exc = exc
+                logger.warning(
+                    "llm_hedge_tentativa_falhou", attempt=index, error=str(exc)
+                )
+                if hedge_on is not None and not hedge_on(exc):
+                    # Repetir a requisição em outro endpoint falharia igual
+                    raise exc
+    finally:
+        losers = [task for task in tasks if not task.done()]
+        for task in losers:
+            task.cancel()
+        await asyncio.gather(*losers, return_exceptions=True)
@@ -0,0 +1,418 @@
+"""
+Cotas de uso dos provedores LLM com token buckets.
+
+Cada requisição consome, de forma atômica, um token de requisição e uma
+estimativa de tokens do modelo nos buckets do usuário, do tenant e do
+modelo. O consumo nunca espera por reposição: se algum bucket não tiver
+saldo a chamada é rejeitada na hora, com o tempo até haver saldo.
+
+O backend em memória atende um único processo; o backend SQLite guarda os
+buckets num arquivo compartilhado pelos workers da mesma máquina.
+"""
+import asyncio
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import structlog
+from prometheus_client import Counter
+
+logger = structlog.get_logger()
+
+quota_rejections = Counter(
+    "llm_quota_rejections_total",
+    "Chamadas ao LLM rejeitadas por cota esgotada",
+    ["scope", "unit"],
+)
+quota_consumed = Counter(
+    "llm_quota_consumed_total",
+    "Unidades de cota consumidas (requisições e tokens estimados)",
+    ["unit"],
+)
+
+SCOPES = ("user", "tenant", "model")
+UNITS = ("requests", "tokens")
+
+
+def estimate_tokens(prompt: str, max_tokens: int) -> int:
+    """Estimativa conservadora de tokens: ~4 caracteres por token + saída."""
+    return math.ceil(len(prompt or "") / 4) + max(0, int(max_tokens))
+
+
+@dataclass(frozen=True)
+class QuotaLimit:
+    """Capacidade (rajada) e taxa de reposição de um bucket."""
+
+    capacity: float
+    refill_per_second: float
+
+    @classmethod
+    def per_minute(cls, amount: float) -> Optional["QuotaLimit"]:
+        """Limite de `amount` por minuto (None se `amount` <= 0)."""
+        if amount <= 0:
+            return None
+        return cls(capacity=amount, refill_per_second=amount / 60.0)
+
+
+def _env_limit(name: str, default: str) -> Optional[QuotaLimit]:
+    return QuotaLimit.per_minute(float(os.getenv(name, default) or 0))
+
+
+@dataclass
+class QuotaConfig:
+    """Limites por escopo; None desativa o bucket correspondente."""
+
+    user_requests: Optional[QuotaLimit] = None
+    user_tokens: Optional[QuotaLimit] = None
+    tenant_requests: Optional[QuotaLimit] = None
+    tenant_tokens: Optional[QuotaLimit] = None
+    model_requests: Optional[QuotaLimit] = None
+    model_tokens: Optional[QuotaLimit] = None
+
+    @classmethod
+    def from_env(cls) -> "QuotaConfig":
+        """Carrega os limites (por minuto) das variáveis LLM_QUOTA_*."""
+        return cls(
+            user_requests=_env_limit("LLM_QUOTA_USER_RPM", "30"),
+            user_tokens=_env_limit("LLM_QUOTA_USER_TPM", "60000"),
+            tenant_requests=_env_limit("LLM_QUOTA_TENANT_RPM", "300"),
+            tenant_tokens=_env_limit("LLM_QUOTA_TENANT_TPM", "600000"),
+            model_requests=_env_limit("LLM_QUOTA_MODEL_RPM", "600"),
+            model_tokens=_env_limit("LLM_QUOTA_MODEL_TPM", "1000000"),
+        )
+
+    @classmethod
+    def fixed_requests(
+        cls, limit: int, window: Optional[float] = None
+    ) -> "QuotaConfig":
+        """Limite de `limit` requisições por modelo a cada `window` segundos.
+
+        O saldo se repõe continuamente ao longo da janela; sem `window` o
+        limite é fixo, sem reposição.
+        """
+        refill = limit / window if window else 0.0
+        return cls(model_requests=QuotaLimit(capacity=limit, refill_per_second=refill))
+
+    def limit_for(self, scope: str, unit: str) -> Optional[QuotaLimit]:
+        limit: Optional[QuotaLimit] = getattr(self, f"{scope}_{unit}")
+        return limit
+
+
+@dataclass(frozen=True)
+class QuotaSubject:
+    """Quem consome a cota: usuário, tenant e modelo da chamada."""
+
+    user: str = "anonymous"
+    tenant: str = "default"
+    model: str = "default"
+
+
+@dataclass(frozen=True)
+class _Bucket:
+    key: str
+    scope: str
+    unit: str
+    limit: QuotaLimit
+    cost: float
+
+
+@dataclass
+class QuotaStatus:
+    """Resultado de um consumo (ou consulta) de cota."""
+
+    allowed: bool
+    remaining: Dict[str, float] = field(default_factory=dict)
+    limits: Dict[str, float] = field(default_factory=dict)
+    retry_after: Optional[float] = None
+    exceeded_scope: Optional[str] = None
+    exceeded_unit: Optional[str] = None
+
+    def headers(self) -> Dict[str, str]:
+        """Headers HTTP com o saldo restante (menor saldo entre os escopos)."""
+        headers = {}
+        for unit in UNITS:
+            if unit in self.limits:
+                name = unit.capitalize()
+                headers[f"X-Quota-Limit-{name}"] = str(int(self.limits[unit]))
+                headers[f"X-Quota-Remaining-{name}"] = str(
+                    max(0, int(self.remaining[unit]))
+                )
+        if not self.allowed and self.retry_after is not None:
+            headers["Retry-After"] = str(math.ceil(self.retry_after))
+        return headers
+
+
+class QuotaExceededError(RuntimeError):
+    """Chamada rejeitada por falta de saldo em algum bucket de cota."""
+
+    def __init__(self, status: QuotaStatus) -> None:
+        super().__init__("Limite de uso do LLM atingido")
+        self.status = status
+
+
+# Estado de um bucket: (saldo, instante da última atualização)
+_State = Tuple[float, float]
+
+
+def _refill(state: Optional[_State], limit: QuotaLimit, now: float) -> float:
+    if state is None:
+        return limit.capacity
+    tokens, updated_at = state
+    elapsed = max(0.0, now - updated_at)
+    return min(limit.capacity, tokens + elapsed * limit.refill_per_second)
+
+
+def _apply(
+    buckets: List[_Bucket], states: Dict[str, _State], now: float, consume: bool
+) -> Tuple[QuotaStatus, Dict[str, _State]]:
+    """Decide o consumo (tudo ou nada) e calcula os novos estados."""
+    levels = {b.key: _refill(states.get(b.key), b.limit, now) for b in buckets}
+    failing = next((b for b in buckets if levels[b.key] < b.cost), None)
+    allowed = failing is None
+    if consume and allowed:
+        for b in buckets:
+            levels[b.key] -= b.cost
+    status = QuotaStatus(allowed=allowed)
+    for b in buckets:
+        status.remaining[b.unit] = min(
+            status.remaining.get(b.unit, math.inf), levels[b.key]
+        )
+        status.limits[b.unit] = min(
+            status.limits.get(b.unit, math.inf), b.limit.capacity
+        )
+    if failing is not None:
+        status.exceeded_scope = failing.scope
+        status.exceeded_unit = failing.unit
+        rate = failing.limit.refill_per_second
+        if rate > 0 and failing.cost <= failing.limit.capacity:
+            status.retry_after = (failing.cost - levels[failing.key]) / rate
+    return status, {b.key: (levels[b.key], now) for b in buckets}
+
+
+class InMemoryQuotaBackend:
+    """Buckets num dicionário do processo (um worker)."""
+
+    blocking = False
+
+    def __init__(self) -> None:
+        self._states: Dict[str, _State] = {}
+        self._lock = threading.Lock()
+
+    def consume(
+        self, buckets: List[_Bucket], now: float, dry_run: bool = False
+    ) -> QuotaStatus:
+        with self._lock:
+            status, new_states = _apply(buckets, self._states, now, not dry_run)
+            if status.allowed and not dry_run:
+                self._states.update(new_states)
+            return status
+
+    def reset(self) -> None:
+        with self._lock:
+            self._states.clear()
+
+
+class SQLiteQuotaBackend:
+    """Buckets num arquivo SQLite compartilhado entre workers.
+
+    Cada consumo é uma transação `BEGIN IMMEDIATE` curta; se o arquivo
+    estiver bloqueado por mais que `busy_timeout`, o erro é propagado para o
+    gerenciador, que não bloqueia a requisição esperando.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, busy_timeout: float = 0.05) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=busy_timeout, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_quota ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def consume(
+        self, buckets: List[_Bucket], now: float, dry_run: bool = False
+    ) -> QuotaStatus:
+        keys = [b.key for b in buckets]
+        placeholders = ",".join("?" for _ in keys)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT key, tokens, updated_at FROM llm_quota "  # nosec B608
+                    f"WHERE key IN ({placeholders})",
+                    keys,
+                ).fetchall()
+                states = {key: (tokens, updated) for key, tokens, updated in rows}
+                status, new_states = _apply(buckets, states, now, not dry_run)
+                if status.allowed and not dry_run:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO llm_quota (key, tokens, updated_at) "
+                        "VALUES (?, ?, ?)",
+                        [(k, s[0], s[1]) for k, s in new_states.items()],
+                    )
+                self._conn.execute("COMMIT")
+                return status
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def reset(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_quota")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+QuotaBackend = Union[InMemoryQuotaBackend, SQLiteQuotaBackend]
+
+
+class QuotaManager:
+    """Aplica os limites de `QuotaConfig` sobre um backend de buckets."""
+
+    def __init__(
+        self,
+        config: Optional[QuotaConfig] = None,
+        backend: Optional[QuotaBackend] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.config = config or QuotaConfig()
+        self.backend = backend or InMemoryQuotaBackend()
+        self._clock = clock
+
+    @classmethod
+    def from_env(cls) -> "QuotaManager":
+        """Usa SQLite se LLM_QUOTA_SQLITE_PATH estiver definido."""
+        path = os.getenv("LLM_QUOTA_SQLITE_PATH")
+        backend = SQLiteQuotaBackend(path) if path else InMemoryQuotaBackend()
+        return cls(QuotaConfig.from_env(), backend)
+
+    async def consume(self, subject: QuotaSubject, tokens: int = 0) -> QuotaStatus:
+        """Consome 1 requisição e `tokens` de todos os escopos, sem esperar."""
+        status = await self._run(self._buckets(subject, tokens), dry_run=False)
+        if status.allowed:
+            quota_consumed.labels(unit="requests").inc()
+            quota_consumed.labels(unit="tokens").inc(tokens)
+        else:
+            quota_rejections.labels(
+                scope=status.exceeded_scope, unit=status.exceeded_unit
+            ).inc()
+            logger.warning(
+                "llm_quota_excedida",
+                scope=status.exceeded_scope,
+                unit=status.exceeded_unit,
+                user=subject.user,
+                tenant=subject.tenant,
+                model=subject.model,
+            )
+        return status
+
+    async def peek(self, subject: QuotaSubject) -> QuotaStatus:
+        """Consulta o saldo atual sem consumir."""
+        return await self._run(self._buckets(subject, 0), dry_run=True)
+
+    def _buckets(self, subject: QuotaSubject, tokens: int) -> List[_Bucket]:
+        buckets = []
+        for scope in SCOPES:
+            for unit in UNITS:
+                limit = self.config.limit_for(scope, unit)
+                if limit is None:
+                    continue
+                cost = 1.0 if unit == "requests" else float(tokens)
+                key = f"{scope}:{getattr(subject, scope)}:{unit}"
+                buckets.append(_Bucket(key, scope, unit, limit, cost))
+        return buckets
+
+    async def _run(self, buckets: List[_Bucket], dry_run: bool) -> QuotaStatus:
+        if not buckets:
+            return QuotaStatus(allowed=True)
+        now = self._clock()
+        try:
+            if self.backend.blocking:
+                return await asyncio.to_thread(
+                    self.backend.consume, buckets, now, dry_run
+                )
+            return self.backend.consume(buckets, now, dry_run)
+        except sqlite3.Error as e:
+            # Backend indisponível não derruba a geração de código (fail-open)
+            logger.warning("llm_quota_backend_erro", error=str(e))
+            return QuotaStatus(allowed=True)
+
+
+# Quem está consumindo a cota na requisição corrente. Os clientes LLM são
+# compartilhados entre requisições, então o sujeito não pode ficar no cliente
+_current_subject: ContextVar[Optional[QuotaSubject]] = ContextVar(
+    "llm_quota_subject", default=None
+)
+_last_status: ContextVar[Optional[QuotaStatus]] = ContextVar(
+    "llm_quota_status", default=None
+)
+_prepaid: ContextVar[bool] = ContextVar("llm_quota_prepaid", default=False)
+
+
+@contextmanager
+def quota_scope(
+    subject: QuotaSubject, prepaid: Optional[QuotaStatus] = None
+) -> Iterator[None]:
+    """Define o sujeito das cotas consumidas dentro do bloco.
+
+    Com `prepaid` (status de um consumo já feito, ex: um lote inteiro), as
+    chamadas dentro do bloco não consomem cota novamente.
+    """
+    subject_token = _current_subject.set(subject)
+    status_token = _last_status.set(prepaid)
+    prepaid_token = _prepaid.set(prepaid is not None)
+    try:
+        yield
+    finally:
+        _prepaid.reset(prepaid_token)
+        _last_status.reset(status_token)
+        _current_subject.reset(subject_token)
+
+
+def quota_prepaid() -> bool:
+    """True se a cota do contexto corrente já foi consumida antecipadamente."""
+    return _prepaid.get()
+
+
+def current_quota_subject() -> Optional[QuotaSubject]:
+    return _current_subject.get()
+
+
+def last_quota_status() -> Optional[QuotaStatus]:
+    """Resultado do último consumo de cota no contexto corrente."""
+    return _last_status.get()
+
+
+def record_quota_status(status: QuotaStatus) -> None:
+    _last_status.set(status)
+
+
+# Gerenciador global: compartilhado por todos os clientes LLM do processo
+_quota_manager: Optional[QuotaManager] = None
+
+
+def get_quota_manager() -> QuotaManager:
+    """Retorna o gerenciador de cotas do processo, criando-o na primeira chamada."""
+    global _quota_manager
+    if _quota_manager is None:
+        _quota_manager = QuotaManager.from_env()
+    return _quota_manager
+
+
+def set_quota_manager(manager: Optional[QuotaManager]) -> None:
+    """Define (ou remove) o gerenciador de cotas global."""
+    global _quota_manager
+    _quota_manager = manager
@@ -0,0 +1,141 @@
+"""
+Política de retry para chamadas aos provedores LLM.
+
+Implementa backoff exponencial com full jitter, suporte ao header
+Retry-After, classificação de erros por status HTTP e um orçamento de
+retries compartilhado pelo processo, que limita os retries a uma fração do
+tráfego real para não amplificar a carga durante throttling do provedor.
+"""
+import os
+import random
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import FrozenSet, Optional
+
+import httpx
+
+RETRYABLE_STATUS_CODES: FrozenSet[int] = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Converte o header Retry-After (segundos ou data HTTP) em segundos."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+@dataclass
+class RetryPolicy:
+    """Backoff exponencial com full jitter e classificação de erros."""
+
+    max_attempts: int = 3
+    base_delay: float = 0.2
+    max_delay: float = 10.0
+    multiplier: float = 2.0
+    retryable_status_codes: FrozenSet[int] = field(
+        default_factory=lambda: RETRYABLE_STATUS_CODES
+    )
+    respect_retry_after: bool = True
+    max_retry_after: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        """Carrega a política a partir das variáveis LLM_RETRY_*."""
+        return cls(
+            max_attempts=int(os.getenv("LLM_RETRY_MAX_ATTEMPTS", "3")),
+            base_delay=float(os.getenv("LLM_RETRY_BASE_DELAY", "0.2")),
+            max_delay=float(os.getenv("LLM_RETRY_MAX_DELAY", "10")),
+            max_retry_after=float(os.getenv("LLM_RETRY_MAX_RETRY_AFTER", "30")),
+        )
+
+    def is_retryable(self, exc: BaseException) -> bool:
+        """Indica se o erro justifica nova tentativa.
+
+        Erros HTTP são classificados pelo status (4xx falham rápido, exceto
+        408/429); erros de transporte e timeouts são sempre retentáveis.
+        Demais exceções (ex: resposta malformada) não são retentadas.
+        """
+        if isinstance(exc, httpx.HTTPStatusError):
+            return exc.response.status_code in self.retryable_status_codes
+        return isinstance(exc, httpx.TransportError)
+
+    def retry_after(self, exc: BaseException) -> Optional[float]:
+        """Extrai o Retry-After da resposta de erro, se houver."""
+        if not self.respect_retry_after or not isinstance(exc, httpx.HTTPStatusError):
+            return None
+        return parse_retry_after(exc.response.headers.get("Retry-After"))
+
+    def compute_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Calcula a espera antes da próxima tentativa.
+
+        Args:
+            attempt: Número da tentativa que acabou de falhar (1-based).
+            retry_after: Espera solicitada pelo provedor, em segundos.
+        """
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        ceiling = min(
+            self.max_delay, self.base_delay * self.multiplier ** (attempt - 1)
+        )
+        return random.uniform(0, ceiling)  # nosec B311 - jitter, não criptografia
+
+
+class RetryBudget:
+    """Orçamento de retries do processo (token bucket proporcional ao tráfego).
+
+    Cada requisição original deposita `ratio` tokens; cada retry consome um.
+    `min_tokens` é só o saldo inicial (e após `reset`): permite os primeiros
+    retries antes de haver tráfego, mas é consumido como os demais tokens.
+    Esgotado, um retry exige `1 / ratio` requisições novas, mesmo com tráfego
+    baixo. `max_tokens` limita o acúmulo.
+    """
+
+    def __init__(
+        self, ratio: float = 0.2, min_tokens: float = 10.0, max_tokens: float = 100.0
+    ) -> None:
+        self.ratio = ratio
+        self.min_tokens = min_tokens
+        self.max_tokens = max_tokens
+        self._tokens = min_tokens
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> float:
+        return self._tokens
+
+    def record_request(self) -> None:
+        """Registra uma requisição original (não-retry)."""
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_acquire_retry(self) -> bool:
+        """Consome um token de retry; False se o orçamento estiver esgotado."""
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+    def reset(self) -> None:
+        with self._lock:
+            self._tokens = self.min_tokens
+
+
+# Orçamento global compartilhado por todos os clientes LLM do processo
+default_retry_budget = RetryBudget(
+    ratio=float(os.getenv("LLM_RETRY_BUDGET_RATIO", "0.2")),
+    min_tokens=float(os.getenv("LLM_RETRY_BUDGET_MIN", "10")),
+)
@@ -0,0 +1,76 @@
+"""
+Coalescência de requisições idênticas concorrentes (single-flight).
+
+Chamadas simultâneas com a mesma impressão digital compartilham uma única
+execução em andamento: todas recebem o mesmo resultado ou a mesma exceção,
+e apenas uma requisição chega ao provedor upstream.
+"""
+import asyncio
+import functools
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict
+
+import structlog
+from prometheus_client import Counter
+
+logger = structlog.get_logger()
+
+single_flight_coalesced = Counter(
+    "llm_single_flight_coalesced_total",
+    "Chamadas upstream ao LLM evitadas por coalescência de requisições idênticas",
+)
+
+
+def request_fingerprint(url: str, payload: Dict[str, Any], api_key: str = "") -> str:
+    """Impressão digital de uma requisição (URL, payload e credencial)."""
+    raw = json.dumps(
+        {
+            "url": url,
+            "payload": payload,
+            "key": hashlib.sha256(api_key.encode("utf-8")).hexdigest(),
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """Grupo de execuções compartilhadas por chave."""
+
+    def __init__(self) -> None:
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Executa `fn` uma única vez por chave entre chamadas concorrentes.
+
+        A execução roda numa task própria, protegida com shield: o
+        cancelamento de um chamador não cancela a chamada compartilhada dos
+        demais.
+        """
+        task = self._inflight.get(key)
+        if task is not None and not task.done():
+            single_flight_coalesced.inc()
+            logger.debug("llm_single_flight_coalesced", key=key[:12])
+        else:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._forget, key))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Evita "exception was never retrieved" quando todos os chamadores
+        # foram cancelados antes do término
+        if not task.cancelled():
+            task.exception()
+
+
+# Grupo global: os clientes LLM são criados por requisição, a coalescência
+# precisa ser do processo
+default_single_flight = SingleFlight()
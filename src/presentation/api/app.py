@@ -1,9 +1,48 @@
 """Módulo de configuração da aplicação FastAPI."""
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
+from slowapi import _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
 
+from src.application.llm_response_cache import LLMResponseCache
+from src.infrastructure.http_client_pool import (
+    HTTPPoolConfig,
+    SharedHTTPClient,
+    set_shared_http_client,
+)
+
+from . import llm_codegen as llm_codegen_api
+from .llm_client_registry import LLMClientRegistry, set_llm_client_registry
 from .routers import auto_extension, health, llm_codegen
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Gerencia recursos de longa duração da aplicação.
+
+    Cria o pool HTTP compartilhado pelos clientes LLM e o registro que
+    reutiliza esses clientes entre requisições; no encerramento descarta os
+    clientes e fecha as conexões do pool.
+    """
+    shared_http = SharedHTTPClient(HTTPPoolConfig.from_env())
+    shared_http.start()
+    app.state.http_client = shared_http
+    set_shared_http_client(shared_http)
+    llm_clients = LLMClientRegistry(response_cache=LLMResponseCache.from_env())
+    app.state.llm_clients = llm_clients
+    set_llm_client_registry(llm_clients)
+    try:
+        yield
+    finally:
+        set_llm_client_registry(None)
+        llm_clients.clear()
+        set_shared_http_client(None)
+        await shared_http.aclose()
+
+
 def create_app(testing: bool = False) -> FastAPI:
     """Cria e configura a aplicação FastAPI.
 
@@ -19,12 +58,19 @@ def create_app(testing: bool = False) -> FastAPI:
         version="0.1.0",
         docs_url="/docs" if not testing else None,
         redoc_url="/redoc" if not testing else None,
+        lifespan=lifespan,
     )
 
     # Incluindo rotas
     app.include_router(health.router, tags=["health"])
     app.include_router(auto_extension.router)
     app.include_router(llm_codegen.router)
+    # Geração via LLM (/llm-codegen: generate, generate/stream, generate/batch)
+    app.state.limiter = llm_codegen_api.limiter
+    app.add_exception_handler(
+        RateLimitExceeded, _rate_limit_exceeded_handler  # type: ignore[arg-type]
+    )
+    app.include_router(llm_codegen_api.router)
 
     # TODO: Configurar observabilidade quando o middleware estiver pronto
     # Middleware de observabilidade será adicionado aqui
@@ -0,0 +1,300 @@
+"""
+Registro de clientes LLM com escopo de aplicação.
+
+Cada combinação (provider, base_url, model) tem um único cliente e um único
+orquestrador, criados na primeira requisição e reutilizados pelas
+seguintes — com o pool HTTP, o circuit breaker e as métricas do cliente.
+As variáveis de ambiente são lidas uma vez por provider; `reload()` as relê
+e os clientes cuja configuração mudou são recriados no próximo acesso.
+"""
+import asyncio
+import json
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+import structlog
+from prometheus_client import Counter, Gauge
+
+from src.application.llm_code_orchestrator import LLMCodeOrchestrator
+from src.application.llm_response_cache import LLMResponseCache
+from src.infrastructure.circuit_breaker import get_circuit_breaker
+from src.infrastructure.http_client_pool import get_shared_http_client
+from src.infrastructure.llm_backend_pool import BackendPoolConfig, LLMBackendPool
+from src.infrastructure.llm_client import LLMClient
+from src.infrastructure.llm_client_myai import MyAILLMClient
+from src.infrastructure.llm_hedging import HedgePolicy
+from src.infrastructure.llm_quota import get_quota_manager
+from src.infrastructure.llm_retry import RetryPolicy
+
+logger = structlog.get_logger()
+
+llm_client_builds = Counter(
+    "llm_client_registry_builds_total",
+    "Clientes LLM construídos pelo registro (primeira vez ou reconfiguração)",
+    ["provider", "reason"],
+)
+llm_client_registry_size = Gauge(
+    "llm_client_registry_clients",
+    "Clientes LLM ativos no registro",
+)
+
+# Valores padrão por provider: (base_url, model)
+_PROVIDER_DEFAULTS = {
+    "myai": ("http://localhost:4242/api/v0/chat/completions", "o4-mini"),
+    "openai": ("https://api.openai.com", "gpt-4"),
+}
+_DEFAULT_API_KEY = "42m4n)0-2063210-824n)40-6u1m42435jun102"
+
+
+def _default_provider() -> str:
+    """Provider padrão: LLM_PROVIDER, ou o pool se LLM_BACKENDS existir."""
+    provider = os.getenv("LLM_PROVIDER") or (
+        "pool" if os.getenv("LLM_BACKENDS") else "openai"
+    )
+    return provider.lower()
+
+
+@dataclass(frozen=True)
+class LLMClientSettings:
+    """Configuração de um cliente LLM, lida do ambiente."""
+
+    provider: str
+    base_url: str
+    api_key: str
+    family: str
+    model: str
+    # Endpoints equivalentes ao base_url, usados para hedging
+    extra_endpoints: Tuple[str, ...] = ()
+    # Provider "pool": backends balanceados por latência
+    backends: Tuple["LLMClientSettings", ...] = ()
+
+    @classmethod
+    def from_env(cls, provider: str) -> "LLMClientSettings":
+        """Carrega as variáveis LLM_* para o provider informado."""
+        if provider == "pool":
+            return cls.pool_from_env()
+        base_url, model = _PROVIDER_DEFAULTS.get(provider, _PROVIDER_DEFAULTS["openai"])
+        return cls(
+            provider=provider,
+            base_url=os.getenv("LLM_API_URL", base_url),
+            api_key=os.getenv("LLM_API_KEY", _DEFAULT_API_KEY),
+            family=os.getenv("LLM_FAMILY", "openai"),
+            model=os.getenv("LLM_MODEL", model),
+            extra_endpoints=tuple(
+                url.strip()
+                for url in os.getenv("LLM_API_EXTRA_URLS", "").split(",")
+                if url.strip()
+            ),
+        )
+
+    @classmethod
+    def pool_from_env(cls) -> "LLMClientSettings":
+        """Carrega os backends do pool da variável LLM_BACKENDS (lista JSON).
+
+        Cada item aceita provider, base_url, model, api_key, family e
+        extra_urls; campos ausentes usam os padrões do provider.
+        """
+        backends = []
+        for item in json.loads(os.getenv("LLM_BACKENDS", "[]")):
+            backend_provider = item.get("provider", "openai").lower()
+            base_url, model = _PROVIDER_DEFAULTS.get(
+                backend_provider, _PROVIDER_DEFAULTS["openai"]
+            )
+            backends.append(
+                cls(
+                    provider=backend_provider,
+                    base_url=item.get("base_url", base_url),
+                    api_key=item.get(
+                        "api_key", os.getenv("LLM_API_KEY", _DEFAULT_API_KEY)
+                    ),
+                    family=item.get("family", os.getenv("LLM_FAMILY", "openai")),
+                    model=item.get("model", model),
+                    extra_endpoints=tuple(item.get("extra_urls", ())),
+                )
+            )
+        return cls(
+            provider="pool",
+            base_url="",
+            api_key="",
+            family="",
+            model="pool",
+            backends=tuple(backends),
+        )
+
+    @property
+    def key(self) -> Tuple[str, str, str]:
+        return (self.provider, self.base_url.rstrip("/"), self.model)
+
+
+@dataclass
+class LLMClientEntry:
+    """Cliente, orquestrador e a configuração com que foram criados."""
+
+    settings: LLMClientSettings
+    client: Any
+    orchestrator: LLMCodeOrchestrator
+    http_client: Optional[httpx.AsyncClient]
+
+
+class LLMClientRegistry:
+    """Cache de clientes LLM por (provider, base_url, model)."""
+
+    def __init__(
+        self,
+        response_cache: Any = None,
+        settings_loader: Callable[
+            [str], LLMClientSettings
+        ] = LLMClientSettings.from_env,
+    ) -> None:
+        self.response_cache = response_cache
+        self._settings_loader = settings_loader
+        self._default_provider = _default_provider()
+        self._settings: Dict[str, LLMClientSettings] = {}
+        self._entries: Dict[Tuple[str, str, str], LLMClientEntry] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: Optional[str] = None) -> LLMClientEntry:
+        """Retorna o cliente do provider, criando-o ou recriando-o se preciso.
+
+        O provider vem do payload da requisição: nomes desconhecidos usam o
+        provider padrão, para que não criem entradas (e pools de conexão)
+        novas no registro.
+        """
+        provider = self._resolve_provider(provider)
+        settings = self._settings.get(provider)
+        if settings is None:
+            settings = self._settings.setdefault(
+                provider, self._settings_loader(provider)
+            )
+        http_client = self._current_http_client()
+        entry = self._entries.get(settings.key)
+        if (
+            entry is not None
+            and entry.settings == settings
+            and entry.http_client is http_client
+        ):
+            return entry
+        with self._lock:
+            entry = self._entries.get(settings.key)
+            if entry is None:
+                reason = "new"
+            elif entry.settings != settings:
+                reason = "config_changed"
+            elif entry.http_client is not http_client:
+                reason = "http_client_changed"
+            else:
+                return entry
+            if entry is not None:
+                self._dispose(entry)
+            entry = self._build(settings, http_client)
+            self._entries[settings.key] = entry
+            llm_client_builds.labels(provider=provider, reason=reason).inc()
+            llm_client_registry_size.set(len(self._entries))
+            logger.info(
+                "llm_client_criado",
+                provider=provider,
+                base_url=settings.base_url,
+                model=settings.model,
+                reason=reason,
+            )
+            return entry
+
+    def _resolve_provider(self, provider: Optional[str]) -> str:
+        name = (provider or self._default_provider).lower()
+        if name in _PROVIDER_DEFAULTS or name == self._default_provider:
+            return name
+        logger.debug("llm_provider_desconhecido", provider=name[:32])
+        return self._default_provider
+
+    def reload(self) -> None:
+        """Relê o ambiente; clientes com configuração alterada são recriados."""
+        with self._lock:
+            self._default_provider = _default_provider()
+            self._settings.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry in self._entries.values():
+                self._dispose(entry)
+            self._settings.clear()
+            self._entries.clear()
+            llm_client_registry_size.set(0)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _build(
+        self, settings: LLMClientSettings, http_client: Optional[httpx.AsyncClient]
+    ) -> LLMClientEntry:
+        if settings.provider == "pool":
+            client: Any = self._build_pool(settings, http_client)
+        else:
+            client = self._build_client(settings, http_client)
+        orchestrator = LLMCodeOrchestrator(client, cache=self.response_cache)
+        return LLMClientEntry(settings, client, orchestrator, http_client)
+
+    def _build_pool(
+        self, settings: LLMClientSettings, http_client: Optional[httpx.AsyncClient]
+    ) -> LLMBackendPool:
+        pool = LLMBackendPool(
+            [self._build_client(b, http_client) for b in settings.backends],
+            BackendPoolConfig.from_env(),
+        )
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Sem event loop (ex: construção síncrona): probes ficam parados
+            return pool
+        pool.start()
+        return pool
+
+    def _build_client(
+        self, settings: LLMClientSettings, http_client: Optional[httpx.AsyncClient]
+    ) -> LLMClient:
+        client_cls = MyAILLMClient if settings.provider == "myai" else LLMClient
+        client = client_cls(
+            base_url=settings.base_url,
+            api_key=settings.api_key,
+            family=settings.family,
+            model=settings.model,
+            http_client=http_client,
+            retry_policy=RetryPolicy.from_env(),
+            circuit_breaker=get_circuit_breaker(settings.base_url, settings.model),
+            quota_manager=get_quota_manager(),
+            endpoints=settings.extra_endpoints,
+            hedge_policy=HedgePolicy.from_env(),
+        )
+        return client
+
+    @staticmethod
+    def _dispose(entry: LLMClientEntry) -> None:
+        """Para os probes de um pool substituído ou removido."""
+        if isinstance(entry.client, LLMBackendPool):
+            entry.client.stop()
+
+    @staticmethod
+    def _current_http_client() -> Optional[httpx.AsyncClient]:
+        # Pool HTTP compartilhado criado pelo lifespan (None fora da aplicação)
+        shared_http = get_shared_http_client()
+        return shared_http.client if shared_http is not None else None
+
+
+# Registro da aplicação: criado pelo lifespan, ou sob demanda fora dele
+_registry: Optional[LLMClientRegistry] = None
+
+
+def get_llm_client_registry() -> LLMClientRegistry:
+    """Retorna o registro de clientes LLM, criando-o na primeira chamada."""
+    global _registry
+    if _registry is None:
+        _registry = LLMClientRegistry(response_cache=LLMResponseCache.from_env())
+    return _registry
+
+
+def set_llm_client_registry(registry: Optional[LLMClientRegistry]) -> None:
+    """Define (ou remove) o registro de clientes LLM da aplicação."""
+    global _registry
+    _registry = registry
@@ -2,11 +2,17 @@
 API REST para geração de código via LLM.
 Inclui autenticação, autorização e rate limiting.
 """
+
+import hashlib
+import json
 import os
-from typing import Optional
+from contextlib import aclosing
+from dataclasses import replace
+from typing import Any, AsyncIterator, Dict, Optional
 
 import structlog
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from opentelemetry import trace
 from opentelemetry.trace import Status, StatusCode
@@ -14,9 +20,20 @@ from prometheus_client import Counter, Histogram
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-from src.application.llm_code_orchestrator import CodeGenRequest, LLMCodeOrchestrator
+from src.application.llm_code_orchestrator import (
+    BatchCodeGenRequest,
+    CodeGenRequest,
+    LLMCodeOrchestrator,
+)
 from src.infrastructure.llm_client import LLMClient
-from src.infrastructure.llm_client_myai import MyAILLMClient
+from src.infrastructure.llm_quota import (
+    QuotaExceededError,
+    QuotaSubject,
+    estimate_tokens,
+    last_quota_status,
+    quota_scope,
+)
+from src.presentation.api.llm_client_registry import get_llm_client_registry
 
 router = APIRouter(prefix="/llm-codegen", tags=["llm-codegen"])
 logger = structlog.get_logger()
@@ -25,31 +42,24 @@ logger = structlog.get_logger()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 limiter = Limiter(key_func=get_remote_address)
 
+# Itens de um lote gerados em paralelo (o pedido pode reduzir, até 16)
+BATCH_CONCURRENCY = int(os.getenv("LLM_BATCH_CONCURRENCY", "4"))
+
+
+def get_orchestrator(llm_config: Optional[dict] = None) -> LLMCodeOrchestrator:
+    """Orquestrador do client LLM do provider informado no payload/config.
+
+    Client e orquestrador vêm do registro da aplicação e são reutilizados
+    entre requisições.
+    """
+    provider = (llm_config or {}).get("provider")
+    return get_llm_client_registry().get(provider).orchestrator
+
 
 def get_llm_client(llm_config: Optional[dict] = None) -> LLMClient:
     """Seleciona o client LLM conforme provider informado no payload/config."""
-    provider = (
-        (llm_config or {}).get("provider", os.getenv("LLM_PROVIDER", "openai")).lower()
-    )
-    if provider == "myai":
-        # MyAILLMClient deve herdar de LLMClient
-        client = MyAILLMClient(
-            base_url=os.getenv(
-                "LLM_API_URL", "http://localhost:4242/api/v0/chat/completions"
-            ),
-            api_key=os.getenv("LLM_API_KEY", "42m4n)0-2063210-824n)40-6u1m42435jun102"),
-            family=os.getenv("LLM_FAMILY", "openai"),
-            model=os.getenv("LLM_MODEL", "o4-mini"),
-        )
-        # Garantir que o tipo é compatível
-        return client
-    # Default: OpenAI
-    return LLMClient(
-        base_url=os.getenv("LLM_API_URL", "https://api.openai.com"),
-        api_key=os.getenv("LLM_API_KEY", "42m4n)0-2063210-824n)40-6u1m42435jun102"),
-        family=os.getenv("LLM_FAMILY", "openai"),
-        model=os.getenv("LLM_MODEL", "gpt-4"),
-    )
+    client: LLMClient = get_orchestrator(llm_config).llm_client
+    return client
 
 
 llm_codegen_requests = Counter(
@@ -85,9 +95,37 @@ def get_client_ip(request: Request) -> str:
     return "unknown"
 
 
-@router.post("/generate", dependencies=[Depends(oauth2_scheme)])
+def get_quota_subject(request: Request, token: str) -> QuotaSubject:
+    """Identifica usuário (hash do token) e tenant (header X-Tenant-ID)."""
+    user = hashlib.sha256(token.encode("utf-8")).hexdigest()[:16]
+    tenant = request.headers.get("X-Tenant-ID", "default")
+    return QuotaSubject(user=user, tenant=tenant)
+
+
+async def _quota_headers(client: Any) -> Dict[str, str]:
+    """Headers com o saldo de cota após a chamada (ou consulta, se não houve)."""
+    status = last_quota_status()
+    if status is None:
+        quota_manager = getattr(client, "quota_manager", None)
+        if quota_manager is None:
+            return {}
+        status = await quota_manager.peek(client.current_quota_subject())
+    return status.headers()
+
+
+def _quota_exceeded(e: QuotaExceededError) -> HTTPException:
+    llm_codegen_requests.labels(status="quota_exceeded").inc()
+    return HTTPException(status_code=429, detail=str(e), headers=e.status.headers())
+
+
+@router.post("/generate")
 @limiter.limit("3/minute")
-async def generate_code(request: Request, req: CodeGenRequest) -> dict:
+async def generate_code(
+    request: Request,
+    req: CodeGenRequest,
+    response: Response,
+    token: str = Depends(oauth2_scheme),
+) -> dict:
     """Gera código a partir de um prompt usando LLM."""
     client_ip = get_client_ip(request)
     with llm_codegen_latency.time():
@@ -97,13 +135,19 @@ async def generate_code(request: Request, req: CodeGenRequest) -> dict:
             try:
                 # Seleção dinâmica do client conforme provider no payload
                 llm_config = getattr(req, "extra_params", None) or {}
-                client = get_llm_client(llm_config=llm_config.get("llm_config", {}))
-                orchestrator = LLMCodeOrchestrator(client)
-                code = await orchestrator.generate_code(req)
+                orchestrator = get_orchestrator(llm_config.get("llm_config", {}))
+                with quota_scope(get_quota_subject(request, token)):
+                    code = await orchestrator.generate_code(req)
+                    response.headers.update(
+                        await _quota_headers(orchestrator.llm_client)
+                    )
                 logger.info("llm_codegen_success", user=client_ip, prompt=req.prompt)
                 llm_codegen_requests.labels(status="success").inc()
                 span.set_status(Status(StatusCode.OK))
                 return {"code": code}
+            except QuotaExceededError as e:
+                span.set_status(Status(StatusCode.ERROR))
+                raise _quota_exceeded(e) from e
             except Exception as e:
                 logger.error("llm_codegen_error", error=str(e), user=client_ip)
                 llm_codegen_requests.labels(status="error").inc()
@@ -112,3 +156,120 @@ async def generate_code(request: Request, req: CodeGenRequest) -> dict:
                 raise HTTPException(
                     status_code=400, detail="Erro ao gerar código: " + str(e)
                 ) from e
+
+
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    """Formata um evento Server-Sent Events."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/generate/stream")
+@limiter.limit("3/minute")
+async def generate_code_stream(
+    request: Request, req: CodeGenRequest, token: str = Depends(oauth2_scheme)
+) -> StreamingResponse:
+    """Gera código em streaming (SSE).
+
+    Cada trecho recebido do provedor é repassado como `data: {"token": ...}`.
+    O stream termina com `event: done` (código completo validado) ou
+    `event: error`, caso o código seja rejeitado no meio da geração — nesse
+    caso os trechos já recebidos devem ser descartados pelo cliente.
+    """
+    client_ip = get_client_ip(request)
+    llm_config = getattr(req, "extra_params", None) or {}
+    orchestrator = get_orchestrator(llm_config.get("llm_config", {}))
+    stream = orchestrator.stream_code(req)
+    with quota_scope(get_quota_subject(request, token)):
+        try:
+            # Erros anteriores ao primeiro trecho (prompt inválido, cota,
+            # circuito aberto, erro HTTP) ainda podem ser respondidos com 400
+            first = await anext(stream)
+        except StopAsyncIteration:
+            first = ""
+        except QuotaExceededError as e:
+            raise _quota_exceeded(e) from e
+        except Exception as e:
+            logger.error("llm_codegen_error", error=str(e), user=client_ip)
+            llm_codegen_requests.labels(status="error").inc()
+            raise HTTPException(
+                status_code=400, detail="Erro ao gerar código: " + str(e)
+            ) from e
+        quota_headers = await _quota_headers(orchestrator.llm_client)
+
+    async def events() -> AsyncIterator[str]:
+        parts = [first]
+        async with aclosing(stream):
+            try:
+                if first:
+                    yield _sse({"token": first})
+                async for chunk in stream:
+                    parts.append(chunk)
+                    yield _sse({"token": chunk})
+            except Exception as e:
+                logger.error("llm_codegen_stream_error", error=str(e), user=client_ip)
+                llm_codegen_requests.labels(status="error").inc()
+                yield _sse({"detail": "Erro ao gerar código: " + str(e)}, "error")
+                return
+        logger.info("llm_codegen_success", user=client_ip, prompt=req.prompt)
+        llm_codegen_requests.labels(status="success").inc()
+        yield _sse({"code": "".join(parts)}, "done")
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            **quota_headers,
+        },
+    )
+
+
+@router.post("/generate/batch")
+@limiter.limit("3/minute")
+async def generate_code_batch(
+    request: Request, batch: BatchCodeGenRequest, token: str = Depends(oauth2_scheme)
+) -> StreamingResponse:
+    """Gera código para vários pedidos num único lote (NDJSON).
+
+    O lote conta como uma unidade do rate limit e uma requisição de cota,
+    com os tokens estimados de todos os itens debitados de uma vez, antes
+    de qualquer chamada ao provedor. Cada linha da resposta é o resultado
+    de um item (`index` e `code` ou `error`), na ordem em que terminam.
+    """
+    client_ip = get_client_ip(request)
+    orchestrator = get_orchestrator(batch.llm_config)
+    client = orchestrator.llm_client
+    subject = replace(get_quota_subject(request, token), model=client.model)
+    tokens = sum(estimate_tokens(item.prompt, item.max_tokens) for item in batch.items)
+    status = await client.quota_manager.consume(subject, tokens)
+    if not status.allowed:
+        llm_codegen_requests.labels(status="quota_exceeded").inc()
+        raise HTTPException(
+            status_code=429,
+            detail="Limite de uso do LLM atingido",
+            headers=status.headers(),
+        )
+    concurrency = min(batch.concurrency or BATCH_CONCURRENCY, 16)
+    logger.info(
+        "llm_codegen_batch",
+        user=client_ip,
+        items=len(batch.items),
+        concurrency=concurrency,
+        tokens=tokens,
+    )
+
+    async def lines() -> AsyncIterator[str]:
+        with quota_scope(subject, prepaid=status):
+            results = orchestrator.generate_many(batch.items, concurrency)
+            async with aclosing(results):
+                async for result in results:
+                    llm_codegen_requests.labels(
+                        status="error" if result.error else "success"
+                    ).inc()
+                    yield result.model_dump_json(exclude_none=True) + "\n"
+
+    return StreamingResponse(
+        lines(), media_type="application/x-ndjson", headers=status.headers()
+    )
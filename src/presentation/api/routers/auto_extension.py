@@ -5,9 +5,12 @@ de autoextensão do sistema.
 """
 
 
+import dataclasses
+import json
 import uuid
-from datetime import datetime
-from typing import Annotated, Any, Dict, List, Optional
+from contextlib import aclosing
+from datetime import datetime, timezone
+from typing import Annotated, Any, AsyncIterator, Dict, List, Optional
 
 import structlog
 from fastapi import (
@@ -20,6 +23,7 @@ from fastapi import (
     Security,
     status,
 )
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from opentelemetry import trace
@@ -32,6 +36,7 @@ from src.domain.auto_extension.capability_analyzer import (
     FeedbackProvider,
     MetricsProvider,
 )
+from src.domain.auto_extension.code_analyzer import get_code_analyzer
 from src.domain.auto_extension.entities import ToolSpec
 from src.domain.auto_extension.prompt_template_manager import PromptTemplateManager
 from src.domain.auto_extension.providers import (
@@ -43,12 +48,15 @@ from src.domain.auto_extension.providers import (
 )
 from src.domain.auto_extension.self_learning import SelfLearningSystem
 from src.domain.auto_extension.tool_generator import (
+    GeneratedTool,
     ToolGenerator,
 )
 from src.domain.auto_extension.tool_generator import (
     ToolSpec as ToolGenSpec,
 )
-from src.domain.auto_extension.tool_validator import ToolValidator
+from src.domain.auto_extension.tool_validator import ToolValidator, ValidationReport
+from src.domain.auto_extension.validation_cache import get_validation_cache
+from src.infrastructure.circuit_breaker import CircuitBreaker, get_circuit_breaker
 
 router = APIRouter(
     prefix="/auto-extension",
@@ -149,6 +157,35 @@ class ToolResponse(BaseModel):
     )
 
 
+class ToolValidationItem(BaseModel):
+    """Tool já gerada a ser validada em lote."""
+
+    name: str = Field(..., description="Nome da ferramenta")
+    code: str = Field(..., max_length=10000, description="Código fonte da ferramenta")
+    tool_id: Optional[str] = Field(
+        default=None, description="ID da ferramenta (gerado se omitido)"
+    )
+    description: str = Field(default="", description="Descrição da funcionalidade")
+    parameters: Dict[str, Any] = Field(
+        default={}, description="Parâmetros da ferramenta"
+    )
+    return_type: str = Field(
+        default="object", description="Tipo de retorno da ferramenta"
+    )
+    security_level: str = Field(
+        default="standard", description="Nível de segurança da ferramenta"
+    )
+
+
+class ToolValidationBatchRequest(BaseModel):
+    """Lote de tools para validação com relatórios em NDJSON."""
+
+    tools: List[ToolValidationItem] = Field(..., min_length=1, max_length=100)
+    concurrency: int = Field(
+        default=4, ge=1, le=16, description="Validações simultâneas"
+    )
+
+
 # Dependências para injeção
 async def get_capability_analyzer() -> CapabilityAnalyzer:
     """Fornece instância do analisador de capacidades."""
@@ -206,12 +243,8 @@ async def get_tool_generator():
                 f"    return {{'result': 'success', 'action': 'mock'}}\n"
             )
 
-    class MockSecurityValidator:
-        async def validate(self, code, spec):
-            return {"passed": True, "score": 0.95, "issues": []}
-
     return ToolGenerator(
-        MockTemplateProvider(), MockCodeGenerator(), MockSecurityValidator()
+        MockTemplateProvider(), MockCodeGenerator(), get_code_analyzer()
     )
 
 
@@ -224,16 +257,18 @@ async def get_tool_validator():
         async def create_sandbox(self):
             return {"id": "sandbox-123", "status": "ready"}
 
-    class MockSecurityAnalyzer:
-        async def analyze(self, code):
-            return {"score": 0.95, "issues": [], "passed": True}
+        async def destroy_sandbox(self, sandbox):
+            return None
 
     class MockTestRunner:
         async def run_tests(self, code, test_cases):
             return {"passed": True, "results": {"total": 3, "passed": 3, "failed": 0}}
 
     return ToolValidator(
-        MockSandboxProvider(), MockSecurityAnalyzer(), MockTestRunner()
+        MockSandboxProvider(),
+        get_code_analyzer(),
+        MockTestRunner(),
+        validation_cache=get_validation_cache(),
     )
 
 
@@ -273,6 +308,13 @@ async def get_self_learning_system():
     return await get_learning_system()
 
 
+def _llm_circuit_breaker(llm_config: Dict[str, Any]) -> CircuitBreaker:
+    """Circuit breaker compartilhado do endpoint LLM configurado."""
+    return get_circuit_breaker(
+        str(llm_config.get("url", "")), str(llm_config.get("model", ""))
+    )
+
+
 # Rotas da API
 @router.get(
     "/health",
@@ -396,14 +438,18 @@ async def create_tool(
                     "url": "https://api.openai.com/v1/chat/completions",
                     "model": "gpt-4o",
                 }
-                code_provider = LLMCodeProvider(llm_config)
+                code_provider = LLMCodeProvider(
+                    llm_config, circuit_breaker=_llm_circuit_breaker(llm_config)
+                )
             elif provider_type == "hybrid":
                 llm_config = tool_request.llm_config or {
                     "url": "https://api.openai.com/v1/chat/completions",
                     "model": "gpt-4o",
                 }
                 code_provider = HybridCodeProvider(
-                    LLMCodeProvider(llm_config),
+                    LLMCodeProvider(
+                        llm_config, circuit_breaker=_llm_circuit_breaker(llm_config)
+                    ),
                     TemplateCodeProvider(prompt_manager),
                     mode="hybrid",
                 )
@@ -427,7 +473,7 @@ async def create_tool(
                 if (
                     not isinstance(code, str)
                     or len(code) > 10000
-                    or "import os" in code.lower()
+                    or not get_code_analyzer().evaluate(code).is_safe
                 ):
                     logger.error(
                         "codigo_llm_inseguro", user_id=user_id, provider=provider_type
@@ -437,8 +483,6 @@ async def create_tool(
                         detail="Código gerado pelo LLM não passou na validação de segurança.",
                     )
 
-            from src.domain.auto_extension.tool_generator import GeneratedTool
-
             if isinstance(spec.parameters, list):
                 if len(spec.parameters) > 0 and isinstance(spec.parameters[0], dict):
                     parameters = spec.parameters[0]
@@ -522,6 +566,82 @@ async def create_tool(
             ) from e
 
 
+def _validation_line(report: ValidationReport) -> str:
+    """Serializa um relatório de validação como uma linha NDJSON."""
+    data = dataclasses.asdict(report)
+    data["result"] = report.result.value
+    return json.dumps(data, default=str, ensure_ascii=False) + "\n"
+
+
+@router.post(
+    "/tools/validate",
+    summary="Validar ferramentas em lote",
+    response_class=StreamingResponse,
+)
+@limiter.limit("5/minute")
+async def validate_tools(
+    batch: ToolValidationBatchRequest,
+    request: Request,
+    validator: Annotated[ToolValidator, Depends(get_tool_validator)],
+    token: str = Security(oauth2_scheme),
+) -> StreamingResponse:
+    """Valida várias ferramentas e transmite os relatórios em NDJSON.
+
+    Cada linha é um relatório de validação, na ordem em que terminam, para
+    que lotes grandes não fiquem acumulados em memória. Código idêntico é
+    validado uma única vez e os sandboxes são compartilhados pelo lote.
+    """
+    try:
+        payload = jwt.decode(token, "SECRET", algorithms=["HS256"])
+        user_id = payload.get("sub")
+    except JWTError:
+        logger.warning(
+            "jwt_invalido", user_token=token[:8] + "...", action="validate_tools"
+        )
+        raise HTTPException(
+            status_code=401, detail="Token inválido ou expirado"
+        ) from None
+
+    created_at = datetime.now(timezone.utc).isoformat()
+    tools = []
+    for item in batch.tools:
+        spec = ToolGenSpec(
+            name=item.name,
+            description=item.description,
+            parameters=item.parameters,
+            return_type=item.return_type,
+            template_id="default",
+            security_level=item.security_level,
+            resource_requirements={},
+        )
+        tools.append(
+            GeneratedTool(
+                tool_id=item.tool_id or str(uuid.uuid4()),
+                name=item.name,
+                code=item.code,
+                spec=spec,
+                validation_results={},
+                version="1.0.0",
+                created_at=created_at,
+            )
+        )
+    logger.info(
+        "validacao_em_lote_solicitada",
+        user_id=user_id,
+        tools=len(tools),
+        concurrency=batch.concurrency,
+    )
+
+    async def lines() -> AsyncIterator[str]:
+        with tracer.start_as_current_span("validate_tools"):
+            reports = validator.validate_many(tools, batch.concurrency)
+            async with aclosing(reports):
+                async for report in reports:
+                    yield _validation_line(report)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.get(
     "/tools/{tool_id}",
     summary="Obter detalhes de uma ferramenta",
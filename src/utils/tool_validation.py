@@ -4,7 +4,10 @@ Extraído de ToolValidator para centralização e reuso.
 """
 from typing import Any, Dict, List, Tuple
 
-from src.domain.auto_extension.tool_validator import ValidationResult
+from src.domain.auto_extension.tool_validator import (
+    SECURITY_FAILURE_THRESHOLD,
+    ValidationResult,
+)
 
 
 def analyze_tool_results(
@@ -30,7 +33,7 @@ def analyze_tool_results(
     has_performance_fail = test_results.get("performance_score", 1.0) < 0.5
     has_compat_fail = not test_results.get("compatibility_passed", True)
 
-    if security_score < 0.7:
+    if security_score < SECURITY_FAILURE_THRESHOLD:
         result = ValidationResult.FAILED_SECURITY
         issues.extend(security_issues)
         # Acumula issues de performance se também houver falha de performance
@@ -4,6 +4,7 @@ Este módulo contém testes de integração para verificar o funcionamento
 conjunto dos componentes do sistema de auto-extensão.
 """
 
+import json
 from unittest.mock import AsyncMock, patch
 
 import pytest
@@ -185,3 +186,29 @@ class TestAutoExtensionAPI:
         data = response.json()
         assert "feedback_id" in data
         assert data["status"] == "processed"
+
+    def test_validate_tools_streams_ndjson_reports(self, client: TestClient) -> None:
+        """Testa a validação em lote com relatórios em NDJSON."""
+        from tests.integration.jwt_test_utils import generate_test_jwt
+
+        safe = "def soma(a, b):\n    return a + b\n"
+        batch = {
+            "tools": [
+                {"name": "soma", "code": safe, "tool_id": "t1"},
+                {"name": "soma_copia", "code": safe, "tool_id": "t2"},
+                {"name": "perigosa", "code": "import os\n", "tool_id": "t3"},
+            ],
+            "concurrency": 2,
+        }
+        response = client.post(
+            "/auto-extension/tools/validate",
+            json=batch,
+            headers={"Authorization": f"Bearer {generate_test_jwt()}"},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        reports = {r["tool_id"]: r for r in map(json.loads, response.text.splitlines())}
+        assert set(reports) == {"t1", "t2", "t3"}
+        assert reports["t1"]["result"] == reports["t2"]["result"] == "passed"
+        assert reports["t3"]["result"] == "failed_security"
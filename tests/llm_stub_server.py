@@ -0,0 +1,242 @@
+"""
+Servidor LLM local e determinístico para testes de carga e benchmarks.
+
+Responde nos dois formatos usados pelos clientes do projeto:
+
+- OpenAI `POST /v1/completions` (LLMClient), com `choices[0].text`;
+- MyAI `POST /api/v0/chat/completions` (MyAILLMClient), com `messages` na
+  entrada e `message.content` na saída.
+
+Os dois aceitam `"stream": true` (Server-Sent Events). Latência (fixa,
+uniforme, normal ou lognormal), erros 500, throttling 429 com Retry-After e
+timeouts são injetados conforme `StubConfig`, com sorteios reproduzíveis a
+partir de `seed`. O código devolvido depende só do prompt.
+
+Uso:
+    python -m tests.llm_stub_server --port 4242 --latency-mean 0.8
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import time
+from dataclasses import dataclass, fields
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal")
+
+
+@dataclass
+class StubConfig:
+    """Comportamento do servidor stub (latência, erros e streaming)."""
+
+    latency_distribution: str = "lognormal"
+    latency_mean: float = 0.5
+    latency_stddev: float = 0.2
+    latency_min: float = 0.0
+    latency_max: float = 30.0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+    timeout_rate: float = 0.0
+    timeout_seconds: float = 120.0
+    stream_chunk_chars: int = 16
+    seed: int = 42
+
+    @classmethod
+    def from_env(cls) -> "StubConfig":
+        """Carrega a configuração das variáveis LLM_STUB_<CAMPO>."""
+        values: Dict[str, Any] = {}
+        for f in fields(cls):
+            raw = os.getenv(f"LLM_STUB_{f.name.upper()}")
+            if raw is not None:
+                values[f.name] = type(f.default)(raw)
+        return cls(**values)
+
+    def __post_init__(self) -> None:
+        if self.latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Distribuição de latência inválida: {self.latency_distribution}"
+            )
+
+
+class StubBehavior:
+    """Sorteios reproduzíveis de latência e falhas por requisição."""
+
+    def __init__(self, config: StubConfig) -> None:
+        self.config = config
+        self._rng = random.Random(config.seed)  # nosec B311 - simulação
+        self.stats: Dict[str, int] = {
+            "requests": 0,
+            "errors": 0,
+            "rate_limited": 0,
+            "timeouts": 0,
+            "streams": 0,
+        }
+
+    def latency(self) -> float:
+        c = self.config
+        if c.latency_distribution == "fixed":
+            value = c.latency_mean
+        elif c.latency_distribution == "uniform":
+            value = self._rng.uniform(
+                c.latency_mean - c.latency_stddev, c.latency_mean + c.latency_stddev
+            )
+        elif c.latency_distribution == "normal":
+            value = self._rng.gauss(c.latency_mean, c.latency_stddev)
+        else:
+            # Parâmetros da normal subjacente para a média/desvio pedidos
+            mean = max(c.latency_mean, 1e-6)
+            sigma2 = math.log1p((c.latency_stddev / mean) ** 2)
+            value = self._rng.lognormvariate(math.log(mean) - sigma2 / 2, sigma2**0.5)
+        return min(c.latency_max, max(c.latency_min, value))
+
+    def fault(self) -> Optional[str]:
+        """Falha injetada nesta requisição: error, rate_limit, timeout ou None."""
+        roll = self._rng.random()
+        c = self.config
+        for name, rate in (
+            ("error", c.error_rate),
+            ("rate_limit", c.rate_limit_rate),
+            ("timeout", c.timeout_rate),
+        ):
+            if roll < rate:
+                return name
+            roll -= rate
+        return None
+
+
+def generate_stub_code(prompt: str) -> str:
+    """Código Python válido e determinístico derivado do prompt."""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    words = re.findall(r"[a-z]+", prompt.lower())[:3]
+    name = "_".join(words + [digest]) or f"tool_{digest}"
+    return (
+        f"def {name}(value):\n"
+        f'    """Ferramenta gerada pelo stub LLM ({digest})."""\n'
+        "    result = {'input': value, 'length': len(str(value))}\n"
+        "    return result\n"
+    )
+
+
+def _chunks(text: str, size: int) -> List[str]:
+    size = max(1, size)
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def create_stub_app(config: Optional[StubConfig] = None) -> FastAPI:
+    """Cria a aplicação FastAPI do stub."""
+    config = config or StubConfig()
+    behavior = StubBehavior(config)
+    app = FastAPI(title="SkyHAL LLM stub", docs_url=None, redoc_url=None)
+    app.state.stub = behavior
+
+    async def respond(
+        prompt: str,
+        stream: bool,
+        render_full: Callable[[str], Dict[str, Any]],
+        render_chunk: Callable[[str], Dict[str, Any]],
+    ) -> Any:
+        behavior.stats["requests"] += 1
+        fault = behavior.fault()
+        if fault == "timeout":
+            behavior.stats["timeouts"] += 1
+            await asyncio.sleep(config.timeout_seconds)
+        await asyncio.sleep(behavior.latency())
+        if fault == "error":
+            behavior.stats["errors"] += 1
+            return JSONResponse({"error": "falha injetada"}, status_code=500)
+        if fault == "rate_limit":
+            behavior.stats["rate_limited"] += 1
+            return JSONResponse(
+                {"error": "rate limit injetado"},
+                status_code=429,
+                headers={"Retry-After": str(config.retry_after)},
+            )
+        code = generate_stub_code(prompt)
+        if not stream:
+            return render_full(code)
+        behavior.stats["streams"] += 1
+
+        async def events() -> AsyncIterator[str]:
+            for chunk in _chunks(code, config.stream_chunk_chars):
+                yield f"data: {json.dumps(render_chunk(chunk))}\n\n"
+                await asyncio.sleep(0)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/completions")
+    async def completions(request: Request) -> Any:
+        body = await request.json()
+        model = body.get("model", "stub")
+        return await respond(
+            str(body.get("prompt", "")),
+            bool(body.get("stream")),
+            lambda code: {
+                "id": f"cmpl-{int(time.time() * 1000)}",
+                "object": "text_completion",
+                "model": model,
+                "choices": [{"index": 0, "text": code, "finish_reason": "stop"}],
+            },
+            lambda chunk: {"choices": [{"index": 0, "text": chunk}]},
+        )
+
+    @app.post("/api/v0/chat/completions")
+    async def myai_chat(request: Request) -> Any:
+        body = await request.json()
+        prompt = next(
+            (
+                m.get("content", "")
+                for m in reversed(body.get("messages", []))
+                if m.get("role") in ("human", "user")
+            ),
+            "",
+        )
+        return await respond(
+            prompt,
+            bool(body.get("stream")),
+            lambda code: {
+                "message": {"role": "assistant", "content": f"```python\n{code}```"}
+            },
+            lambda chunk: {"delta": {"role": "assistant", "content": chunk}},
+        )
+
+    @app.get("/v1/models")
+    async def models() -> Dict[str, Any]:
+        return {"object": "list", "data": [{"id": "stub", "object": "model"}]}
+
+    @app.get("/stub/stats")
+    async def stats() -> Dict[str, int]:
+        return dict(behavior.stats)
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import uvicorn
+
+    defaults = StubConfig.from_env()
+    parser = argparse.ArgumentParser(description="Servidor LLM stub do SkyHAL")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4242)
+    for f in fields(StubConfig):
+        parser.add_argument(
+            f"--{f.name.replace('_', '-')}",
+            type=type(f.default),
+            default=getattr(defaults, f.name),
+        )
+    args = vars(parser.parse_args(argv))
+    host, port = args.pop("host"), args.pop("port")
+    uvicorn.run(create_stub_app(StubConfig(**args)), host=host, port=port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Testes unitários para o cache de bytecode das tools.
+
+Este módulo verifica a compilação única por hash, a persistência em disco
+e a execução na sandbox a partir do bytecode em cache.
+"""
+
+import builtins
+import os
+from unittest.mock import patch
+
+import pytest
+
+from src.domain.auto_extension.bytecode_cache import BytecodeCache
+from src.domain.auto_extension.execution_backend import ForkExecutionBackend
+
+TOOL_CODE = (
+    "def add(a, b):\n    return a + b\n\nresult = add(params['a'], params['b'])\n"
+)
+
+
+def test_compiles_once_per_hash_with_lru_bound():
+    cache = BytecodeCache(max_entries=1)
+    with patch.object(builtins, "compile", wraps=compile) as compile_spy:
+        first = cache.get(TOOL_CODE)
+        assert cache.get(TOOL_CODE) is first
+        assert compile_spy.call_count == 1
+        cache.get("result = 1\n")
+        cache.get(TOOL_CODE)
+        assert compile_spy.call_count == 3
+    namespace = {"params": {"a": 1, "b": 2}}
+    exec(first.code, namespace)
+    assert namespace["result"] == 3
+
+
+def test_bytecode_is_reloaded_from_disk(tmp_path):
+    BytecodeCache(str(tmp_path)).get(TOOL_CODE)
+    fresh = BytecodeCache(str(tmp_path))
+    path = fresh.path_for(fresh.hash_code(TOOL_CODE))
+    assert os.path.dirname(path) == str(tmp_path / "__pycache__")
+
+    with patch.object(builtins, "compile", wraps=compile) as compile_spy:
+        entry = fresh.get(TOOL_CODE)
+    assert compile_spy.call_count == 0
+    assert entry.code.co_filename.startswith("<tool ")
+
+
+def test_corrupted_file_is_recompiled(tmp_path):
+    cache = BytecodeCache(str(tmp_path))
+    path = cache.path_for(cache.hash_code(TOOL_CODE))
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as f:
+        f.write(b"lixo")
+
+    entry = cache.get(TOOL_CODE)
+    with open(path, "rb") as f:
+        assert f.read().endswith(entry.data)
+
+
+def test_syntax_errors_are_not_cached():
+    cache = BytecodeCache()
+    with pytest.raises(SyntaxError):
+        cache.get("def quebrado(:\n")
+    with pytest.raises(SyntaxError):
+        cache.get("def quebrado(:\n")
+
+
+@pytest.mark.asyncio
+async def test_backend_executes_cached_bytecode():
+    cache = BytecodeCache()
+    backend = ForkExecutionBackend(bytecode_cache=cache)
+
+    first = await backend.run(TOOL_CODE, {"a": 5, "b": 3})
+    with patch.object(builtins, "compile", wraps=compile) as compile_spy:
+        second = await backend.run(TOOL_CODE, {"a": 2, "b": 2})
+    assert compile_spy.call_count == 0
+    assert (first["result"], second["result"]) == (8, 4)
+
+    broken = await backend.run("def quebrado(:\n")
+    assert broken["status"] == "error"
+    assert broken["error"].startswith("SyntaxError")
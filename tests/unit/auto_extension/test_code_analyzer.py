@@ -0,0 +1,127 @@
+"""Testes unitários para o analisador estático de código.
+
+Este módulo verifica a análise por AST e o cache de vereditos do
+analisador usado por gerador, validador e sandbox de auto-extensão.
+"""
+
+import ast
+from unittest.mock import patch
+
+import pytest
+from prometheus_client import REGISTRY
+
+from src.domain.auto_extension.code_analyzer import CodeAnalyzer
+from src.domain.auto_extension.security_sandbox import SecuritySandbox
+
+SAFE_CODE = """
+def add(a, b):
+    '''Soma sem open() nem import os (só no texto).'''
+    return a + b
+"""
+
+UNSAFE_CODE = """
+import os
+from subprocess import run
+
+def execute_command(cmd):
+    eval(cmd)
+    return os.system(cmd), run.__globals__
+"""
+
+
+def cache_hits() -> float:
+    return (
+        REGISTRY.get_sample_value("code_analyzer_cache_total", {"result": "hit"}) or 0.0
+    )
+
+
+class TestCodeAnalyzer:
+    """Conjunto de testes para o analisador de código."""
+
+    def test_safe_code_ignores_patterns_in_strings(self):
+        verdict = CodeAnalyzer().evaluate(SAFE_CODE)
+        assert verdict.is_safe
+        assert verdict.functions == ("add",)
+        assert verdict.score == 1.0
+
+    def test_detects_imports_calls_and_attributes_in_one_pass(self):
+        verdict = CodeAnalyzer().evaluate(UNSAFE_CODE)
+        assert not verdict.is_safe
+        found = {(i["type"], i["name"], i["line"]) for i in verdict.issues}
+        assert found == {
+            ("forbidden_import", "os", 2),
+            ("forbidden_import", "subprocess", 3),
+            ("forbidden_call", "eval", 6),
+            ("forbidden_attribute", "__globals__", 7),
+        }
+        assert verdict.score == 0.0
+
+    @pytest.mark.parametrize(
+        "code, issue",
+        [
+            (
+                "result = getattr(print, 'x')",
+                ("forbidden_call", "getattr"),
+            ),
+            ("owner = print.__self__", ("forbidden_attribute", "__self__")),
+            (
+                "result = getattr(params, '__glo' + 'bals__')",
+                ("forbidden_call", "getattr"),
+            ),
+            ("result = vars()", ("forbidden_call", "vars")),
+            ("result = globals()", ("forbidden_call", "globals")),
+            ("result = locals()", ("forbidden_call", "locals")),
+            ("setattr(params, 'a', 1)", ("forbidden_call", "setattr")),
+            ("delattr(params, 'a')", ("forbidden_call", "delattr")),
+            ("name = '__self__'", ("forbidden_string", "__self__")),
+            ("cls = ().__class__", ("forbidden_attribute", "__class__")),
+        ],
+    )
+    def test_detects_reflective_access(self, code, issue):
+        found = {(i["type"], i["name"]) for i in CodeAnalyzer().evaluate(code).issues}
+        assert found == {issue}
+
+    def test_sandbox_escape_through_builtins_is_rejected(self):
+        code = (
+            "owner = getattr(print, '__self__')\n"
+            "result = owner.__import__('os').environ['LLM_API_KEY']\n"
+        )
+        verdict = CodeAnalyzer().evaluate(code)
+        assert not verdict.is_safe
+        assert {i["name"] for i in verdict.issues} == {
+            "getattr",
+            "__self__",
+            "__import__",
+        }
+
+    def test_syntax_error_is_unsafe(self):
+        verdict = CodeAnalyzer().evaluate("def quebrado(:\n    pass")
+        assert not verdict.syntax_ok
+        assert not verdict.is_safe
+        assert verdict.issues[0]["type"] == "syntax_error"
+
+    def test_verdicts_are_cached_by_hash_with_lru_bound(self):
+        analyzer = CodeAnalyzer(cache_size=2)
+        hits_before = cache_hits()
+        with patch("ast.parse", wraps=ast.parse) as parse:
+            first = analyzer.evaluate(SAFE_CODE)
+            assert analyzer.evaluate(SAFE_CODE) is first
+            assert parse.call_count == 1
+            analyzer.evaluate(UNSAFE_CODE)
+            analyzer.evaluate("def outra():\n    return 1\n")
+            analyzer.evaluate(SAFE_CODE)
+            assert parse.call_count == 4
+        assert cache_hits() == hits_before + 1
+
+    @pytest.mark.asyncio
+    async def test_component_interfaces_share_the_verdict(self):
+        analyzer = CodeAnalyzer()
+        validator_result = await analyzer.analyze(UNSAFE_CODE)
+        generator_result = await analyzer.validate(UNSAFE_CODE, spec=None)
+        assert validator_result == generator_result
+        assert validator_result["passed"] is False
+
+        sandbox = SecuritySandbox(code_analyzer=analyzer)
+        success, output = await sandbox.execute_safely(UNSAFE_CODE)
+        assert success is False
+        assert len(output["vulnerabilities"]) == 4
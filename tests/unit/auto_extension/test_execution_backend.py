@@ -0,0 +1,355 @@
+"""Testes unitários para os backends de execução em processos isolados.
+
+Este módulo verifica a execução real de código em processos filhos (fork
+direto e fork server), os limites de recursos aplicados e o encerramento
+forçado por prazo.
+"""
+
+import asyncio
+import marshal
+import os
+import signal
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.domain.auto_extension.execution_backend import (
+    APPROVED_STDLIB_MODULES,
+    FRAME,
+    MAX_FRAME_BYTES,
+    ExecutionLimits,
+    ForkExecutionBackend,
+    ForkServerBackend,
+    _WorkerBackend,
+    _write_request,
+    create_execution_backend,
+)
+from src.domain.auto_extension.resource_monitor import ResourceMonitor
+from src.domain.auto_extension.sandbox_worker import BLOCKED_BUILTINS
+from src.domain.auto_extension.security_sandbox import SecuritySandbox
+from src.infrastructure.llm_client_myai import SYSTEM_PROMPT
+
+LIMITS = ExecutionLimits(memory_mb=128, max_open_files=16)
+
+
+@pytest.fixture(params=[ForkExecutionBackend, ForkServerBackend])
+async def backend(request):
+    backend = request.param(LIMITS)
+    yield backend
+    await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_returns_result_and_output(backend):
+    result = await backend.run(
+        "print('somando')\nresult = {'soma': params['a'] + params['b']}",
+        {"a": 5, "b": 3},
+    )
+    assert result == {"status": "success", "result": {"soma": 8}, "output": "somando\n"}
+
+
+@pytest.mark.asyncio
+async def test_exceptions_and_unserializable_results(backend):
+    error = await backend.run("raise ValueError('inválido')")
+    assert error["status"] == "error"
+    assert error["error"] == "ValueError: inválido"
+
+    result = await backend.run("result = object()")
+    assert result["status"] == "success"
+    assert result["result"].startswith("<object object")
+
+
+# Escreve um registro forjado em todos os descritores herdados pelo código
+FORGED_FRAME = """
+import os
+for fd in os.listdir('/proc/self/fd'):
+    try:
+        os.write(int(fd), params['frame'])
+    except OSError:
+        pass
+os._exit(0)
+"""
+
+
+@pytest.mark.asyncio
+async def test_large_results_are_rejected_by_the_worker(backend):
+    result = await backend.run("result = 'x' * params['size']", {"size": 5 << 20})
+    assert result == {
+        "status": "error",
+        "error": f"Resposta excede {MAX_FRAME_BYTES} bytes",
+        "output": "",
+    }
+
+
+@pytest.mark.asyncio
+async def test_forged_frames_are_not_trusted(backend):
+    oversized = await backend.run(
+        FORGED_FRAME, {"frame": FRAME.pack(MAX_FRAME_BYTES + 1) + b"x" * 64}
+    )
+    assert oversized == {
+        "status": "error",
+        "error": f"Resposta excede {MAX_FRAME_BYTES} bytes",
+    }
+
+    payload = marshal.dumps((0.0, {"status": "success", "result": 1}))
+    forged = await backend.run(
+        FORGED_FRAME, {"frame": FRAME.pack(len(payload)) + payload}
+    )
+    assert forged == {"status": "error", "error": "Resposta inválida do processo"}
+
+
+@pytest.mark.asyncio
+async def test_request_write_waits_on_the_event_loop():
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(write_fd, False)
+    try:
+        # Ninguém lê o pipe: a escrita espera no loop até o prazo
+        with pytest.raises(asyncio.TimeoutError):
+            await _write_request(write_fd, b"x" * (1 << 20), time.monotonic() + 0.1)
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+
+
+ENVIRONMENT_PROBE = """
+import os
+with open('/proc/self/environ', 'rb') as f:
+    environ_block = f.read()
+result = [
+    os.environ.get('LLM_API_KEY'),
+    print.__self__.__import__('os').getenv('LLM_API_KEY'),
+    params['inherited'].encode() in environ_block,
+]
+"""
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend_class", [ForkExecutionBackend, ForkServerBackend])
+async def test_tool_code_does_not_see_the_api_environment(monkeypatch, backend_class):
+    monkeypatch.setenv("LLM_API_KEY", "sk-secret-123")
+    # Uma variável do bloco de ambiente com que este processo foi iniciado
+    with open("/proc/self/environ", "rb") as f:
+        inherited = f.read().split(b"\0")[0].decode()
+    backend = backend_class(LIMITS)
+    try:
+        result = await backend.run(ENVIRONMENT_PROBE, {"inherited": inherited})
+    finally:
+        await backend.close()
+    assert result["status"] == "success"
+    assert result["result"] == [None, None, False]
+
+
+@pytest.mark.asyncio
+async def test_reflective_builtins_are_not_available(backend):
+    for code in ("result = eval('1')", "result = getattr(print, '__self__')"):
+        result = await backend.run(code)
+        assert result["status"] == "error"
+        assert result["error"].startswith("NameError")
+    assert "eval" in BLOCKED_BUILTINS
+
+
+def test_worker_backend_requires_the_process_hooks():
+    with pytest.raises(TypeError):
+        _WorkerBackend()
+
+
+@pytest.mark.asyncio
+async def test_timeout_kills_worker(backend):
+    started = time.monotonic()
+    result = await backend.run("while True:\n    pass\n", timeout=0.2)
+    assert result["status"] == "timeout"
+    assert time.monotonic() - started < 1.0
+
+
+@pytest.mark.asyncio
+async def test_memory_and_open_file_limits(backend):
+    memory = await backend.run("data = bytearray(512 * 1024 * 1024)")
+    assert memory["error"].startswith("MemoryError")
+
+    files = await backend.run("handles = [open('/dev/null') for _ in range(32)]")
+    assert "Too many open files" in files["error"]
+
+
+@pytest.mark.asyncio
+async def test_parallel_executions_are_isolated(backend):
+    results = await asyncio.gather(
+        *(backend.run("result = params['n'] * 2", {"n": n}) for n in range(20))
+    )
+    assert [r["result"] for r in results] == [n * 2 for n in range(20)]
+
+
+@pytest.mark.asyncio
+async def test_execute_safely_reports_backend_timeout():
+    sandbox = SecuritySandbox()
+    success, output = await sandbox.execute_safely(
+        "while True:\n    pass\n", timeout_ms=200
+    )
+    assert success is False
+    assert output == {"error": "Tempo limite excedido: 200ms"}
+
+
+def test_preloaded_modules_are_the_approved_ones():
+    for module in APPROVED_STDLIB_MODULES:
+        assert module in SYSTEM_PROMPT
+    assert isinstance(create_execution_backend(mode="forkserver"), ForkServerBackend)
+    with pytest.raises(ValueError):
+        create_execution_backend(mode="threads")
+
+
+def test_default_mode_is_the_fork_server(monkeypatch):
+    monkeypatch.delenv("SANDBOX_EXEC_MODE", raising=False)
+    assert isinstance(create_execution_backend(), ForkServerBackend)
+    monkeypatch.setenv("SANDBOX_EXEC_MODE", "fork")
+    assert isinstance(create_execution_backend(), ForkExecutionBackend)
+
+
+@pytest.mark.asyncio
+async def test_fork_server_preloads_modules_and_restarts():
+    backend = ForkServerBackend(LIMITS, preload=("json", "uuid"))
+    try:
+        result = await backend.run("import sys\nresult = 'uuid' in sys.modules")
+        assert result["result"] is True
+        zygote_pid = backend._process.pid
+
+        os.kill(zygote_pid, signal.SIGKILL)
+        await backend._process.wait()
+        await asyncio.sleep(0.05)
+        assert not backend.running
+
+        result = await backend.run("result = params['x'] + 1", {"x": 1})
+        assert result == {"status": "success", "result": 2, "output": ""}
+        assert backend._process.pid != zygote_pid
+    finally:
+        await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_batch_runs_cases_in_one_worker(backend):
+    pids = []
+
+    async def on_spawn(pid):
+        pids.append(pid)
+
+    cases = [
+        response
+        async for response in backend.run_batch(
+            "import os\nresult = (params['n'] * 2, os.getpid())",
+            [{"n": n} for n in range(10)],
+            on_spawn=on_spawn,
+        )
+    ]
+
+    assert [case["index"] for case in cases] == list(range(10))
+    assert [case["result"][0] for case in cases] == [n * 2 for n in range(10)]
+    assert {case["result"][1] for case in cases} == set(pids)
+    assert len(pids) == 1
+    assert all(case["duration_ms"] >= 0 for case in cases)
+
+
+@pytest.mark.asyncio
+async def test_batch_failures_do_not_stop_the_remaining_cases(backend):
+    pids = []
+
+    async def on_spawn(pid):
+        pids.append(pid)
+
+    code = (
+        "import os\n"
+        "if params.get('loop'):\n    while True:\n        pass\n"
+        "if params.get('crash'):\n    os._exit(3)\n"
+        "if params.get('raise'):\n    raise ValueError('caso inválido')\n"
+        "result = params['n']\n"
+    )
+    params_list = [
+        {"n": 0},
+        {"n": 1, "loop": True},
+        {"n": 2, "raise": True},
+        {"n": 3, "crash": True},
+        {"n": 4, "bad": object()},
+        {"n": 5},
+    ]
+    cases = {
+        case["index"]: case
+        async for case in backend.run_batch(
+            code, params_list, timeout=0.3, on_spawn=on_spawn
+        )
+    }
+
+    assert sorted(cases) == list(range(6))
+    assert cases[0]["result"] == 0 and cases[5]["result"] == 5
+    assert cases[1]["status"] == "timeout"
+    assert cases[2]["error"] == "ValueError: caso inválido"
+    assert "código 3" in cases[3]["error"]
+    assert cases[4]["error"].startswith("Parâmetros não serializáveis")
+    # Um processo novo depois do prazo estourado e outro depois da queda
+    assert len(pids) == 3
+
+
+@pytest.mark.asyncio
+async def test_execute_batch_scans_once_and_streams_cases():
+    analyzer = AsyncMock()
+    analyzer.scan_for_vulnerabilities.return_value = {"is_safe": True}
+    sandbox = SecuritySandbox(ResourceMonitor(interval=0.005), analyzer)
+    code = (
+        "if params.get('hog'):\n"
+        "    import time\n"
+        "    chunks = []\n"
+        "    for _ in range(100):\n"
+        "        chunks.append(bytearray(16 * 1024 * 1024))\n"
+        "        time.sleep(0.01)\n"
+        "result = params['x'] ** 2\n"
+    )
+    params_list = [{"x": 2}, {"x": 3, "hog": True}, {"x": 4}]
+    cases = sandbox.execute_batch(
+        code, params_list, timeout_ms=5000, resource_limits={"memory_mb": 64}
+    )
+
+    first = await cases.__anext__()
+    assert (first["index"], first["success"], first["result"]) == (0, True, 4)
+    rest = [case async for case in cases]
+
+    assert rest[0]["success"] is False
+    assert rest[0]["resource_violation"]["exceeded"] == ["memory"]
+    assert (rest[1]["index"], rest[1]["result"]) == (2, 16)
+    analyzer.scan_for_vulnerabilities.assert_awaited_once_with(code)
+    assert sandbox.resource_monitor._sessions == {}
+    await sandbox.close()
+
+
+class MinimalMonitor:
+    """Monitor sem killed_for, cujo check_limits devolve só o booleano."""
+
+    def __init__(self) -> None:
+        self.ended = []
+
+    async def start_monitoring(self, limits):
+        return f"session-{len(self.ended)}"
+
+    async def track(self, monitor_id, pid):
+        pass
+
+    async def get_usage(self, monitor_id):
+        self.ended.append(monitor_id)
+        return {}
+
+    async def check_limits(self, usage, limits):
+        return True
+
+
+@pytest.mark.asyncio
+async def test_execute_batch_accepts_a_minimal_monitor():
+    monitor = MinimalMonitor()
+    sandbox = SecuritySandbox(monitor)
+    code = "if params['x'] == 1:\n    raise ValueError('caso inválido')\nresult = params['x']\n"
+
+    cases = [
+        case
+        async for case in sandbox.execute_batch(code, [{"x": 0}, {"x": 1}, {"x": 2}])
+    ]
+
+    assert [case["success"] for case in cases] == [True, False, True]
+    assert cases[1]["error"] == "ValueError: caso inválido"
+    assert "resource_violation" not in cases[1]
+    assert monitor.ended == ["session-0"]
+    await sandbox.close()
@@ -0,0 +1,132 @@
+"""Testes unitários para o perfil de desempenho de tools.
+
+Este módulo verifica a medição real de tools na sandbox, o score calculado
+contra o orçamento de cada nível de segurança e a fase de perfil do
+ToolValidator.
+"""
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.domain.auto_extension.performance_profiler import (
+    PerformanceProfiler,
+    sample_arguments,
+)
+from src.domain.auto_extension.security_sandbox import SecuritySandbox
+from src.domain.auto_extension.tool_generator import GeneratedTool, ToolSpec
+from src.domain.auto_extension.tool_validator import ToolValidator, ValidationResult
+
+FAST_TOOL = """
+def format_name(first, last, upper=False):
+    name = f"{first} {last}"
+    return name.upper() if upper else name
+"""
+
+SLOW_TOOL = """
+import time
+
+def format_name(first, last, upper=False):
+    time.sleep(0.06)
+    return f"{first} {last}"
+"""
+
+
+def make_tool(code: str, security_level: str = "standard") -> GeneratedTool:
+    return GeneratedTool(
+        tool_id="perf-1",
+        name="format_name",
+        code=code,
+        spec=ToolSpec(
+            name="format_name",
+            description="Formata um nome",
+            parameters={
+                "first": {"type": "string"},
+                "last": {"type": "string", "default": "Silva"},
+                "upper": {"type": "boolean", "enum": [False, True]},
+            },
+            return_type="string",
+            template_id="basic_function",
+            security_level=security_level,
+            resource_requirements={},
+        ),
+        validation_results={},
+        version="1.0.0",
+        created_at="2024-01-01T00:00:00Z",
+    )
+
+
+@pytest.fixture
+async def sandbox():
+    sandbox = SecuritySandbox()
+    yield sandbox
+    await sandbox.close()
+
+
+def test_sample_arguments_follow_the_schema():
+    assert sample_arguments(make_tool(FAST_TOOL).spec.parameters) == {
+        "first": "exemplo",
+        "last": "Silva",
+        "upper": False,
+    }
+
+
+@pytest.mark.asyncio
+async def test_fast_tool_is_within_budget(sandbox):
+    profile = await PerformanceProfiler(sandbox, iterations=5).profile(
+        make_tool(FAST_TOOL)
+    )
+
+    assert profile["status"] == "measured"
+    assert profile["score"] == 1.0
+    assert profile["issues"] == []
+    metrics = profile["metrics"]
+    assert metrics["iterations"] == 5 and metrics["errors"] == 0
+    assert 0 <= metrics["wall_ms"] <= metrics["wall_p95_ms"]
+    assert metrics["allocated_kb"] > 0
+
+
+@pytest.mark.asyncio
+async def test_slow_tool_is_scored_against_its_security_level(sandbox):
+    profiler = PerformanceProfiler(sandbox, iterations=3, warmup=0)
+
+    standard = await profiler.profile(make_tool(SLOW_TOOL, "standard"))
+    admin = await profiler.profile(make_tool(SLOW_TOOL, "admin"))
+
+    assert standard["score"] == 1.0
+    assert admin["score"] < 0.5
+    assert [issue["metric"] for issue in admin["issues"]] == ["wall_ms"]
+    assert admin["issues"][0]["severity"] == "high"
+
+
+@pytest.mark.asyncio
+async def test_tool_without_main_function_is_not_scored(sandbox):
+    profile = await PerformanceProfiler(sandbox).profile(
+        make_tool("def other():\n    return 1\n")
+    )
+
+    assert profile["status"] == "skipped"
+    assert profile["score"] is None
+    assert "format_name" in profile["reason"]
+
+
+@pytest.mark.asyncio
+async def test_validator_fails_tools_over_budget(sandbox):
+    analyzer = AsyncMock()
+    analyzer.analyze.return_value = {"score": 0.95, "issues": []}
+    runner = AsyncMock()
+    runner.run_tests.return_value = {"passed": True, "performance_score": 0.99}
+    validator = ToolValidator(
+        sandbox,
+        analyzer,
+        runner,
+        performance_profiler=PerformanceProfiler(sandbox, iterations=3, warmup=0),
+    )
+
+    report = await validator.validate_tool(make_tool(SLOW_TOOL, "admin"))
+
+    assert report.result == ValidationResult.FAILED_PERFORMANCE
+    assert report.performance_score < 0.5
+    assert report.test_results["performance_profile"]["status"] == "measured"
+    assert "performance_profiling" in report.phase_timings
+    assert sandbox._active_environments == {}
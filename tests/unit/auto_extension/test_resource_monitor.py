@@ -0,0 +1,147 @@
+"""Testes unitários para o monitor de recursos da sandbox.
+
+Este módulo verifica a leitura de /proc e a aplicação dos limites de CPU,
+memória e IO enquanto o processo de execução ainda está rodando.
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import time
+
+import pytest
+
+from src.domain.auto_extension import resource_monitor
+from src.domain.auto_extension.resource_monitor import (
+    ResourceMonitor,
+    read_proc_sample,
+    read_start_time,
+)
+from src.domain.auto_extension.security_sandbox import SecuritySandbox
+
+MEMORY_HOG = """
+import time
+chunks = []
+for _ in range(100):
+    chunks.append(bytearray(16 * 1024 * 1024))
+    time.sleep(0.01)
+"""
+
+IO_HOG = """
+with open('/dev/zero', 'rb', buffering=0) as source:
+    while True:
+        source.read(1)
+"""
+
+
+@pytest.fixture
+async def sandbox():
+    sandbox = SecuritySandbox(ResourceMonitor(interval=0.005, cpu_grace=0.2))
+    yield sandbox
+    await sandbox.close()
+
+
+def test_reads_cpu_memory_and_io_from_proc():
+    cpu_seconds, rss_mb, io_operations = read_proc_sample(os.getpid())
+    assert cpu_seconds > 0
+    assert rss_mb > 1
+    assert io_operations > 0
+    assert read_proc_sample(2**22 + 1) is None
+    assert read_start_time(os.getpid()) > 0
+    assert read_start_time(2**22 + 1) is None
+
+
+@pytest.mark.asyncio
+async def test_does_not_signal_a_recycled_pid(monkeypatch):
+    # Sem pidfd, o instante de início identifica o processo anexado
+    monkeypatch.setattr(resource_monitor, "_open_pidfd", lambda pid: None)
+    monitor = ResourceMonitor(interval=0.005)
+    tracked = subprocess.Popen(["sleep", "10"])
+    recycled = subprocess.Popen(["sleep", "10"])
+    try:
+        for process in (tracked, recycled):
+            monitor_id = await monitor.start_monitoring({"memory_mb": -1})
+            await monitor.track(monitor_id, process.pid)
+            if process is recycled:
+                # Simula outro processo assumindo o pid depois da coleta
+                monitor._sessions[monitor_id].start_time -= 1
+            await asyncio.sleep(0.05)
+            await monitor.get_usage(monitor_id)
+
+        assert tracked.wait(timeout=1) == -signal.SIGKILL
+        assert recycled.poll() is None
+    finally:
+        for process in (tracked, recycled):
+            process.kill()
+            process.wait()
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(
+    not hasattr(os, "pidfd_open"), reason="pidfd indisponível nesta plataforma"
+)
+async def test_pidfd_outlives_the_reaped_process():
+    monitor = ResourceMonitor()
+    process = subprocess.Popen(["sleep", "10"])
+    monitor_id = await monitor.start_monitoring()
+    await monitor.track(monitor_id, process.pid)
+    session = monitor._sessions[monitor_id]
+    assert monitor._is_tracked_process(session)
+
+    process.kill()
+    process.wait()
+
+    assert not monitor._is_tracked_process(session)
+    await monitor.get_usage(monitor_id)
+    assert session.pidfd is None
+
+
+@pytest.mark.asyncio
+async def test_kills_worker_when_memory_limit_is_crossed(sandbox):
+    started = time.monotonic()
+    success, output = await sandbox.execute_safely(
+        MEMORY_HOG, timeout_ms=5000, resource_limits={"memory_mb": 64}
+    )
+    assert success is False
+    assert output["resource_violation"]["exceeded"] == ["memory"]
+    assert output["resource_violation"]["details"]["memory_mb"]["actual"] > 64
+    assert time.monotonic() - started < 1.0
+    assert sandbox.resource_monitor._sessions == {}
+
+
+@pytest.mark.asyncio
+async def test_kills_worker_when_io_limit_is_crossed(sandbox):
+    success, output = await sandbox.execute_safely(
+        IO_HOG, timeout_ms=5000, resource_limits={"io_operations": 1000}
+    )
+    assert success is False
+    assert output["resource_violation"]["exceeded"] == ["io"]
+
+
+@pytest.mark.asyncio
+async def test_cpu_limit_respects_grace_period():
+    monitor = ResourceMonitor(cpu_grace=0.5)
+    limits = {"cpu_percent": 80.0}
+    burst = {"cpu_percent": 100.0, "execution_time_ms": 100}
+    sustained = {"cpu_percent": 100.0, "execution_time_ms": 600}
+
+    assert await monitor.check_limits(burst, limits) == (
+        True,
+        {"exceeded": [], "details": {}},
+    )
+    within, info = await monitor.check_limits(sustained, limits)
+    assert within is False
+    assert info["details"] == {"cpu_percent": {"limit": 80.0, "actual": 100.0}}
+
+
+@pytest.mark.asyncio
+async def test_well_behaved_tool_runs_and_session_is_closed(sandbox):
+    success, output = await sandbox.execute_safely(
+        "result = sum(range(1000))", resource_limits={"memory_mb": 64}
+    )
+    assert (success, output["result"]) == (True, 499500)
+
+    success, _ = await sandbox.execute_safely("while True:\n    pass\n", timeout_ms=100)
+    assert success is False
+    assert sandbox.resource_monitor._sessions == {}
@@ -0,0 +1,133 @@
+"""Testes unitários do ciclo de vida dos ambientes da SecuritySandbox.
+
+Este módulo verifica a remoção por ociosidade, o limite de ambientes com
+remoção do menos recentemente usado e as contagens por estado.
+"""
+
+import asyncio
+import os
+import tempfile
+
+import pytest
+from prometheus_client import REGISTRY
+
+from src.domain.auto_extension.security_sandbox import (
+    EnvironmentPolicy,
+    SecuritySandbox,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def _gauge(state):
+    return REGISTRY.get_sample_value("sandbox_environments", {"state": state}) or 0
+
+
+@pytest.mark.asyncio
+async def test_idle_environments_expire_after_ttl(clock):
+    sandbox = SecuritySandbox(
+        environment_policy=EnvironmentPolicy(idle_ttl=60), clock=clock
+    )
+    old = await sandbox.create_environment()
+    old_workdir = sandbox._active_environments[old].workdir
+    managed = await sandbox.create_sandbox()
+
+    clock.now += 61
+    recent = await sandbox.create_environment()
+
+    assert list(sandbox._active_environments) == [managed, recent]
+    assert not os.path.exists(old_workdir)
+    clock.now += 61
+    assert await sandbox.prune_environments() == 1
+    assert list(sandbox._active_environments) == [managed]
+    await sandbox.close()
+
+
+@pytest.mark.asyncio
+async def test_max_environments_evicts_least_recently_used(clock):
+    sandbox = SecuritySandbox(
+        environment_policy=EnvironmentPolicy(max_environments=2), clock=clock
+    )
+    first = await sandbox.create_environment()
+    clock.now += 1
+    second = await sandbox.create_environment()
+    clock.now += 1
+    await sandbox.execute_code("result = 1", environment_id=first)
+
+    third = await sandbox.create_environment()
+
+    assert list(sandbox._active_environments) == [first, third]
+    assert sandbox._active_environments[first].uses == 1
+    with pytest.raises(KeyError):
+        await sandbox.execute_code("result = 1", environment_id=second)
+    await sandbox.close()
+
+
+@pytest.mark.asyncio
+async def test_full_sandbox_without_idle_environments_refuses_new_ones(clock):
+    sandbox = SecuritySandbox(
+        environment_policy=EnvironmentPolicy(max_environments=1), clock=clock
+    )
+    await sandbox.create_sandbox()
+
+    with pytest.raises(RuntimeError):
+        await sandbox.create_environment()
+
+    assert len(sandbox._active_environments) == 1
+    await sandbox.close()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_creation_leaves_no_directory(clock, tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    sandbox = SecuritySandbox(clock=clock)
+    pruning = asyncio.Event()
+
+    async def slow_prune():
+        pruning.set()
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(sandbox, "prune_environments", slow_prune)
+    task = asyncio.create_task(sandbox.create_environment())
+    await pruning.wait()
+    # O diretório só é criado depois do último await
+    assert list(tmp_path.iterdir()) == []
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert sandbox._active_environments == {}
+    assert list(tmp_path.iterdir()) == []
+    await sandbox.close()
+
+
+@pytest.mark.asyncio
+async def test_counts_environments_by_state(clock):
+    baseline = {state: _gauge(state) for state in ("created", "in_use", "ready")}
+    sandbox = SecuritySandbox(clock=clock)
+    used = await sandbox.create_environment()
+    await sandbox.create_environment()
+    seen = {}
+
+    async def on_spawn(pid):
+        seen.update(sandbox.environment_counts())
+
+    await sandbox.execute_code("result = 1", environment_id=used, on_spawn=on_spawn)
+
+    assert seen == {"created": 1, "in_use": 1, "ready": 0}
+    assert sandbox.environment_counts() == {"created": 1, "in_use": 0, "ready": 1}
+    assert _gauge("created") - baseline["created"] == 1
+    assert _gauge("ready") - baseline["ready"] == 1
+    await sandbox.close()
+    assert {state: _gauge(state) for state in baseline} == baseline
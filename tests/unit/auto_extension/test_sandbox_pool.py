@@ -0,0 +1,147 @@
+"""Testes unitários para o pool de sandboxes pré-aquecidos.
+
+Este módulo verifica pré-aquecimento, reciclagem, despejo de ociosos e
+métricas do pool, além do uso do SecuritySandbox como provedor.
+"""
+
+import asyncio
+import os
+from unittest.mock import AsyncMock
+
+import pytest
+from prometheus_client import REGISTRY
+
+from src.domain.auto_extension.sandbox_pool import SandboxPool, SandboxPoolConfig
+from src.domain.auto_extension.security_sandbox import SecuritySandbox
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_provider() -> AsyncMock:
+    provider = AsyncMock()
+    provider.create_sandbox.side_effect = lambda: object()
+    return provider
+
+
+def recycled(pool: str, reason: str) -> float:
+    return (
+        REGISTRY.get_sample_value(
+            "sandbox_pool_recycled_total", {"pool": pool, "reason": reason}
+        )
+        or 0.0
+    )
+
+
+@pytest.mark.asyncio
+async def test_prewarm_fills_minimum_without_exceeding_maximum():
+    provider = make_provider()
+    pool = SandboxPool(provider, SandboxPoolConfig(min_size=3, max_size=2))
+
+    await pool.prewarm()
+    await pool.prewarm()
+
+    assert pool.min_size == 2
+    assert provider.create_sandbox.call_count == 2
+    assert pool.size == 2
+    await pool.close()
+    assert provider.destroy_sandbox.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_recycles_after_max_uses_and_failed_reset():
+    provider = make_provider()
+    provider.reset_sandbox.side_effect = [None, RuntimeError("disco cheio")]
+    pool = SandboxPool(
+        provider, SandboxPoolConfig(max_size=1, max_uses=3), name="test_recycle"
+    )
+    max_uses_before = recycled("test_recycle", "max_uses")
+
+    first = await pool.acquire()
+    await pool.release(first)  # reset ok
+    assert await pool.acquire() is first
+    await pool.release(first)  # reset falha: destruído
+    second = await pool.acquire()
+    assert second is not first
+    provider.reset_sandbox.side_effect = None
+    await pool.release(second)
+    await pool.release(await pool.acquire())
+    await pool.release(await pool.acquire())  # terceiro uso: reciclado
+
+    assert recycled("test_recycle", "reset_failed") >= 1
+    assert recycled("test_recycle", "max_uses") == max_uses_before + 1
+    assert pool.size == 0
+    assert provider.create_sandbox.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_evicts_idle_sandboxes_above_minimum():
+    clock = FakeClock()
+    provider = make_provider()
+    pool = SandboxPool(
+        provider,
+        SandboxPoolConfig(min_size=1, max_size=3, idle_timeout=60),
+        clock=clock,
+    )
+    leased = [await pool.acquire() for _ in range(3)]
+    for sandbox in leased:
+        await pool.release(sandbox)
+        clock.now += 10
+
+    clock.now = 75  # os dois primeiros ociosos passaram de 60s
+    assert await pool.evict_idle() == 2
+    assert pool.size == 1
+    clock.now = 1000
+    assert await pool.evict_idle() == 0  # mínimo preservado
+    assert await pool.acquire() is leased[2]
+
+
+@pytest.mark.asyncio
+async def test_waits_for_free_slot_and_records_lease_wait():
+    pool = SandboxPool(make_provider(), max_size=1, name="test_wait")
+    sandbox = await pool.acquire()
+
+    waiter = asyncio.create_task(pool.acquire())
+    await asyncio.sleep(0.02)
+    assert not waiter.done()
+    await pool.release(sandbox)
+
+    assert await waiter is sandbox
+    labels = {"pool": "test_wait"}
+    assert (
+        REGISTRY.get_sample_value("sandbox_pool_lease_wait_seconds_count", labels) == 2
+    )
+    assert (
+        REGISTRY.get_sample_value("sandbox_pool_lease_wait_seconds_sum", labels) >= 0.02
+    )
+    assert (
+        REGISTRY.get_sample_value(
+            "sandbox_pool_size", {"pool": "test_wait", "state": "leased"}
+        )
+        == 1
+    )
+
+
+@pytest.mark.asyncio
+async def test_security_sandbox_executes_in_pooled_environments():
+    sandbox = SecuritySandbox(pool_config=SandboxPoolConfig(min_size=1, max_size=1))
+    await sandbox.start_pool()
+    (environment_id,) = sandbox._active_environments
+    workdir = sandbox._active_environments[environment_id].workdir
+    with open(os.path.join(workdir, "resto.txt"), "w") as f:
+        f.write("execução anterior")
+
+    success, _ = await sandbox.execute_safely("def f():\n    return 1\n")
+
+    assert success is True
+    assert list(sandbox._active_environments) == [environment_id]
+    assert sandbox._active_environments[environment_id].status == "ready"
+    assert os.listdir(workdir) == []
+    await sandbox.close()
+    assert sandbox._active_environments == {}
+    assert not os.path.exists(workdir)
@@ -147,7 +147,7 @@ result = intensive_task()
         success, output = await sandbox.execute_safely(
             code=heavy_code,
             params={},
-            timeout_ms=1000,
+            timeout_ms=5000,
             resource_limits={"cpu_percent": 80.0, "memory_mb": 500},
         )
 
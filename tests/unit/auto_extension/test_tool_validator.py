@@ -4,10 +4,13 @@ Este módulo contém testes unitários para verificar o funcionamento
 do validador de ferramentas (tools) do sistema de auto-extensão.
 """
 
+import asyncio
+import dataclasses
 from unittest.mock import AsyncMock
 
 import pytest
 
+from src.domain.auto_extension.sandbox_pool import SandboxPool
 from src.domain.auto_extension.tool_generator import GeneratedTool, ToolSpec
 from src.domain.auto_extension.tool_validator import ToolValidator, ValidationResult
 
@@ -177,8 +180,9 @@ def test_calculator(operation, a, b):
             "sistema de arquivos" in i.get("description", "") for i in result.issues
         )
 
-        # Verificar que ainda executou os testes
-        test_runner.run_tests.assert_called_once()
+        # Reprovada na segurança: os testes não chegam a ser executados
+        test_runner.run_tests.assert_not_called()
+        assert result.test_results["skipped"] is True
 
     @pytest.mark.asyncio
     async def test_validate_test_coverage(
@@ -219,3 +223,179 @@ def test_calculator(operation, a, b):
         # O resultado esperado é FAILED_FUNCTIONALITY
         assert result.result == ValidationResult.FAILED_FUNCTIONALITY
         assert any("test_divide_by_zero" in rec for rec in result.recommendations)
+
+    @pytest.mark.asyncio
+    async def test_security_and_sandbox_run_concurrently(
+        self, security_sandbox, test_runner, metrics_provider, mock_tool
+    ):
+        """Testa que análise de segurança e sandbox rodam em paralelo."""
+
+        analysis_started = asyncio.Event()
+        sandbox_started = asyncio.Event()
+
+        # Cada fase só termina depois que a outra começou: em sequência, a
+        # primeira esperaria até o timeout
+        async def slow_analyze(code):
+            analysis_started.set()
+            await asyncio.wait_for(sandbox_started.wait(), timeout=5)
+            return {"passed": True, "score": 0.95, "issues": []}
+
+        async def slow_sandbox():
+            sandbox_started.set()
+            await asyncio.wait_for(analysis_started.wait(), timeout=5)
+            return security_sandbox
+
+        metrics_provider.analyze.side_effect = slow_analyze
+        security_sandbox.create_sandbox.side_effect = slow_sandbox
+        test_runner.run_tests.return_value = {"passed": True, "failed_tests": []}
+        validator = ToolValidator(security_sandbox, metrics_provider, test_runner)
+
+        result = await validator.validate_tool(mock_tool)
+
+        assert result.result == ValidationResult.PASSED
+        assert set(result.phase_timings) == {
+            "security_analysis",
+            "sandbox_provision",
+            "test_execution",
+            "total",
+        }
+        security_sandbox.destroy_sandbox.assert_called_once_with(security_sandbox)
+
+    @pytest.mark.asyncio
+    async def test_security_failure_cancels_sandbox_provisioning(
+        self, security_sandbox, test_runner, metrics_provider, mock_tool
+    ):
+        """Testa o cancelamento do sandbox quando a segurança já reprovou."""
+        cancelled = asyncio.Event()
+
+        async def hanging_sandbox():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def failing_analyze(code):
+            await asyncio.sleep(0.01)
+            return {"score": 0.2, "issues": []}
+
+        metrics_provider.analyze.side_effect = failing_analyze
+        security_sandbox.create_sandbox.side_effect = hanging_sandbox
+        validator = ToolValidator(security_sandbox, metrics_provider, test_runner)
+
+        result = await asyncio.wait_for(validator.validate_tool(mock_tool), 1)
+
+        assert result.result == ValidationResult.FAILED_SECURITY
+        assert cancelled.is_set()
+        test_runner.run_tests.assert_not_called()
+        security_sandbox.destroy_sandbox.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_validate_many_deduplicates_and_shares_sandboxes(
+        self, security_sandbox, test_runner, metrics_provider, mock_tool
+    ):
+        """Testa a validação em lote com deduplicação e pool de sandboxes."""
+        created = []
+
+        async def create_sandbox():
+            await asyncio.sleep(0.01)
+            created.append(object())
+            return created[-1]
+
+        security_sandbox.create_sandbox.side_effect = create_sandbox
+        metrics_provider.analyze.return_value = {"score": 0.95, "issues": []}
+        test_runner.run_tests.return_value = {"passed": True, "failed_tests": []}
+        validator = ToolValidator(security_sandbox, metrics_provider, test_runner)
+
+        def variant(index, code):
+            return dataclasses.replace(mock_tool, tool_id=f"t{index}", code=code)
+
+        tools = [variant(i, f"def f{i % 3}():\n    return {i % 3}\n") for i in range(9)]
+        reports = [r async for r in validator.validate_many(tools, concurrency=2)]
+
+        assert sorted(r.tool_id for r in reports) == [f"t{i}" for i in range(9)]
+        assert all(r.result == ValidationResult.PASSED for r in reports)
+        assert metrics_provider.analyze.call_count == 3
+        assert test_runner.run_tests.call_count == 3
+        assert len(created) <= 2
+        assert security_sandbox.destroy_sandbox.call_count == len(created)
+
+    @pytest.mark.asyncio
+    async def test_validate_many_keeps_specs_with_the_same_code_apart(
+        self, security_sandbox, test_runner, metrics_provider, mock_tool
+    ):
+        """Testa que a mesma tool em outro nível de segurança é revalidada."""
+
+        async def run_tests(sandbox, tool):
+            # Orçamento mais apertado para o nível admin
+            admin = tool.spec.security_level == "admin"
+            return {"passed": True, "performance_score": 0.4 if admin else 1.0}
+
+        security_sandbox.create_sandbox.return_value = security_sandbox
+        metrics_provider.analyze.return_value = {"score": 0.95, "issues": []}
+        test_runner.run_tests.side_effect = run_tests
+        validator = ToolValidator(security_sandbox, metrics_provider, test_runner)
+        tools = [
+            dataclasses.replace(
+                mock_tool,
+                tool_id=level,
+                spec=dataclasses.replace(mock_tool.spec, security_level=level),
+            )
+            for level in ("standard", "admin", "standard")
+        ]
+
+        reports = [r async for r in validator.validate_many(tools)]
+
+        results = {r.tool_id: r.result for r in reports}
+        assert results == {
+            "standard": ValidationResult.PASSED,
+            "admin": ValidationResult.FAILED_PERFORMANCE,
+        }
+        assert len(reports) == 3
+        assert test_runner.run_tests.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_validate_many_isolates_errors(
+        self, security_sandbox, test_runner, metrics_provider, mock_tool
+    ):
+        """Testa que o erro de uma tool não interrompe o lote."""
+
+        async def analyze(code):
+            if "quebra" in code:
+                raise RuntimeError("analisador indisponível")
+            return {"score": 0.95, "issues": []}
+
+        security_sandbox.create_sandbox.return_value = security_sandbox
+        metrics_provider.analyze.side_effect = analyze
+        test_runner.run_tests.return_value = {"passed": True, "failed_tests": []}
+        validator = ToolValidator(security_sandbox, metrics_provider, test_runner)
+        tools = [
+            dataclasses.replace(mock_tool, tool_id="ok"),
+            dataclasses.replace(mock_tool, tool_id="erro", code="# quebra"),
+        ]
+
+        reports = {r.tool_id: r async for r in validator.validate_many(tools)}
+
+        assert reports["ok"].result == ValidationResult.PASSED
+        assert reports["erro"].result == ValidationResult.FAILED_FUNCTIONALITY
+        assert "indisponível" in reports["erro"].issues[0]["description"]
+
+
+@pytest.mark.asyncio
+async def test_sandbox_pool_reuses_and_discards():
+    """Testa empréstimo, reuso e descarte de sandboxes do pool."""
+    provider = AsyncMock()
+    provider.create_sandbox.side_effect = lambda: object()
+    pool = SandboxPool(provider, max_size=1)
+
+    async with pool.lease() as first:
+        pass
+    async with pool.lease() as second:
+        assert second is first
+    with pytest.raises(RuntimeError):
+        async with pool.lease():
+            raise RuntimeError("teste falhou")
+    await pool.close()
+
+    assert provider.create_sandbox.call_count == 1
+    assert provider.destroy_sandbox.call_count == 1
@@ -0,0 +1,157 @@
+"""Testes unitários para o cache de relatórios de validação.
+
+Este módulo verifica os tiers em memória e SQLite, a invalidação por versão
+do analisador e o uso do cache pelo ToolValidator.
+"""
+
+import dataclasses
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.domain.auto_extension.code_analyzer import AnalyzerRules, CodeAnalyzer
+from src.domain.auto_extension.tool_generator import GeneratedTool, ToolSpec
+from src.domain.auto_extension.tool_validator import ToolValidator, ValidationResult
+from src.domain.auto_extension.validation_cache import (
+    ValidationCache,
+    make_validation_key,
+)
+
+TOOL_CODE = "def somar(a, b):\n    return a + b\n"
+
+
+def make_tool(tool_id: str = "tool-1", description: str = "Soma") -> GeneratedTool:
+    return GeneratedTool(
+        tool_id=tool_id,
+        name="somar",
+        code=TOOL_CODE,
+        spec=ToolSpec(
+            name="somar",
+            description=description,
+            parameters={"a": {"type": "number"}, "b": {"type": "number"}},
+            return_type="number",
+            template_id="basic_function",
+            security_level="standard",
+            resource_requirements={},
+        ),
+        validation_results={},
+        version="1.0.0",
+        created_at="2024-01-01T00:00:00Z",
+    )
+
+
+def make_validator(cache, analyzer=None, test_results=None):
+    provider = AsyncMock()
+    provider.create_sandbox.return_value = "sandbox-1"
+    runner = AsyncMock()
+    runner.run_tests.return_value = test_results or {
+        "passed": True,
+        "performance_score": 0.9,
+    }
+    return ToolValidator(
+        provider, analyzer or CodeAnalyzer(), runner, validation_cache=cache
+    )
+
+
+@pytest.mark.asyncio
+async def test_sqlite_tier_persists_and_drops_other_versions(tmp_path):
+    path = str(tmp_path / "validation.db")
+    first = ValidationCache(sqlite_path=path)
+    await first.set("chave", "v1", '{"ok": true}')
+    first.close()
+
+    second = ValidationCache(sqlite_path=path)
+    assert await second.get("chave", "v1") == '{"ok": true}'
+    second.clear()
+    assert await second.get("chave", "v2") is None
+    assert await second.get("chave", "v1") is None
+    assert second.hit_ratio == pytest.approx(1 / 3)
+    second.close()
+
+
+def test_key_changes_with_code_and_spec():
+    tool = make_tool()
+    assert make_validation_key(tool.code, tool.spec) == make_validation_key(
+        tool.code, dataclasses.replace(tool.spec)
+    )
+    assert make_validation_key(tool.code, tool.spec) != make_validation_key(
+        tool.code, make_tool(description="Soma dois números").spec
+    )
+    assert make_validation_key(tool.code, tool.spec) != make_validation_key(
+        tool.code + "\n", tool.spec
+    )
+
+
+@pytest.mark.asyncio
+async def test_validator_reuses_reports_until_the_analyzer_changes():
+    cache = ValidationCache()
+    validator = make_validator(cache)
+
+    first = await validator.validate_tool(make_tool("tool-1"))
+    second = await validator.validate_tool(make_tool("tool-2"))
+
+    assert first.result == second.result == ValidationResult.PASSED
+    assert second.tool_id == "tool-2"
+    assert second.test_results == first.test_results
+    assert list(second.phase_timings) == ["cache_lookup"]
+    validator.test_runner.run_tests.assert_awaited_once()
+
+    stricter = CodeAnalyzer(AnalyzerRules(forbidden_calls=frozenset({"sum"})))
+    revalidated = make_validator(cache, stricter)
+    await revalidated.validate_tool(make_tool("tool-3"))
+    revalidated.test_runner.run_tests.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_analyzer_without_version_is_not_cached():
+    cache = ValidationCache()
+    analyzer = AsyncMock()
+    analyzer.analyze.return_value = {"score": 0.95, "issues": []}
+    validator = make_validator(cache, analyzer)
+
+    await validator.validate_tool(make_tool())
+    await validator.validate_tool(make_tool())
+
+    assert validator.test_runner.run_tests.await_count == 2
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "test_results",
+    [
+        {
+            "passed": False,
+            "performance_score": 0.9,
+            "failed_tests": [{"name": "test_somar", "error": "Tempo limite"}],
+        },
+        {"passed": True, "performance_score": 0.2},
+    ],
+    ids=["tests_failed", "over_budget"],
+)
+async def test_runtime_failures_are_always_revalidated(test_results):
+    cache = ValidationCache()
+    validator = make_validator(cache, test_results=test_results)
+
+    first = await validator.validate_tool(make_tool())
+    second = await validator.validate_tool(make_tool())
+
+    assert first.result == second.result != ValidationResult.PASSED
+    assert validator.test_runner.run_tests.await_count == 2
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_security_failures_are_cached():
+    cache = ValidationCache()
+    analyzer = AsyncMock()
+    analyzer.version = "1"
+    analyzer.analyze.return_value = {"score": 0.1, "issues": []}
+    validator = make_validator(cache, analyzer)
+
+    await validator.validate_tool(make_tool())
+    report = await validator.validate_tool(make_tool())
+
+    assert report.result == ValidationResult.FAILED_SECURITY
+    assert list(report.phase_timings) == ["cache_lookup"]
+    analyzer.analyze.assert_awaited_once()
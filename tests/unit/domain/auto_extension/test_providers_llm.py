@@ -73,3 +73,31 @@ async def test_hybrid_code_provider_template_mode():
     spec = make_spec()
     code = await hybrid.generate(spec)
     assert "def foo" in code
+
+
+@pytest.mark.asyncio
+async def test_hybrid_code_provider_skips_llm_when_circuit_open():
+    from src.infrastructure.circuit_breaker import (
+        CircuitBreaker,
+        CircuitBreakerConfig,
+    )
+
+    breaker = CircuitBreaker(
+        ("https://fake-llm.com", "fake-model"),
+        CircuitBreakerConfig(minimum_calls=1, window_size=1),
+    )
+    breaker.record_failure()
+
+    class CountingLLM:
+        circuit_breaker = breaker
+        calls = 0
+
+        async def generate(self, spec, prompt=None):
+            CountingLLM.calls += 1
+            return "# Código LLM"
+
+    template_provider = TemplateCodeProvider(DummyTemplateManager())
+    hybrid = HybridCodeProvider(CountingLLM(), template_provider, mode="hybrid")
+    code = await hybrid.generate(make_spec())
+    assert "def foo" in code
+    assert CountingLLM.calls == 0
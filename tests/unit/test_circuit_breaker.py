@@ -0,0 +1,181 @@
+"""
+Testes unitários para o circuit breaker dos provedores LLM.
+"""
+import asyncio
+
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from src.infrastructure.circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerConfig,
+    CircuitOpenError,
+    CircuitState,
+    get_circuit_breaker,
+    reset_circuit_breakers,
+)
+from src.infrastructure.llm_client import LLMClient
+from src.infrastructure.llm_retry import RetryBudget
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(clock=None, **overrides):
+    config = CircuitBreakerConfig(
+        window_size=4,
+        minimum_calls=4,
+        failure_rate_threshold=0.5,
+        slow_call_duration=1.0,
+        slow_call_rate_threshold=0.75,
+        open_timeout=10.0,
+        half_open_max_calls=1,
+    )
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    return CircuitBreaker(("https://fake-llm.com", "m"), config, clock or FakeClock())
+
+
+def test_opens_on_failure_rate():
+    breaker = make_breaker()
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state == CircuitState.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.allow_request() is False
+
+
+def test_opens_on_slow_call_rate():
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record_success(2.0)
+    breaker.record_success(0.1)
+    assert breaker.is_open
+
+
+def test_half_open_probe_closes_or_reopens():
+    clock = FakeClock()
+    breaker = make_breaker(clock, minimum_calls=1)
+    breaker.record_failure()
+    assert breaker.is_open
+
+    clock.now = 10.0
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is False  # apenas uma prova por vez
+    breaker.record_failure()
+    assert breaker.is_open
+
+    clock.now = 20.0
+    assert breaker.allow_request() is True
+    breaker.record_success(0.1)
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_unresolved_probe_reopens_after_slow_call_duration():
+    clock = FakeClock()
+    breaker = make_breaker(clock, minimum_calls=1)
+    breaker.record_failure()
+    clock.now = 10.0
+    assert breaker.allow_request() is True
+
+    clock.now = 10.5
+    assert breaker.state == CircuitState.HALF_OPEN
+    clock.now = 11.0
+    assert breaker.state == CircuitState.OPEN
+    clock.now = 21.0
+    assert breaker.allow_request() is True
+
+
+def test_state_gauge_and_registry():
+    reset_circuit_breakers()
+    breaker = get_circuit_breaker("https://gauge-llm.com/", "m1")
+    assert get_circuit_breaker("https://gauge-llm.com", "m1") is breaker
+    breaker.config.minimum_calls = 1
+    breaker.record_failure()
+    labels = {"base_url": "https://gauge-llm.com", "model": "m1"}
+    assert REGISTRY.get_sample_value("llm_circuit_breaker_state", labels) == 2
+    reset_circuit_breakers()
+
+
+@pytest.mark.asyncio
+async def test_llm_client_rejects_without_calling_provider_when_open():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"choices": [{"text": "ok"}]})
+
+    breaker = make_breaker(minimum_calls=1)
+    breaker.record_failure()
+    client = LLMClient(
+        base_url="https://fake-llm.com",
+        api_key="fake",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        retry_budget=RetryBudget(),
+        circuit_breaker=breaker,
+    )
+    with pytest.raises(CircuitOpenError):
+        await client.generate_code("gere f")
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_llm_client_records_provider_failures():
+    breaker = make_breaker(minimum_calls=2, window_size=2)
+    client = LLMClient(
+        base_url="https://fake-llm.com",
+        api_key="fake",
+        max_retries=1,
+        http_client=httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: httpx.Response(503))
+        ),
+        retry_budget=RetryBudget(),
+        circuit_breaker=breaker,
+    )
+    for _ in range(2):
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.generate_code("gere f")
+    assert breaker.is_open
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_releases_half_open_slot():
+    clock = FakeClock()
+    breaker = make_breaker(clock, minimum_calls=1)
+    breaker.record_failure()
+    clock.now = 10.0
+    sent = asyncio.Event()
+    release = asyncio.Event()
+
+    async def handler(request):
+        sent.set()
+        await release.wait()
+        return httpx.Response(200, json={"choices": [{"text": "ok"}]})
+
+    client = LLMClient(
+        base_url="https://fake-llm.com",
+        api_key="fake",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        retry_budget=RetryBudget(),
+        circuit_breaker=breaker,
+    )
+    probe = asyncio.create_task(client.generate_code("gere f"))
+    await sent.wait()
+    assert breaker.allow_request() is False
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+
+    assert breaker.state == CircuitState.HALF_OPEN
+    release.set()
+    assert await client.generate_code("gere g") == "ok"
+    assert breaker.state == CircuitState.CLOSED
@@ -0,0 +1,48 @@
+"""
+Testes unitários para o scanner de código em passada única.
+"""
+import pytest
+
+from src.application.code_scanner import CodeScanner, default_scanner
+from src.application.llm_code_orchestrator import CodeGenRequest, LLMCodeOrchestrator
+
+
+class StaticClient:
+    def __init__(self, output):
+        self.output = output
+
+    async def generate_code(self, **kwargs):
+        return self.output
+
+
+def test_first_match_returns_pattern_and_offsets():
+    code = "x = 1\nresult = OPEN(path).read() + eval('1')\n"
+    match = default_scanner.first_match(code)
+    assert match.pattern == "open("
+    assert code[match.start : match.end].lower() == "open("
+
+
+def test_function_signature_does_not_hide_dangerous_name():
+    assert default_scanner.first_match("def open(x):\n    return x\n").pattern == (
+        "open("
+    )
+
+
+def test_safe_code_has_no_match():
+    assert default_scanner.first_match("def f(x):\n    return x * 2\n") is None
+    assert CodeScanner([]).first_match("import os") is None
+
+
+def test_first_match_from_offset():
+    code = "x = 1\nexec('y')\nimport sys\n"
+    assert default_scanner.first_match(code).pattern == "exec("
+    match = default_scanner.first_match(code, 12)
+    assert (match.pattern, match.start) == ("import sys", 16)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("call", ["exec('x')", "eval('1')", "open('f')"])
+async def test_orchestrator_rejects_literal_call_patterns(call):
+    orchestrator = LLMCodeOrchestrator(StaticClient(f"def f():\n    return {call}\n"))
+    with pytest.raises(ValueError, match="inseguros"):
+        await orchestrator.generate_code(CodeGenRequest(prompt="crie uma função f"))
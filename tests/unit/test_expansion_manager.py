@@ -4,6 +4,7 @@ import tempfile
 import pytest
 
 from src.application.expansion_manager import expand_and_register_tool
+from src.domain.auto_extension.bytecode_cache import get_bytecode_cache
 from src.utils import tool_registry
 
 
@@ -47,3 +48,15 @@ def test_expand_and_register_tool_syntax_error():
     with tempfile.TemporaryDirectory() as tmpdir:
         with pytest.raises(SyntaxError):
             expand_and_register_tool(code, tool_name, tmpdir)
+
+
+def test_expand_and_register_tool_writes_bytecode_cache():
+    code = "def triple(x):\n    return x * 3\n"
+    tool_name = "tool_test_bytecode"
+    cache = get_bytecode_cache()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        module = expand_and_register_tool(code, tool_name, tmpdir)
+        assert module.triple(2) == 6
+        path = cache.path_for(cache.hash_code(code), tmpdir)
+        assert os.path.exists(path)
+        assert os.path.dirname(path) == os.path.join(tmpdir, "__pycache__")
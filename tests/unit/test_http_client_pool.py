@@ -0,0 +1,89 @@
+"""
+Testes unitários para o pool HTTP compartilhado dos clientes LLM.
+"""
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from src.infrastructure.http_client_pool import HTTPPoolConfig, SharedHTTPClient
+from src.infrastructure.llm_client import LLMClient
+from src.infrastructure.llm_client_myai import MyAILLMClient
+from src.presentation.api.app import create_app
+
+
+def make_transport(payload, calls):
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json=payload)
+
+    return httpx.MockTransport(handler)
+
+
+def test_pool_config_from_env(monkeypatch):
+    monkeypatch.setenv("LLM_HTTP_MAX_CONNECTIONS", "7")
+    monkeypatch.setenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "3")
+    monkeypatch.setenv("LLM_HTTP2", "true")
+    config = HTTPPoolConfig.from_env()
+    assert config.max_connections == 7
+    assert config.max_keepalive_connections == 3
+    assert config.http2 is True
+
+
+@pytest.mark.asyncio
+async def test_shared_client_reused_until_closed():
+    shared = SharedHTTPClient(HTTPPoolConfig(max_connections=5))
+    first = shared.start()
+    assert shared.client is first
+    assert shared.is_started
+    await shared.aclose()
+    assert not shared.is_started
+    assert first.is_closed
+
+
+@pytest.mark.asyncio
+async def test_llm_client_uses_injected_http_client():
+    calls = []
+    http_client = httpx.AsyncClient(
+        transport=make_transport({"choices": [{"text": "def f(): pass"}]}, calls)
+    )
+    client = LLMClient(
+        base_url="https://fake-llm.com", api_key="fake", http_client=http_client
+    )
+    assert await client.generate_code("gere f") == "def f(): pass"
+    assert await client.generate_code("gere f de novo") == "def f(): pass"
+    assert len(calls) == 2
+    assert str(calls[0].url) == "https://fake-llm.com/v1/completions"
+    await http_client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_myai_client_uses_injected_http_client():
+    calls = []
+    http_client = httpx.AsyncClient(
+        transport=make_transport({"message": {"content": "def g(): pass"}}, calls)
+    )
+    client = MyAILLMClient(
+        base_url="https://fake-myai.com", api_key="fake", http_client=http_client
+    )
+    assert await client.generate_code("gere g") == "def g(): pass"
+    assert len(calls) == 1
+    await http_client.aclose()
+
+
+def test_pool_metrics_exported_as_gauges():
+    shared = SharedHTTPClient(HTTPPoolConfig(max_connections=12))
+    shared.start()
+    assert REGISTRY.get_sample_value("llm_http_pool_max_connections") == 12
+    assert (
+        REGISTRY.get_sample_value("llm_http_pool_connections", {"state": "active"}) == 0
+    )
+    assert shared.pool_stats() == {"active": 0, "idle": 0, "pending": 0}
+
+
+def test_app_lifespan_exports_pool_gauges(monkeypatch):
+    monkeypatch.setenv("LLM_HTTP_MAX_CONNECTIONS", "33")
+    with TestClient(create_app(testing=True)) as client:
+        assert client.app.state.http_client.is_started
+        assert REGISTRY.get_sample_value("llm_http_pool_max_connections") == 33
+        assert REGISTRY.get_sample_value("llm_http_pool_pending_requests") == 0
@@ -0,0 +1,151 @@
+"""
+Testes unitários para o pool de backends LLM com balanceamento por latência.
+"""
+import json
+
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from src.infrastructure.llm_backend_pool import BackendPoolConfig, LLMBackendPool
+from src.infrastructure.llm_client_myai import MyAILLMClient
+from src.infrastructure.llm_quota import QuotaExceededError, QuotaStatus
+from src.infrastructure.llm_retry import RetryPolicy
+from src.presentation.api.llm_client_registry import LLMClientRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeBackend:
+    """Cliente LLM simulado com falhas e probes controláveis."""
+
+    def __init__(self, name, error=None, healthy=True):
+        self.base_url = f"https://{name}.local"
+        self.model = "gpt-4"
+        self.family = "openai"
+        self.retry_policy = RetryPolicy()
+        self.error = error
+        self.healthy = healthy
+        self.calls = 0
+
+    async def generate_code(self, **kwargs):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return f"def f():\n    return '{self.base_url}'"
+
+    async def probe(self, timeout=2.0):
+        return self.healthy
+
+
+def make_pool(*backends, clock=None, **config):
+    return LLMBackendPool(
+        backends,
+        BackendPoolConfig(min_samples=3, **config),
+        clock=clock or FakeClock(),
+    )
+
+
+def test_power_of_two_prefers_lower_score():
+    fast, slow = FakeBackend("fast"), FakeBackend("slow")
+    pool = make_pool(fast, slow)
+    pool.backends[0].observe(0.1, ok=True)
+    pool.backends[1].observe(2.0, ok=True)
+    for _ in range(10):
+        backend = pool.select()
+        pool.release(backend)
+        assert backend.client is fast
+    score = REGISTRY.get_sample_value(
+        "llm_backend_score", {"backend": "https://slow.local|gpt-4"}
+    )
+    assert score is not None
+
+
+def test_in_flight_requests_raise_score():
+    pool = make_pool(FakeBackend("a"), FakeBackend("b"))
+    first = pool.select()
+    second = pool.select()
+    assert first is not second
+
+
+@pytest.mark.asyncio
+async def test_failing_backend_is_ejected_and_skipped(monkeypatch):
+    broken = FakeBackend("broken", error=httpx.ConnectError("recusado"))
+    pool = make_pool(broken, FakeBackend("ok"), FakeBackend("ok2"))
+    select = pool.select
+    monkeypatch.setattr(pool, "select", lambda: pool.backends[0])
+    for _ in range(3):
+        with pytest.raises(httpx.ConnectError):
+            await pool.generate_code(prompt="gere f")
+    assert broken.calls == 3
+    assert pool.backends[0].is_ejected(pool._clock())
+
+    monkeypatch.setattr(pool, "select", select)
+    for _ in range(10):
+        assert await pool.generate_code(prompt="gere f") != ""
+    assert broken.calls == 3
+
+
+def test_never_ejects_more_than_allowed_fraction():
+    pool = make_pool(FakeBackend("a"), FakeBackend("b"), max_ejected_fraction=0.5)
+    for backend in pool.backends:
+        for _ in range(3):
+            pool.record(backend, 1.0, ok=False)
+    now = pool._clock()
+    assert sum(b.is_ejected(now) for b in pool.backends) == 1
+
+
+@pytest.mark.asyncio
+async def test_quota_errors_do_not_count_against_backend():
+    error = QuotaExceededError(QuotaStatus(allowed=False))
+    pool = make_pool(FakeBackend("a", error=error))
+    with pytest.raises(QuotaExceededError):
+        await pool.generate_code(prompt="gere f")
+    assert pool.backends[0].samples == 0
+
+
+@pytest.mark.asyncio
+async def test_probes_eject_idle_backend_and_readmit_after_recovery():
+    clock = FakeClock()
+    flaky = FakeBackend("flaky", healthy=False)
+    pool = make_pool(
+        flaky, FakeBackend("b"), FakeBackend("c"), clock=clock, probe_interval=10.0
+    )
+    for _ in range(3):
+        await pool.probe_all()
+    assert pool.backends[0].is_ejected(clock.now)
+
+    flaky.healthy = True
+    clock.now += pool.config.ejection_time - pool.config.probe_interval
+    await pool.probe_all()
+    assert not pool.backends[0].is_ejected(clock.now)
+
+
+def test_registry_builds_pool_from_env(monkeypatch):
+    monkeypatch.setenv(
+        "LLM_BACKENDS",
+        json.dumps(
+            [
+                {"provider": "myai", "base_url": "https://gw1.local/chat"},
+                {"provider": "openai", "base_url": "https://api.local", "model": "x"},
+            ]
+        ),
+    )
+    monkeypatch.delenv("LLM_PROVIDER", raising=False)
+    registry = LLMClientRegistry()
+    entry = registry.get()
+    pool = entry.client
+    assert isinstance(pool, LLMBackendPool)
+    assert isinstance(pool.backends[0].client, MyAILLMClient)
+    assert [b.client.base_url for b in pool.backends] == [
+        "https://gw1.local/chat",
+        "https://api.local",
+    ]
+    assert entry.orchestrator.llm_client is pool
+    registry.clear()
@@ -0,0 +1,177 @@
+"""
+Testes unitários para a geração de código em lote.
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.application.llm_code_orchestrator import CodeGenRequest, LLMCodeOrchestrator
+from src.infrastructure.llm_client import LLMClient
+from src.infrastructure.llm_quota import (
+    QuotaConfig,
+    QuotaLimit,
+    QuotaManager,
+    QuotaSubject,
+    quota_scope,
+)
+from src.presentation.api import llm_codegen
+
+
+class GatedLLM:
+    """Cliente simulado em que cada prompt só termina quando liberado."""
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.started = []
+        self.cancelled = []
+        self._gates = {}
+        self._started_event = asyncio.Event()
+
+    def release(self, prompt):
+        self._gates.setdefault(prompt, asyncio.Event()).set()
+
+    async def wait_started(self, count):
+        while len(self.started) < count:
+            self._started_event.clear()
+            await self._started_event.wait()
+
+    async def generate_code(self, prompt, **kwargs):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        self.started.append(prompt)
+        self._started_event.set()
+        try:
+            await self._gates.setdefault(prompt, asyncio.Event()).wait()
+            if "falha" in prompt:
+                raise RuntimeError("erro do provedor")
+            return f"def gerada():\n    return {prompt!r}"
+        except asyncio.CancelledError:
+            self.cancelled.append(prompt)
+            raise
+        finally:
+            self.active -= 1
+
+
+PROMPTS = [
+    "função número 0",
+    "função que falha",
+    "função número 2",
+    "função número 3",
+]
+
+
+@pytest.mark.asyncio
+async def test_generate_many_bounds_concurrency_and_isolates_errors():
+    llm = GatedLLM()
+    results = LLMCodeOrchestrator(llm).generate_many(
+        [CodeGenRequest(prompt=p) for p in PROMPTS], concurrency=2
+    )
+    first = asyncio.ensure_future(results.__anext__())
+
+    await llm.wait_started(2)
+    assert llm.started == PROMPTS[:2]
+    llm.release(PROMPTS[1])
+    assert (await first).error == "erro do provedor"
+
+    await llm.wait_started(3)
+    llm.release(PROMPTS[2])
+    result = await results.__anext__()
+    assert (result.index, result.error) == (2, None)
+
+    await llm.wait_started(4)
+    llm.release(PROMPTS[3])
+    assert (await results.__anext__()).index == 3
+    llm.release(PROMPTS[0])
+    assert (await results.__anext__()).index == 0
+    with pytest.raises(StopAsyncIteration):
+        await results.__anext__()
+    assert llm.max_active == 2
+
+
+@pytest.mark.asyncio
+async def test_closing_generate_many_cancels_and_awaits_pending_items():
+    llm = GatedLLM()
+    results = LLMCodeOrchestrator(llm).generate_many(
+        [CodeGenRequest(prompt=p) for p in PROMPTS[:3]], concurrency=2
+    )
+    first = asyncio.ensure_future(results.__anext__())
+    await llm.wait_started(2)
+    llm.release(PROMPTS[1])
+    await first
+
+    await results.aclose()
+
+    # Os pendentes já terminaram o cancelamento quando aclose retorna
+    assert sorted(llm.cancelled) == sorted([PROMPTS[0], PROMPTS[2]])
+    assert llm.active == 0
+
+
+def test_batch_endpoint_streams_results_and_charges_quota_once(monkeypatch):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={"choices": [{"text": "def f():\n    pass"}]})
+
+    manager = QuotaManager(
+        QuotaConfig(
+            user_requests=QuotaLimit.per_minute(1),
+            user_tokens=QuotaLimit.per_minute(10000),
+        )
+    )
+    llm_client = LLMClient(
+        base_url="https://fake-llm.com",
+        api_key="fake",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        quota_manager=manager,
+    )
+    orchestrator = LLMCodeOrchestrator(llm_client)
+    monkeypatch.setattr(llm_codegen, "get_orchestrator", lambda *_: orchestrator)
+    monkeypatch.setattr(llm_codegen.limiter, "enabled", False)
+    app = FastAPI()
+    app.include_router(llm_codegen.router)
+    client = TestClient(app)
+
+    items = [
+        {"prompt": f"crie a função número {i}", "max_tokens": 100} for i in range(3)
+    ]
+    response = client.post(
+        "/llm-codegen/generate/batch",
+        json={"items": items, "concurrency": 2},
+        headers={"Authorization": "Bearer token"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["index"] for line in lines) == [0, 1, 2]
+    assert all("code" in line for line in lines)
+    assert len(calls) == 3
+    # Um único consumo de requisição, com os tokens de todos os itens
+    remaining = int(response.headers["X-Quota-Remaining-Tokens"])
+    assert 10000 - remaining >= 300
+    assert response.headers["X-Quota-Remaining-Requests"] == "0"
+
+
+@pytest.mark.asyncio
+async def test_batch_prepaid_scope_skips_per_item_quota():
+    manager = QuotaManager(QuotaConfig(user_requests=QuotaLimit.per_minute(1)))
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"choices": [{"text": "ok"}]})
+
+    llm_client = LLMClient(
+        base_url="https://fake-llm.com",
+        api_key="fake",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        quota_manager=manager,
+    )
+    subject = QuotaSubject(user="ana")
+    status = await manager.consume(subject)
+    with quota_scope(subject, prepaid=status):
+        await llm_client.generate_code("item 1")
+        await llm_client.generate_code("item 2")
@@ -1,4 +1,4 @@
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -12,6 +12,7 @@ async def test_myai_generate_code_success():
         "message": {"content": "```python\ndef foo():\n    return 42\n```"}
     }
     with patch("httpx.AsyncClient.post", new_callable=AsyncMock) as mock_post:
+        mock_post.return_value = MagicMock()
         mock_post.return_value.json = lambda: fake_response
         mock_post.return_value.raise_for_status.return_value = None
         code = await client.generate_code("def foo(): return 42")
@@ -24,6 +25,7 @@ async def test_myai_generate_code_no_markdown():
     client = MyAILLMClient(base_url="https://fake-myai.com", api_key="fake-key")
     fake_response = {"message": {"content": "def bar():\n    return 1"}}
     with patch("httpx.AsyncClient.post", new_callable=AsyncMock) as mock_post:
+        mock_post.return_value = MagicMock()
         mock_post.return_value.json = lambda: fake_response
         mock_post.return_value.raise_for_status.return_value = None
         code = await client.generate_code("def bar(): return 1")
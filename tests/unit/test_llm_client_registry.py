@@ -0,0 +1,71 @@
+"""
+Testes unitários para o registro de clientes LLM da aplicação.
+"""
+from src.infrastructure.http_client_pool import SharedHTTPClient, set_shared_http_client
+from src.infrastructure.llm_client_myai import MyAILLMClient
+from src.presentation.api.llm_client_registry import LLMClientRegistry
+
+
+def test_client_and_orchestrator_are_reused(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "openai")
+    monkeypatch.setenv("LLM_MODEL", "gpt-4")
+    registry = LLMClientRegistry()
+    first = registry.get()
+    second = registry.get("openai")
+    assert first is second
+    assert first.orchestrator.llm_client is first.client
+    assert len(registry) == 1
+
+
+def test_providers_get_their_own_clients(monkeypatch):
+    monkeypatch.delenv("LLM_API_URL", raising=False)
+    monkeypatch.delenv("LLM_MODEL", raising=False)
+    registry = LLMClientRegistry()
+    myai = registry.get("myai")
+    openai = registry.get("openai")
+    assert isinstance(myai.client, MyAILLMClient)
+    assert myai.client is not openai.client
+    assert myai.settings.model == "o4-mini"
+
+
+def test_unknown_providers_share_the_default_client(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "openai")
+    monkeypatch.delenv("LLM_BACKENDS", raising=False)
+    registry = LLMClientRegistry()
+    default = registry.get()
+    for provider in ("foo", "bar-1", "POOL", "x" * 500):
+        assert registry.get(provider) is default
+    assert len(registry) == 1
+    assert len(registry._settings) == 1
+
+
+def test_reload_rebuilds_only_on_config_change(monkeypatch):
+    monkeypatch.setenv("LLM_MODEL", "gpt-4")
+    monkeypatch.setenv("LLM_API_KEY", "chave-1")
+    registry = LLMClientRegistry()
+    entry = registry.get("openai")
+
+    registry.reload()
+    assert registry.get("openai") is entry
+
+    monkeypatch.setenv("LLM_API_KEY", "chave-2")
+    # Sem reload o ambiente não é relido no caminho da requisição
+    assert registry.get("openai") is entry
+    registry.reload()
+    rebuilt = registry.get("openai")
+    assert rebuilt is not entry
+    assert rebuilt.client.api_key == "chave-2"
+
+
+def test_rebuilds_when_shared_http_client_changes():
+    registry = LLMClientRegistry()
+    entry = registry.get("openai")
+    shared = SharedHTTPClient()
+    shared.start()
+    set_shared_http_client(shared)
+    try:
+        rebuilt = registry.get("openai")
+        assert rebuilt is not entry
+        assert rebuilt.client.http_client is shared.client
+    finally:
+        set_shared_http_client(None)
@@ -0,0 +1,159 @@
+"""
+Testes unitários para requisições hedged entre endpoints LLM.
+"""
+import asyncio
+
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from src.infrastructure.llm_client import LLMClient
+from src.infrastructure.llm_hedging import HedgePolicy, LatencyTracker, run_hedged
+from src.infrastructure.llm_retry import RetryBudget
+
+
+def hedge_events(event):
+    return REGISTRY.get_sample_value("llm_hedge_events_total", {"event": event}) or 0.0
+
+
+def test_delay_uses_quantile_after_min_samples():
+    policy = HedgePolicy(initial_delay=2.0, min_samples=5, min_delay=0.01)
+    tracker = LatencyTracker()
+    assert policy.delay(tracker) == 2.0
+    for latency in (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0):
+        tracker.record(latency)
+    assert policy.delay(tracker) == 1.0
+    assert HedgePolicy(max_delay=0.5, min_samples=1).delay(tracker) == 0.5
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_cancelled():
+    cancelled = asyncio.Event()
+
+    async def primary():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def hedge():
+        return "hedge"
+
+    wins_before = hedge_events("hedge_win")
+    result, index, _ = await run_hedged([primary, hedge], delay=0.01)
+    assert (result, index) == ("hedge", 1)
+    # O perdedor já foi cancelado e aguardado quando run_hedged retorna
+    assert cancelled.is_set()
+    assert hedge_events("hedge_win") == wins_before + 1
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_does_not_hedge():
+    launched = []
+
+    async def primary():
+        return "primary"
+
+    async def hedge():
+        launched.append(True)
+        return "hedge"
+
+    hedges_before = hedge_events("hedge")
+    result, index, _ = await run_hedged([primary, hedge], delay=1.0)
+    assert (result, index) == ("primary", 0)
+    assert not launched
+    assert hedge_events("hedge") == hedges_before
+
+
+@pytest.mark.asyncio
+async def test_primary_failure_triggers_hedge_immediately():
+    async def primary():
+        raise httpx.ConnectError("recusado")
+
+    async def hedge():
+        return "hedge"
+
+    result, index, _ = await asyncio.wait_for(
+        run_hedged([primary, hedge], delay=10.0), timeout=1
+    )
+    assert (result, index) == ("hedge", 1)
+
+
+@pytest.mark.asyncio
+async def test_non_hedgeable_failure_is_raised_without_hedge():
+    launched = []
+
+    async def primary():
+        raise ValueError("requisição inválida")
+
+    async def hedge():
+        launched.append(True)
+        return "hedge"
+
+    with pytest.raises(ValueError):
+        await run_hedged(
+            [primary, hedge],
+            delay=10.0,
+            hedge_on=lambda exc: isinstance(exc, httpx.TransportError),
+        )
+    assert not launched
+
+
+@pytest.mark.asyncio
+async def test_all_attempts_failing_raises_last_error():
+    async def failing():
+        raise httpx.ConnectError("recusado")
+
+    with pytest.raises(httpx.ConnectError):
+        await run_hedged([failing, failing], delay=0.01)
+
+
+@pytest.mark.asyncio
+async def test_llm_client_hedges_to_second_endpoint():
+    hosts = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        hosts.append(request.url.host)
+        if request.url.host == "gw1.local":
+            await asyncio.sleep(5)
+        return httpx.Response(200, json={"choices": [{"text": request.url.host}]})
+
+    client = LLMClient(
+        base_url="https://gw1.local",
+        api_key="fake",
+        endpoints=["https://gw1.local", "https://gw2.local/"],
+        hedge_policy=HedgePolicy(initial_delay=0.01, min_delay=0.01),
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        retry_budget=RetryBudget(ratio=0.5, min_tokens=0.0),
+    )
+    assert client.endpoints == ["https://gw1.local", "https://gw2.local"]
+    code = await asyncio.wait_for(client.generate_code("gere f"), timeout=2)
+    assert code == "gw2.local"
+    assert hosts == ["gw1.local", "gw2.local"]
+    assert len(client.latency) == 1
+    # O hedge não conta como uma segunda requisição original
+    assert client.retry_budget.available == pytest.approx(0.5)
+
+
+@pytest.mark.asyncio
+async def test_llm_client_does_not_hedge_client_errors():
+    hosts = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        hosts.append(request.url.host)
+        return httpx.Response(400, json={"error": "prompt inválido"})
+
+    budget = RetryBudget(ratio=0.5, min_tokens=0.0)
+    client = LLMClient(
+        base_url="https://gw1.local",
+        api_key="fake",
+        endpoints=["https://gw1.local", "https://gw2.local"],
+        hedge_policy=HedgePolicy(initial_delay=1.0),
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        retry_budget=budget,
+    )
+    with pytest.raises(httpx.HTTPStatusError):
+        await client.generate_code("gere f")
+    assert hosts == ["gw1.local"]
+    assert budget.available == pytest.approx(0.5)
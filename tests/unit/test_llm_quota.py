@@ -0,0 +1,201 @@
+"""
+Testes unitários para as cotas de uso dos provedores LLM.
+"""
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.application.llm_code_orchestrator import LLMCodeOrchestrator
+from src.infrastructure.llm_client import LLMClient
+from src.infrastructure.llm_client_myai import MyAILLMClient
+from src.infrastructure.llm_quota import (
+    QuotaConfig,
+    QuotaExceededError,
+    QuotaLimit,
+    QuotaManager,
+    QuotaSubject,
+    SQLiteQuotaBackend,
+    estimate_tokens,
+)
+from src.presentation.api import llm_codegen
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("a" * 40, 100) == 110
+
+
+@pytest.mark.asyncio
+async def test_bucket_refills_over_time():
+    clock = FakeClock()
+    manager = QuotaManager(
+        QuotaConfig(user_requests=QuotaLimit(capacity=2, refill_per_second=1.0)),
+        clock=clock,
+    )
+    subject = QuotaSubject(user="ana")
+    assert (await manager.consume(subject)).allowed
+    assert (await manager.consume(subject)).allowed
+    rejected = await manager.consume(subject)
+    assert not rejected.allowed
+    assert rejected.exceeded_scope == "user"
+    assert rejected.retry_after == pytest.approx(1.0)
+    clock.now += 1.0
+    assert (await manager.consume(subject)).allowed
+
+
+@pytest.mark.asyncio
+async def test_fixed_requests_refills_over_the_window():
+    clock = FakeClock()
+    manager = QuotaManager(QuotaConfig.fixed_requests(2, window=60), clock=clock)
+    subject = QuotaSubject(model="o4-mini")
+    assert (await manager.consume(subject)).allowed
+    assert (await manager.consume(subject)).allowed
+    assert not (await manager.consume(subject)).allowed
+    clock.now += 30
+    assert (await manager.consume(subject)).allowed
+
+
+def test_llm_client_default_quota_refills():
+    client = LLMClient(base_url="https://fake-llm.com", api_key="fake")
+    limit = client.quota_manager.config.model_requests
+    assert limit == QuotaLimit(capacity=1000, refill_per_second=1000 / 60)
+    fixed = LLMClient(
+        base_url="https://fake-llm.com", api_key="fake", quota_window=None
+    )
+    assert fixed.quota_manager.config.model_requests.refill_per_second == 0.0
+
+
+@pytest.mark.asyncio
+async def test_consumption_is_all_or_nothing():
+    manager = QuotaManager(
+        QuotaConfig(
+            user_requests=QuotaLimit.per_minute(10),
+            tenant_tokens=QuotaLimit.per_minute(100),
+        )
+    )
+    subject = QuotaSubject(user="ana", tenant="acme")
+    status = await manager.consume(subject, tokens=500)
+    assert not status.allowed
+    assert (status.exceeded_scope, status.exceeded_unit) == ("tenant", "tokens")
+    # A rejeição pelo tenant não debita o bucket do usuário
+    assert (await manager.peek(subject)).remaining["requests"] == 10
+
+
+@pytest.mark.asyncio
+async def test_sqlite_backend_is_shared_between_managers(tmp_path):
+    path = str(tmp_path / "quota.db")
+    config = QuotaConfig(model_requests=QuotaLimit(capacity=2, refill_per_second=0))
+    worker_a = QuotaManager(config, SQLiteQuotaBackend(path))
+    worker_b = QuotaManager(config, SQLiteQuotaBackend(path))
+    subject = QuotaSubject(model="gpt-4")
+    assert (await worker_a.consume(subject)).allowed
+    assert (await worker_b.consume(subject)).allowed
+    assert not (await worker_a.consume(subject)).allowed
+    worker_a.backend.close()
+    worker_b.backend.close()
+
+
+@pytest.mark.asyncio
+async def test_status_headers_report_lowest_remaining():
+    manager = QuotaManager(
+        QuotaConfig(
+            user_tokens=QuotaLimit.per_minute(1000),
+            model_tokens=QuotaLimit.per_minute(5000),
+        )
+    )
+    status = await manager.consume(QuotaSubject(), tokens=300)
+    assert status.headers() == {
+        "X-Quota-Limit-Tokens": "1000",
+        "X-Quota-Remaining-Tokens": "700",
+    }
+
+
+@pytest.mark.asyncio
+async def test_llm_client_rejects_without_calling_provider():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={"choices": [{"text": "def f(): pass"}]})
+
+    manager = QuotaManager(QuotaConfig(user_requests=QuotaLimit.per_minute(1)))
+    client = LLMClient(
+        base_url="https://fake-llm.com",
+        api_key="fake",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        quota_manager=manager,
+        quota_subject=QuotaSubject(user="ana"),
+    )
+    await client.generate_code("gere f")
+    with pytest.raises(QuotaExceededError):
+        await client.generate_code("gere g")
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_myai_client_enforces_quota():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(200, json={"message": {"content": "def f(): pass"}})
+
+    client = MyAILLMClient(
+        base_url="https://fake-myai.com",
+        api_key="fake",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        quota_manager=QuotaManager(QuotaConfig.fixed_requests(1)),
+        quota_subject=QuotaSubject(model="o4-mini"),
+    )
+    assert await client.generate_code("gere f") == "def f(): pass"
+    for prompt in ("gere g", "gere h"):
+        with pytest.raises(QuotaExceededError):
+            await client.generate_code(prompt)
+    assert len(calls) == 1
+
+
+def test_endpoint_exposes_remaining_quota_and_429(monkeypatch):
+    manager = QuotaManager(QuotaConfig(user_requests=QuotaLimit.per_minute(1)))
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"choices": [{"text": "def f():\n    pass"}]})
+
+    llm_client = LLMClient(
+        base_url="https://fake-llm.com",
+        api_key="fake",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        quota_manager=manager,
+    )
+    orchestrator = LLMCodeOrchestrator(llm_client)
+    monkeypatch.setattr(llm_codegen, "get_orchestrator", lambda *_: orchestrator)
+    monkeypatch.setattr(llm_codegen.limiter, "enabled", False)
+    app = FastAPI()
+    app.include_router(llm_codegen.router)
+    client = TestClient(app)
+    body = {"prompt": "crie uma função f qualquer"}
+    headers = {"Authorization": "Bearer token-ana"}
+
+    ok = client.post("/llm-codegen/generate", json=body, headers=headers)
+    assert ok.status_code == 200
+    assert ok.headers["X-Quota-Limit-Requests"] == "1"
+    assert ok.headers["X-Quota-Remaining-Requests"] == "0"
+
+    rejected = client.post("/llm-codegen/generate", json=body, headers=headers)
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
+
+    # Outro token (outro usuário) tem bucket próprio
+    other = client.post(
+        "/llm-codegen/generate",
+        json=body,
+        headers={"Authorization": "Bearer token-bia"},
+    )
+    assert other.status_code == 200
@@ -0,0 +1,108 @@
+"""
+Testes unitários para o cache de respostas do LLM.
+"""
+import pytest
+from prometheus_client import REGISTRY
+
+from src.application.llm_code_orchestrator import CodeGenRequest, LLMCodeOrchestrator
+from src.application.llm_response_cache import LLMResponseCache, make_cache_key
+
+
+class CountingLLMClient:
+    model = "gpt-4"
+    family = "openai"
+
+    def __init__(self, output="def hello():\n    return 'ola'"):
+        self.output = output
+        self.calls = 0
+
+    async def generate_code(self, *args, **kwargs):
+        self.calls += 1
+        return self.output
+
+
+def cache_events(tier, event):
+    labels = {"tier": tier, "event": event}
+    return REGISTRY.get_sample_value("llm_response_cache_events_total", labels) or 0.0
+
+
+def test_cache_key_normalizes_whitespace_and_params():
+    base = make_cache_key("crie  uma\nfunção", "gpt-4", "openai", 0.0, 100)
+    assert base == make_cache_key(" crie uma função ", "gpt-4", "openai", 0, 100)
+    assert base != make_cache_key("crie uma função", "gpt-4", "openai", 0.0, 200)
+    assert base != make_cache_key("crie uma função", "o4-mini", "openai", 0.0, 100)
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction_and_ttl():
+    cache = LLMResponseCache(max_entries=2, ttl_seconds=60)
+    evictions = cache_events("memory", "evict")
+    await cache.set("a", "code-a")
+    await cache.set("b", "code-b")
+    assert await cache.get("a") == "code-a"  # "a" passa a ser o mais recente
+    await cache.set("c", "code-c")
+    assert await cache.get("b") is None
+    assert await cache.get("a") == "code-a"
+    assert cache_events("memory", "evict") == evictions + 1
+
+    expired = LLMResponseCache(ttl_seconds=-1)
+    await expired.set("x", "code-x")
+    assert await expired.get("x") is None
+
+
+@pytest.mark.asyncio
+async def test_sqlite_tier_survives_new_instance(tmp_path):
+    path = str(tmp_path / "llm_cache.db")
+    first = LLMResponseCache(sqlite_path=path)
+    await first.set("k", "def f(): pass")
+    first.close()
+
+    second = LLMResponseCache(sqlite_path=path)
+    hits = cache_events("sqlite", "hit")
+    assert await second.get("k") == "def f(): pass"
+    assert cache_events("sqlite", "hit") == hits + 1
+    assert len(second) == 1  # promovido para o tier em memória
+    second.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_read_error_counts_as_miss(tmp_path):
+    cache = LLMResponseCache(sqlite_path=str(tmp_path / "llm_cache.db"))
+    cache._disk._conn.execute("DROP TABLE llm_cache")
+    misses = cache_events("sqlite", "miss")
+
+    assert await cache.get("k") is None
+    assert cache_events("sqlite", "miss") == misses + 1
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_serves_deterministic_requests_from_cache():
+    client = CountingLLMClient()
+    orchestrator = LLMCodeOrchestrator(client, cache=LLMResponseCache())
+    req = CodeGenRequest(prompt="crie uma função de saudação", temperature=0.0)
+
+    first = await orchestrator.generate_code(req)
+    second = await orchestrator.generate_code(
+        CodeGenRequest(prompt="crie uma  função de saudação ", temperature=0.0)
+    )
+    assert first == second
+    assert client.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_skips_cache_for_sampling_and_invalid_code():
+    cache = LLMResponseCache()
+    client = CountingLLMClient()
+    orchestrator = LLMCodeOrchestrator(client, cache=cache)
+    req = CodeGenRequest(prompt="crie uma função de saudação", temperature=0.7)
+    await orchestrator.generate_code(req)
+    await orchestrator.generate_code(req)
+    assert client.calls == 2
+
+    invalid = LLMCodeOrchestrator(CountingLLMClient(output="# sem função"), cache=cache)
+    with pytest.raises(ValueError):
+        await invalid.generate_code(
+            CodeGenRequest(prompt="crie algo inválido", temperature=0.0)
+        )
+    assert len(cache) == 0
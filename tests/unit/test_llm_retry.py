@@ -0,0 +1,135 @@
+"""
+Testes unitários para a política de retry do LLMClient.
+"""
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from src.infrastructure.llm_client import LLMClient
+from src.infrastructure.llm_retry import RetryBudget, RetryPolicy, parse_retry_after
+
+
+def make_client(responses, calls, **kwargs):
+    """Cria um LLMClient com transporte simulado que devolve `responses` em ordem."""
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        response: httpx.Response = responses[min(len(calls), len(responses)) - 1]
+        return response
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return LLMClient(
+        base_url="https://fake-llm.com",
+        api_key="fake",
+        http_client=http_client,
+        **kwargs,
+    )
+
+
+def attempts(outcome):
+    return (
+        REGISTRY.get_sample_value("llm_client_attempts_total", {"outcome": outcome})
+        or 0.0
+    )
+
+
+def test_compute_delay_full_jitter_bounds():
+    policy = RetryPolicy(base_delay=0.5, max_delay=2.0)
+    for attempt in range(1, 8):
+        delay = policy.compute_delay(attempt)
+        assert 0 <= delay <= min(2.0, 0.5 * 2 ** (attempt - 1))
+
+
+def test_compute_delay_respects_retry_after_cap():
+    policy = RetryPolicy(max_retry_after=5.0)
+    assert policy.compute_delay(1, retry_after=3.0) == 3.0
+    assert policy.compute_delay(1, retry_after=60.0) == 5.0
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("invalido") is None
+    assert parse_retry_after(None) is None
+
+
+def test_retry_budget_limits_retries_to_traffic_fraction():
+    budget = RetryBudget(ratio=0.5, min_tokens=1.0, max_tokens=2.0)
+    assert budget.try_acquire_retry() is True
+    assert budget.try_acquire_retry() is False
+    budget.record_request()
+    budget.record_request()
+    assert budget.try_acquire_retry() is True
+
+
+def test_retry_budget_min_tokens_is_only_the_starting_balance():
+    # Tráfego baixo: o saldo inicial se esgota e não volta sozinho
+    budget = RetryBudget(ratio=0.2, min_tokens=2.0)
+    assert [budget.try_acquire_retry() for _ in range(3)] == [True, True, False]
+    for _ in range(4):
+        budget.record_request()
+    assert budget.try_acquire_retry() is False
+    budget.record_request()
+    assert budget.try_acquire_retry() is True
+    budget.reset()
+    assert budget.available == 2.0
+
+
+@pytest.mark.asyncio
+async def test_retries_server_error_then_succeeds():
+    calls = []
+    ok = httpx.Response(200, json={"choices": [{"text": "def f(): pass"}]})
+    client = make_client(
+        [httpx.Response(503), ok],
+        calls,
+        retry_budget=RetryBudget(),
+    )
+    retries_before = attempts("retry")
+    with patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+        code = await client.generate_code("gere f")
+    assert code == "def f(): pass"
+    assert len(calls) == 2
+    mock_sleep.assert_awaited_once()
+    assert attempts("retry") == retries_before + 1
+
+
+@pytest.mark.asyncio
+async def test_client_error_fails_fast():
+    calls = []
+    client = make_client([httpx.Response(400)], calls, retry_budget=RetryBudget())
+    with patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.generate_code("gere f")
+    assert len(calls) == 1
+    mock_sleep.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_retry_after_header_is_honored():
+    calls = []
+    ok = httpx.Response(200, json={"choices": [{"text": "ok"}]})
+    client = make_client(
+        [httpx.Response(429, headers={"Retry-After": "1.5"}), ok],
+        calls,
+        retry_budget=RetryBudget(),
+    )
+    with patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+        await client.generate_code("gere f")
+    mock_sleep.assert_awaited_once_with(1.5)
+
+
+@pytest.mark.asyncio
+async def test_exhausted_budget_stops_retries():
+    calls = []
+    client = make_client(
+        [httpx.Response(503)],
+        calls,
+        max_retries=5,
+        retry_budget=RetryBudget(ratio=0.0, min_tokens=0.0),
+    )
+    with patch("asyncio.sleep", new_callable=AsyncMock):
+        with pytest.raises(httpx.HTTPStatusError):
+            await client.generate_code("gere f")
+    assert len(calls) == 1
@@ -0,0 +1,183 @@
+"""
+Testes unitários para a geração de código em streaming (SSE).
+"""
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.application.llm_code_orchestrator import CodeGenRequest, LLMCodeOrchestrator
+from src.infrastructure.llm_client import LLMClient
+from src.infrastructure.llm_client_myai import FenceStripper, MyAILLMClient
+from src.infrastructure.llm_quota import last_quota_status
+from src.presentation.api import llm_codegen
+from src.presentation.api.app import create_app
+
+CODE_CHUNKS = ["def soma(a, b):", "\n    return", " a + b\n"]
+
+
+class StreamingLLM:
+    """Cliente simulado que produz trechos e registra se o stream foi fechado."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.sent = 0
+        self.closed = False
+
+    async def stream_code(self, **kwargs):
+        try:
+            for chunk in self.chunks:
+                self.sent += 1
+                yield chunk
+        finally:
+            self.closed = True
+
+
+def sse_body(chunks):
+    lines = [f"data: {json.dumps({'choices': [{'text': c}]})}\n\n" for c in chunks]
+    return "".join(lines) + "data: [DONE]\n\n"
+
+
+@pytest.mark.asyncio
+async def test_llm_client_stream_code_parses_sse():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, text=sse_body(CODE_CHUNKS))
+
+    client = LLMClient(
+        base_url="https://fake-llm.com",
+        api_key="fake",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    chunks = [chunk async for chunk in client.stream_code("gere soma")]
+    assert chunks == CODE_CHUNKS
+    assert requests[0]["stream"] is True
+    assert last_quota_status().allowed
+
+
+MYAI_CONTENTS = [
+    "```python\ndef soma(a, b):\n    return a + b\n```",
+    "```python\n\n  x = '``'\n```\n",
+    "  def f():\n    return 1  \n",
+    "```python``",
+    "```py",
+    "```python",
+    "",
+]
+
+
+@pytest.mark.asyncio
+async def test_myai_stream_strips_the_code_fence_like_the_full_response():
+    content = MYAI_CONTENTS[0]
+    pieces = [content[i : i + 4] for i in range(0, len(content), 4)]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if json.loads(request.content).get("stream"):
+            events = [{"delta": {"content": piece}} for piece in pieces]
+            body = "".join(f"data: {json.dumps(e)}\n\n" for e in events)
+            return httpx.Response(200, text=body + "data: [DONE]\n\n")
+        return httpx.Response(200, json={"message": {"content": content}})
+
+    client = MyAILLMClient(
+        base_url="https://fake-myai.com",
+        api_key="fake",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    streamed = "".join([chunk async for chunk in client.stream_code("gere soma")])
+
+    assert streamed == await client.generate_code("gere soma")
+    assert streamed == "def soma(a, b):\n    return a + b"
+
+
+@pytest.mark.parametrize("content", MYAI_CONTENTS)
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 64])
+def test_fence_stripper_matches_parse_response(content, size):
+    client = MyAILLMClient(base_url="https://fake-myai.com", api_key="fake")
+    stripper = FenceStripper()
+    pieces = [content[i : i + size] for i in range(0, len(content), size)]
+
+    streamed = "".join(stripper.feed(piece) for piece in pieces) + stripper.finish()
+
+    assert streamed == client._parse_response({"message": {"content": content}})
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_stream_forwards_chunks():
+    llm = StreamingLLM(CODE_CHUNKS)
+    orchestrator = LLMCodeOrchestrator(llm)
+    chunks = [
+        chunk
+        async for chunk in orchestrator.stream_code(
+            CodeGenRequest(prompt="crie uma função de soma")
+        )
+    ]
+    assert chunks == CODE_CHUNKS
+    assert llm.closed
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_stream_aborts_on_pattern_split_across_chunks():
+    llm = StreamingLLM(["def f():\n    imp", "ort OS\n", "    return 1\n", "# fim"])
+    orchestrator = LLMCodeOrchestrator(llm)
+    received = []
+    with pytest.raises(ValueError) as exc:
+        async for chunk in orchestrator.stream_code(
+            CodeGenRequest(prompt="crie uma função qualquer")
+        ):
+            received.append(chunk)
+    assert "inseguros" in str(exc.value)
+    assert received == ["def f():\n    imp"]
+    assert llm.sent == 2  # upstream encerrado logo após o padrão
+    assert llm.closed
+
+
+def make_app(monkeypatch, chunks):
+    orchestrator = LLMCodeOrchestrator(StreamingLLM(chunks))
+    monkeypatch.setattr(llm_codegen, "get_orchestrator", lambda *_: orchestrator)
+    app = FastAPI()
+    app.state.limiter = llm_codegen.limiter
+    app.include_router(llm_codegen.router)
+    return TestClient(app)
+
+
+def test_stream_endpoint_emits_tokens_and_done(monkeypatch):
+    client = make_app(monkeypatch, CODE_CHUNKS)
+    response = client.post(
+        "/llm-codegen/generate/stream",
+        json={"prompt": "crie uma função de soma"},
+        headers={"Authorization": "Bearer token"},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = response.text.strip().split("\n\n")
+    assert events[0] == f"data: {json.dumps({'token': CODE_CHUNKS[0]})}"
+    assert events[-1].startswith("event: done")
+    assert json.loads(events[-1].split("data: ", 1)[1])["code"] == "".join(CODE_CHUNKS)
+
+
+def test_app_serves_the_streaming_endpoint(monkeypatch):
+    orchestrator = LLMCodeOrchestrator(StreamingLLM(CODE_CHUNKS))
+    monkeypatch.setattr(llm_codegen, "get_orchestrator", lambda *_: orchestrator)
+    llm_codegen.limiter.reset()
+    with TestClient(create_app(testing=True)) as client:
+        response = client.post(
+            "/llm-codegen/generate/stream",
+            json={"prompt": "crie uma função de soma"},
+            headers={"Authorization": "Bearer token"},
+        )
+    assert response.status_code == 200
+    assert response.text.strip().split("\n\n")[-1].startswith("event: done")
+
+
+def test_stream_endpoint_rejects_short_prompt(monkeypatch):
+    client = make_app(monkeypatch, CODE_CHUNKS)
+    response = client.post(
+        "/llm-codegen/generate/stream",
+        json={"prompt": "oi"},
+        headers={"Authorization": "Bearer token"},
+    )
+    assert response.status_code == 400
@@ -0,0 +1,89 @@
+"""
+Testes unitários para o servidor LLM stub usado em testes de carga.
+"""
+import httpx
+import pytest
+
+from src.infrastructure.llm_client import LLMClient
+from src.infrastructure.llm_client_myai import MyAILLMClient
+from src.infrastructure.llm_retry import RetryPolicy
+from tests.llm_stub_server import (
+    StubBehavior,
+    StubConfig,
+    create_stub_app,
+    generate_stub_code,
+)
+
+
+def stub_http_client(config: StubConfig) -> httpx.AsyncClient:
+    app = create_stub_app(config)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app))
+
+
+def test_generated_code_is_deterministic_and_valid():
+    code = generate_stub_code("Crie uma função que some")
+    assert code == generate_stub_code("Crie uma função que some")
+    assert code != generate_stub_code("Outro prompt")
+    compile(code, "<stub>", "exec")
+
+
+def test_latency_and_faults_are_reproducible_with_seed():
+    config = StubConfig(latency_mean=0.5, latency_stddev=0.2, error_rate=0.3, seed=7)
+    first, second = StubBehavior(config), StubBehavior(config)
+    draws = [(first.latency(), first.fault()) for _ in range(50)]
+    assert draws == [(second.latency(), second.fault()) for _ in range(50)]
+    assert all(latency >= 0 for latency, _ in draws)
+    assert {fault for _, fault in draws} == {None, "error"}
+
+
+def test_invalid_distribution_is_rejected():
+    with pytest.raises(ValueError):
+        StubConfig(latency_distribution="pareto")
+
+
+@pytest.mark.asyncio
+async def test_openai_client_generates_and_streams_from_stub():
+    client = LLMClient(
+        base_url="http://stub",
+        api_key="fake",
+        http_client=stub_http_client(
+            StubConfig(latency_distribution="fixed", latency_mean=0)
+        ),
+    )
+    code = await client.generate_code("Crie uma função que some")
+    assert code == generate_stub_code("Crie uma função que some")
+
+    chunks = [chunk async for chunk in client.stream_code("Crie uma função que some")]
+    assert len(chunks) > 1
+    assert "".join(chunks) == code
+
+
+@pytest.mark.asyncio
+async def test_myai_client_generates_from_stub():
+    client = MyAILLMClient(
+        base_url="http://stub/api/v0/chat/completions",
+        api_key="fake",
+        http_client=stub_http_client(
+            StubConfig(latency_distribution="fixed", latency_mean=0)
+        ),
+    )
+    code = await client.generate_code("Crie uma função que some")
+    assert code.strip() == generate_stub_code("Crie uma função que some").strip()
+
+
+@pytest.mark.asyncio
+async def test_injected_errors_exhaust_retries():
+    config = StubConfig(latency_distribution="fixed", latency_mean=0, error_rate=1.0)
+    http_client = stub_http_client(config)
+    client = LLMClient(
+        base_url="http://stub",
+        api_key="fake",
+        http_client=http_client,
+        retry_policy=RetryPolicy(max_attempts=2, base_delay=0, max_delay=0),
+    )
+    with pytest.raises(httpx.HTTPStatusError) as exc:
+        await client.generate_code("Crie uma função que some")
+    assert exc.value.response.status_code == 500
+    stats = (await http_client.get("http://stub/stub/stats")).json()
+    assert stats["requests"] == 2
+    assert stats["errors"] == 2
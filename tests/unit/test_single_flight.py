@@ -0,0 +1,94 @@
+"""
+Testes unitários para a coalescência de requisições LLM (single-flight).
+"""
+import asyncio
+
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from src.infrastructure.llm_client import LLMClient
+from src.infrastructure.single_flight import SingleFlight, request_fingerprint
+
+
+def coalesced():
+    return REGISTRY.get_sample_value("llm_single_flight_coalesced_total") or 0.0
+
+
+def make_slow_client(calls, single_flight, status_code=200):
+    async def handler(request):
+        calls.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(
+            status_code, json={"choices": [{"text": "def f(): pass"}]}
+        )
+
+    return LLMClient(
+        base_url="https://fake-llm.com",
+        api_key="fake",
+        max_retries=1,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        single_flight=single_flight,
+    )
+
+
+def test_fingerprint_depends_on_payload_and_key():
+    payload = {"prompt": "a", "temperature": 0}
+    assert request_fingerprint("u", payload, "k") == request_fingerprint(
+        "u", dict(reversed(list(payload.items()))), "k"
+    )
+    assert request_fingerprint("u", payload, "k") != request_fingerprint(
+        "u", payload, "outra"
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_prompts_share_one_upstream_call():
+    calls = []
+    group = SingleFlight()
+    client = make_slow_client(calls, group)
+    before = coalesced()
+
+    results = await asyncio.gather(*(client.generate_code("gere f") for _ in range(5)))
+
+    assert results == ["def f(): pass"] * 5
+    assert len(calls) == 1
+    assert coalesced() == before + 4
+    assert len(group) == 0
+
+
+@pytest.mark.asyncio
+async def test_distinct_prompts_are_not_coalesced():
+    calls = []
+    client = make_slow_client(calls, SingleFlight())
+    await asyncio.gather(client.generate_code("gere f"), client.generate_code("gere g"))
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_all_waiters_receive_the_exception():
+    calls = []
+    client = make_slow_client(calls, SingleFlight(), status_code=400)
+    results = await asyncio.gather(
+        *(client.generate_code("gere f") for _ in range(3)), return_exceptions=True
+    )
+    assert len(calls) == 1
+    assert all(isinstance(r, httpx.HTTPStatusError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_call():
+    group = SingleFlight()
+    started = asyncio.Event()
+
+    async def work():
+        started.set()
+        await asyncio.sleep(0.05)
+        return 42
+
+    first = asyncio.ensure_future(group.do("k", work))
+    await started.wait()
+    second = asyncio.ensure_future(group.do("k", work))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == 42